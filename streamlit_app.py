@@ -2,6 +2,8 @@
 import streamlit as st
 import pandas as pd
 
+from tst_export import export_downloads, typed_text_table
+
 # --- Core Functions ---
 
 def parse_sort_line_dynamic(line):
@@ -243,9 +245,10 @@ if uploaded_files:
         st.subheader("📊 Aggregated Test Plan")
         st.dataframe(df_test, use_container_width=True)
 
-        # CSV export
-        csv_test = df_test.to_csv(index=False).encode("utf-8")
-        st.download_button("📥 Download Test Plan CSV", data=csv_test, file_name="test_plan.csv", mime="text/csv")
+        # Export (built on click; Parquet / Arrow get typed columns)
+        downloads = export_downloads(lambda: df_test, "test_plan", typed=typed_text_table)
+        for fmt_label, data, export_name, mime in downloads:
+            st.download_button(f"📥 Download Test Plan {fmt_label}", data=data, file_name=export_name, mime=mime)
 
     # Show Sort Plan Table
     if all_bin_rows:
@@ -277,7 +280,8 @@ if uploaded_files:
         st.subheader("📋 Aggregated Sort Plan")
         st.dataframe(df_sort, use_container_width=True)
 
-        # CSV export
-        csv_sort = df_sort.to_csv(index=False).encode("utf-8")
-        st.download_button("📥 Download Sort Plan CSV", data=csv_sort, file_name="sort_plan.csv", mime="text/csv")
+        # Export (built on click; Parquet / Arrow get typed columns)
+        downloads = export_downloads(lambda: df_sort, "sort_plan", typed=typed_text_table)
+        for fmt_label, data, export_name, mime in downloads:
+            st.download_button(f"📥 Download Sort Plan {fmt_label}", data=data, file_name=export_name, mime=mime)
 
@@ -0,0 +1,83 @@
+# tst_archive.py
+# Streaming access to .tst programs inside .zip / .tar(.gz|.bz2|.xz) archives.
+#
+# Members are read one at a time straight from the archive stream, never
+# extracted to disk: a zip member is decompressed from its entry, a tar is
+# read in stream mode ("r|*"), so even non-seekable uploads work and only
+# the current member's bytes are held. Members larger than
+# MAX_MEMBER_BYTES (a .tst program is a few KB) are skipped.
+import fnmatch
+import os
+import tarfile
+import zipfile
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+MAX_MEMBER_BYTES = 16 * 1024 * 1024
+
+
+def is_archive_name(name):
+    """True for file names with an archive suffix (.zip, .tar.gz, ...)."""
+    return str(name).lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _wanted(member_name, pattern):
+    base = os.path.basename(member_name)
+    # Skip macOS metadata (__MACOSX/, ._ resource forks)
+    if not base or base.startswith("._") or member_name.startswith("__MACOSX/"):
+        return False
+    return fnmatch.fnmatch(base.lower(), pattern.lower())
+
+
+def _read_capped(f, size, member_name, max_member_bytes, warn):
+    if size is not None and size > max_member_bytes:
+        warn(f"{member_name}: skipped, {size} bytes is over the {max_member_bytes} byte member limit")
+        return None
+    data = f.read(max_member_bytes + 1)
+    if len(data) > max_member_bytes:
+        warn(f"{member_name}: skipped, over the {max_member_bytes} byte member limit")
+        return None
+    return data
+
+
+def iter_archive_members(source, pattern="*.tst", max_member_bytes=MAX_MEMBER_BYTES, warn=print):
+    """
+    Yield (member name, bytes) for every member of a zip or tar archive
+    whose base name matches `pattern` (case-insensitive), in archive order.
+
+    Args:
+        source: Path of the archive or a binary file object (e.g. an upload);
+            zip archives need it to be seekable, tar archives do not.
+        pattern (str): Member file pattern.
+        max_member_bytes (int): Larger members are skipped with a warning.
+        warn (callable): Receives skipped members and unreadable archives.
+    """
+    name = source if isinstance(source, (str, os.PathLike)) else getattr(source, "name", "archive")
+    f = open(source, "rb") if isinstance(source, (str, os.PathLike)) else source
+    seekable = f.seekable() if hasattr(f, "seekable") else False
+    try:
+        if seekable and zipfile.is_zipfile(f):
+            f.seek(0)
+            with zipfile.ZipFile(f) as zf:
+                for info in zf.infolist():
+                    if info.is_dir() or not _wanted(info.filename, pattern):
+                        continue
+                    with zf.open(info) as member:
+                        data = _read_capped(member, info.file_size, info.filename, max_member_bytes, warn)
+                    if data is not None:
+                        yield info.filename, data
+            return
+        if seekable:
+            f.seek(0)
+        with tarfile.open(fileobj=f, mode="r|*") as tar:
+            for info in tar:
+                if not info.isfile() or not _wanted(info.name, pattern):
+                    continue
+                member_name = info.name[2:] if info.name.startswith("./") else info.name
+                data = _read_capped(tar.extractfile(info), info.size, member_name, max_member_bytes, warn)
+                if data is not None:
+                    yield member_name, data
+    except (tarfile.TarError, zipfile.BadZipFile, EOFError, OSError) as e:
+        warn(f"{os.path.basename(str(name))}: could not read archive: {e}")
+    finally:
+        if f is not source:
+            f.close()
@@ -0,0 +1,195 @@
+# tst_batch.py
+# Headless batch validation of .tst programs (no browser session needed).
+#
+#   python tst_batch.py programs/ -o validation_results.csv
+#   python tst_batch.py "library/**/*.tst" --workers 16 --details errors.json
+#   python tst_batch.py lot_1234.zip programs.tar.gz -o validation_results.csv
+#
+# Archives are streamed member by member (nothing is extracted to disk) and
+# at most a few members per worker are in flight at once. Summary rows are
+# appended to the CSV as each file finishes.
+# Exit code is 1 when any validation fails, so it can gate a release job.
+import argparse
+import itertools
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from tst_archive import is_archive_name, iter_archive_members
+from tst_program import NormalizedProgram
+from tst_reader import TST_HEADER_SIZE, MappedTstFile, find_tst_files
+from tst_rules import VALIDATION_RULES, summarize_errors
+from tst_specs import spec_catalog_for
+
+SUMMARY_COLUMNS = ["File", "Validation", "Status", "Issues"]
+
+def validate_file(path, labels, expected_bin_number, spec_dir):
+    """
+    Parse, normalize and validate one .tst file.
+
+    Runs in a worker process, so everything it needs comes in as plain
+    arguments and it returns only picklable data.
+
+    Returns:
+        tuple: (summary rows, {label: issues}, parser warnings)
+    """
+    file_name = os.path.basename(path)
+    warnings = []
+
+    try:
+        with MappedTstFile(path) as tst:
+            program = NormalizedProgram.from_bytes(tst.data, warn=warnings.append)
+    except (OSError, ValueError) as e:
+        errors = {label: [f"Could not read file: {e}"] for label in labels}
+        return summarize_errors(file_name, errors), errors, warnings
+
+    return _validate_program(file_name, program, labels, expected_bin_number, spec_dir, warnings)
+
+
+def validate_data(file_name, data, labels, expected_bin_number, spec_dir):
+    """
+    validate_file() for the bytes of a .tst program already in memory (an
+    archive member). `file_name` may include the member's directory.
+    """
+    warnings = []
+    try:
+        if len(data) < TST_HEADER_SIZE:
+            raise ValueError(f"{len(data)} bytes is too short for a .tst header")
+        program = NormalizedProgram.from_bytes(data, warn=warnings.append)
+    except (ValueError, IndexError) as e:
+        errors = {label: [f"Could not read file: {e}"] for label in labels}
+        return summarize_errors(file_name, errors), errors, warnings
+
+    return _validate_program(file_name, program, labels, expected_bin_number, spec_dir, warnings)
+
+
+def _validate_program(file_name, program, labels, expected_bin_number, spec_dir, warnings):
+    selected_validations = [(label, VALIDATION_RULES[label]) for label in labels]
+    all_errors = program.validate(
+        file_name, selected_validations,
+        expected_bin_number=expected_bin_number, spec_dir=spec_dir, catch_errors=True,
+        spec_catalog=spec_catalog_for(spec_dir),
+    )
+    # Issues may be dicts holding numpy scalars; keep the details JSON-friendly
+    all_errors = {
+        label: [e if isinstance(e, str) else {k: str(v) for k, v in e.items()} for e in errors]
+        for label, errors in all_errors.items()
+    }
+    return summarize_errors(file_name, all_errors), all_errors, warnings
+
+
+def _validate_file_args(args):
+    return validate_file(*args)
+
+
+def _validate_data_args(args):
+    return validate_data(*args)
+
+
+def _bounded_map(pool, func, jobs, window):
+    """
+    Like pool.map(func, jobs) over (key, args) jobs, yielding (key, result)
+    in job order, but pulling a job only when fewer than `window` are in
+    flight, so a streamed source is never read far ahead of the workers.
+    """
+    pending = deque()
+    for key, job in jobs:
+        pending.append((key, pool.submit(func, job)))
+        if len(pending) >= window:
+            key, future = pending.popleft()
+            yield key, future.result()
+    while pending:
+        key, future = pending.popleft()
+        yield key, future.result()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Validate .tst programs without the Streamlit UI."
+    )
+    parser.add_argument("sources", nargs="+",
+                        help="Directories, files, glob patterns or .zip / .tar.gz archives")
+    parser.add_argument("-o", "--output", default="validation_results.csv",
+                        help="Overall Summary CSV (default: %(default)s)")
+    parser.add_argument("--details", help="Also write per-file issues as JSON")
+    parser.add_argument("--spec-dir", default="paper-spec",
+                        help="Directory of paper-spec CSVs (default: %(default)s)")
+    parser.add_argument("--expected-bin", type=int, default=1,
+                        help="Expected BinNumber for 'ALL PASS' (default: %(default)s)")
+    parser.add_argument("--skip", action="append", default=[], metavar="LABEL",
+                        help="Validation label to skip (repeatable)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (default: all cores)")
+    parser.add_argument("--pattern", default="*.tst",
+                        help="File pattern inside directories (default: %(default)s)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    unknown = [label for label in args.skip if label not in VALIDATION_RULES]
+    if unknown:
+        print(f"Unknown validation label(s): {unknown}", file=sys.stderr)
+        return 2
+    labels = [label for label in VALIDATION_RULES if label not in args.skip]
+
+    archives = [source for source in args.sources if is_archive_name(source) and os.path.isfile(source)]
+    paths = []
+    for source in args.sources:
+        if source not in archives:
+            paths.extend(find_tst_files(source, args.pattern))
+    paths = list(dict.fromkeys(paths))
+    if not paths and not archives:
+        print("No .tst files found.", file=sys.stderr)
+        return 2
+
+    spec_dir = os.path.abspath(args.spec_dir)
+    # Compile changed specs once here; workers start from the snapshot
+    if os.path.isdir(spec_dir):
+        spec_catalog_for(spec_dir).refresh()
+    jobs = [(path, labels, args.expected_bin, spec_dir) for path in paths]
+
+    def member_jobs(archive):
+        warn = lambda message: print(f"{archive}: {message}", file=sys.stderr)
+        for member_name, data in iter_archive_members(archive, args.pattern, warn=warn):
+            yield f"{archive}/{member_name}", (member_name, data, labels, args.expected_bin, spec_dir)
+
+    overall_summary = []
+    details = {}
+    workers = args.workers or os.cpu_count() or 1
+    chunksize = max(1, len(jobs) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as pool, open(args.output, "w", newline="", encoding="utf-8") as out:
+        results = itertools.chain(
+            zip(paths, pool.map(_validate_file_args, jobs, chunksize=chunksize)),
+            *(_bounded_map(pool, _validate_data_args, member_jobs(archive), 2 * workers) for archive in archives),
+        )
+        pd.DataFrame(columns=SUMMARY_COLUMNS).to_csv(out, index=False)
+        for key, (summary_data, all_errors, warnings) in results:
+            pd.DataFrame(summary_data, columns=SUMMARY_COLUMNS).to_csv(out, header=False, index=False)
+            out.flush()
+            overall_summary.extend(summary_data)
+            details[key] = all_errors
+            for w in warnings:
+                print(f"{os.path.basename(key)}: {w}", file=sys.stderr)
+
+    overall_df = pd.DataFrame(overall_summary, columns=SUMMARY_COLUMNS)
+
+    if args.details:
+        with open(args.details, "w", encoding="utf-8") as f:
+            json.dump(details, f, indent=2, ensure_ascii=False)
+
+    failed = overall_df[overall_df["Issues"] > 0]
+    print(
+        f"{len(details)} file(s), {len(overall_df)} check(s), "
+        f"{failed['File'].nunique()} file(s) with failures -> {args.output}"
+    )
+    return 1 if not failed.empty else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
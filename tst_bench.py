@@ -0,0 +1,251 @@
+# tst_bench.py
+# Benchmarks of the parse -> normalize -> rules pipeline, as JSON.
+#
+#   python tst_bench.py -o bench.json
+#   python tst_bench.py --sizes 1 100 --baseline bench_main.json --max-slowdown 1.25
+#
+# Each size runs in a fresh process over that many generated programs
+# (tst_corpus, a pool of --distinct programs reused round-robin), named
+# after the paper-spec CSVs so the spec correlation reads real specs.
+# Per stage it reports throughput, p50/p99/mean latency per program; per
+# size the peak RSS of its process. With --baseline, stages whose p50 got
+# slower than --max-slowdown times the baseline are listed and the exit
+# code is 1, so CI can compare commits.
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from tst_corpus import generate_program, item_weights
+from tst_parser import normalize_test_table, parse_tst_data, parse_tst_sections
+from tst_rules import (
+    VALIDATION_RULES, apply_same_mirroring, correlate_spec_with_validspec, run_validations, spec_path_for,
+)
+from tst_specs import spec_catalog_for
+
+DEFAULT_SIZES = [1, 100, 1000, 10000]
+EXPECTED_BIN_NUMBER = 1  # the ALL PASS bin of generated programs
+
+
+def _ignore(message):
+    pass
+
+
+def _program_pool(count, seed, spec_dir):
+    """`count` generated programs as (file name, bytes), named after the spec CSVs."""
+    rng = np.random.default_rng(seed)
+    weights = item_weights()
+    stems = sorted(
+        os.path.splitext(os.path.basename(path))[0] for path in glob.glob(os.path.join(spec_dir, "*.csv"))
+    ) or ["SYN"]
+    pool = []
+    for k in range(count):
+        data, _, _ = generate_program(rng, int(rng.integers(20, 121)), weights)
+        pool.append((f"{stems[k % len(stems)]}.tst", data))
+    return pool
+
+
+def _stage_stats(samples_ns, num_bytes=None):
+    samples = np.asarray(samples_ns, dtype=np.float64) / 1e6
+    total_s = float(samples.sum()) / 1e3
+    stats = {
+        "calls": len(samples),
+        "total_s": round(total_s, 6),
+        "programs_per_s": round(len(samples) / total_s, 3) if total_s else None,
+        "p50_ms": round(float(np.percentile(samples, 50)), 4),
+        "p99_ms": round(float(np.percentile(samples, 99)), 4),
+        "mean_ms": round(float(samples.mean()), 4),
+    }
+    if num_bytes is not None:
+        stats["mb_per_s"] = round(num_bytes / 1e6 / total_s, 3) if total_s else None
+    return stats
+
+
+def run_size(num_programs, distinct=200, seed=0, spec_dir="paper-spec"):
+    """
+    Time every stage over num_programs programs (in this process).
+
+    Returns:
+        dict: {"programs", "bytes", "wall_s", "peak_rss_mb", "stages": {stage: stats}}
+    """
+    pool = _program_pool(min(num_programs, distinct), seed, spec_dir)
+    catalog = spec_catalog_for(spec_dir)
+    catalog.refresh()
+
+    stages = {"parse_tst_data": [], "parse_tst_sections": [], "normalize_test_table": [],
+              "apply_same_mirroring": [], "correlate_spec_with_validspec": []}
+    stages.update({f"rule: {label}": [] for label in VALIDATION_RULES})
+    num_bytes = 0
+    clock = time.perf_counter_ns
+
+    started = time.perf_counter()
+    for k in range(num_programs):
+        file_name, data = pool[k % len(pool)]
+        num_bytes += len(data)
+
+        t0 = clock()
+        parse_tst_data(data, warn=_ignore)
+        t1 = clock()
+        df_tests, sort_incidence = parse_tst_sections(data, warn=_ignore)
+        t2 = clock()
+        df_tests = normalize_test_table(df_tests)
+        t3 = clock()
+        mirrored = apply_same_mirroring(df_tests, warn=_ignore)
+        t4 = clock()
+        # The pre-catalog path: read and correlate the spec CSV each time
+        try:
+            correlate_spec_with_validspec(df_tests, spec_path_for(file_name, spec_dir))
+        except Exception:
+            pass
+        t5 = clock()
+        stages["parse_tst_data"].append(t1 - t0)
+        stages["parse_tst_sections"].append(t2 - t1)
+        stages["normalize_test_table"].append(t3 - t2)
+        stages["apply_same_mirroring"].append(t4 - t3)
+        stages["correlate_spec_with_validspec"].append(t5 - t4)
+
+        sort_bins = sort_incidence.bins
+        for label, func in VALIDATION_RULES.items():
+            t0 = clock()
+            run_validations(
+                file_name, df_tests, sort_bins, [(label, func)],
+                expected_bin_number=EXPECTED_BIN_NUMBER, spec_dir=spec_dir, catch_errors=True,
+                df_tests_mirrored=mirrored, spec_catalog=catalog, sort_incidence=sort_incidence,
+            )
+            stages[f"rule: {label}"].append(clock() - t0)
+    wall_s = time.perf_counter() - started
+
+    parse_stages = ("parse_tst_data", "parse_tst_sections")
+    return {
+        "programs": num_programs,
+        "distinct_programs": len(pool),
+        "bytes": num_bytes,
+        "wall_s": round(wall_s, 6),
+        "programs_per_s": round(num_programs / wall_s, 3) if wall_s else None,
+        # ru_maxrss is in KiB on Linux, bytes on macOS
+        "peak_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 ** 2 if sys.platform == "darwin" else 1024), 2
+        ),
+        "stages": {
+            stage: _stage_stats(samples, num_bytes if stage in parse_stages else None)
+            for stage, samples in stages.items()
+        },
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, distinct=200, seed=0, spec_dir="paper-spec"):
+    """Run every size in its own process (so peak RSS is per size) and collect the report."""
+    report = {
+        "commit": _git_commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": seed,
+        "sizes": [],
+    }
+    for size in sizes:
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            report["sizes"].append(pool.submit(run_size, size, distinct, seed, spec_dir).result())
+    return report
+
+
+def compare_reports(report, baseline, max_slowdown=1.25, min_ms=0.05):
+    """
+    Stages whose p50 is more than max_slowdown times the baseline p50
+    (for sizes present in both; stages under min_ms in both are noise).
+
+    Returns:
+        list: {"programs", "stage", "baseline_p50_ms", "p50_ms", "ratio"} per regression.
+    """
+    baseline_sizes = {entry["programs"]: entry for entry in baseline.get("sizes", [])}
+    regressions = []
+    for entry in report["sizes"]:
+        old = baseline_sizes.get(entry["programs"])
+        if old is None:
+            continue
+        for stage, stats in entry["stages"].items():
+            old_stats = old["stages"].get(stage)
+            if old_stats is None or max(stats["p50_ms"], old_stats["p50_ms"]) < min_ms:
+                continue
+            ratio = stats["p50_ms"] / old_stats["p50_ms"] if old_stats["p50_ms"] else float("inf")
+            if ratio > max_slowdown:
+                regressions.append({
+                    "programs": entry["programs"], "stage": stage,
+                    "baseline_p50_ms": old_stats["p50_ms"], "p50_ms": stats["p50_ms"],
+                    "ratio": round(ratio, 3),
+                })
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark parsing, normalization, rules and spec correlation.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Numbers of programs to run (default: 1 100 1000 10000)")
+    parser.add_argument("--distinct", type=int, default=200,
+                        help="Distinct generated programs, reused round-robin (default: 200)")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus seed (default: 0)")
+    parser.add_argument("--spec-dir", default="paper-spec", help="Directory of paper-spec CSVs")
+    parser.add_argument("-o", "--output", help="Write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare p50 latencies against")
+    parser.add_argument("--max-slowdown", type=float, default=1.25,
+                        help="p50 ratio over the baseline that counts as a regression (default: 1.25)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not read baseline: {e}", file=sys.stderr)
+            return 2
+
+    report = run_benchmarks(args.sizes, args.distinct, args.seed, args.spec_dir)
+    if baseline is not None:
+        report["baseline_commit"] = baseline.get("commit")
+        report["regressions"] = compare_reports(report, baseline, args.max_slowdown)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    for entry in report["sizes"]:
+        print(f"{entry['programs']:>6} program(s): {entry['programs_per_s']} programs/s, "
+              f"peak RSS {entry['peak_rss_mb']} MB", file=sys.stderr)
+    for regression in report.get("regressions", []):
+        print(f"Slower: {regression['stage']} at {regression['programs']} program(s) "
+              f"{regression['baseline_p50_ms']} -> {regression['p50_ms']} ms", file=sys.stderr)
+    return 1 if report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
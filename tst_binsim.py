@@ -0,0 +1,283 @@
+# tst_binsim.py
+# Predict the bin of every device from per-test pass/fail outcomes.
+#
+#   python tst_binsim.py KF5N50F.tst datalog.csv
+#   python tst_binsim.py KF5N50F.tst outcomes.npy --bins-out bins.csv
+#   python tst_binsim.py KF5N50F.tst measurements.csv --values
+#
+# Outcomes are a (devices x tests) int8 matrix: 1 = PASS, 0 = FAIL,
+# -1 = not tested. With --values the datalog holds measured values instead:
+# derived items (ADD, DIVID, ...) are computed from them with tst_derived
+# and every test is judged against the program's Limit-L / Limit-H.
+# Sort rows are tried in SortSequence order and a device takes the
+# BinNumber of the first row it satisfies:
+#   AND / ALL   every condition holds
+#   OR / OSC    at least one condition holds
+#   ALL PASS    every tested column passed and none failed
+#   REJECT      always (catch-all)
+# A condition (TestN, PASS/FAIL) holds when that test ran with that result.
+import argparse
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+from tst_derived import evaluate_derived
+from tst_program import NormalizedProgram
+from tst_reader import MappedTstFile
+from tst_sorts import RESULT_FAIL, RESULT_PASS
+
+OUTCOME_PASS = 1
+OUTCOME_FAIL = 0
+OUTCOME_NOT_TESTED = -1
+
+# Datalog cell text -> outcome (case-insensitive); blanks are "not tested"
+OUTCOME_LABELS = {
+    "1": OUTCOME_PASS, "pass": OUTCOME_PASS, "p": OUTCOME_PASS, "true": OUTCOME_PASS,
+    "0": OUTCOME_FAIL, "fail": OUTCOME_FAIL, "f": OUTCOME_FAIL, "false": OUTCOME_FAIL,
+}
+
+UNBINNED = -1
+
+
+def _test_number(column):
+    """Test number named by a datalog header ('12', 'Test12', 'T12'), or None."""
+    match = re.fullmatch(r"(?:test|t)?\s*(\d+)", str(column).strip(), flags=re.IGNORECASE)
+    return int(match.group(1)) if match else None
+
+
+def load_outcomes(path):
+    """
+    Load a pass/fail datalog.
+
+    .npy: a (devices x tests) array whose column j is test j + 1 (opened
+    memory-mapped, so it is read as it is used).
+    .csv: one column per test, headed by its number ('3', 'Test3');
+    other columns (device id, lot, ...) are ignored. Cells are 1/0,
+    PASS/FAIL, P/F or True/False; blanks mean not tested.
+
+    Returns:
+        tuple: (outcomes int8 array, list of test numbers per column)
+    """
+    if path.lower().endswith(".npy"):
+        outcomes = np.load(path, mmap_mode="r")
+        if outcomes.ndim != 2:
+            raise ValueError(f"{path}: expected a 2-D devices x tests array, got shape {outcomes.shape}")
+        return outcomes, list(range(1, outcomes.shape[1] + 1))
+
+    datalog = pd.read_csv(path, dtype=str, keep_default_na=False)
+    test_cols = [(col, _test_number(col)) for col in datalog.columns]
+    test_cols = [(col, num) for col, num in test_cols if num is not None]
+    if not test_cols:
+        raise ValueError(f"{path}: no test columns (headers like '1' or 'Test1') found")
+
+    outcomes = np.empty((len(datalog), len(test_cols)), dtype=np.int8)
+    for j, (col, _) in enumerate(test_cols):
+        text = datalog[col].str.strip().str.lower()
+        outcomes[:, j] = text.map(OUTCOME_LABELS).fillna(OUTCOME_NOT_TESTED).to_numpy(dtype=np.int8)
+    return outcomes, [num for _, num in test_cols]
+
+
+def load_measurements(path):
+    """
+    Load a datalog of measured values.
+
+    .npy: a (devices x tests) float array whose column j is test j + 1
+    (opened memory-mapped). .csv: one column per test, headed by its
+    number as in load_outcomes. Blank or non-numeric cells are NaN (not
+    measured).
+
+    Returns:
+        tuple: (values float64 array, list of test numbers per column)
+    """
+    if path.lower().endswith(".npy"):
+        values = np.load(path, mmap_mode="r")
+        if values.ndim != 2:
+            raise ValueError(f"{path}: expected a 2-D devices x tests array, got shape {values.shape}")
+        return values, list(range(1, values.shape[1] + 1))
+
+    datalog = pd.read_csv(path, dtype=str, keep_default_na=False)
+    test_cols = [(col, _test_number(col)) for col in datalog.columns]
+    test_cols = [(col, num) for col, num in test_cols if num is not None]
+    if not test_cols:
+        raise ValueError(f"{path}: no test columns (headers like '1' or 'Test1') found")
+
+    values = np.empty((len(datalog), len(test_cols)), dtype=np.float64)
+    for j, (col, _) in enumerate(test_cols):
+        values[:, j] = pd.to_numeric(datalog[col].str.strip(), errors="coerce").to_numpy(dtype=np.float64)
+    return values, [num for _, num in test_cols]
+
+
+def outcomes_from_values(df_tests, values, test_numbers=None, warn=print):
+    """
+    Pass/fail outcomes of measured values against a program's limits.
+
+    Datalog columns are matched to test rows by Sequence. Derived items
+    are computed from the measured values (tst_derived) before judging,
+    so their limits are checked too. A value passes when it is within
+    Limit-L_exact .. Limit-H_exact (ratio limits unrounded); a missing
+    limit does not constrain it.
+
+    Args:
+        df_tests (pd.DataFrame): Normalized (SAME-mirrored) test table.
+        values (array-like): (devices x tests) measured values, NaN where
+            a test was not measured.
+        test_numbers (list, optional): Test number of each value column
+            (default: column j is test j + 1).
+        warn (callable): Receives derived items that cannot be computed.
+
+    Returns:
+        tuple: (outcomes int8 array, Sequence of each outcome column),
+        as simulate_bins takes them.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if test_numbers is None:
+        test_numbers = range(1, values.shape[1] + 1)
+    column_of = {int(num): j for j, num in enumerate(test_numbers)}
+    sequences = [int(seq) for seq in df_tests["Sequence"]]
+
+    measured = np.full((len(values), len(df_tests)), np.nan)
+    for row, seq in enumerate(sequences):
+        if seq in column_of:
+            measured[:, row] = values[:, column_of[seq]]
+    measured = evaluate_derived(df_tests, measured, warn=warn)
+
+    low = df_tests["Limit-L_exact"].to_numpy(dtype=np.float64)
+    high = df_tests["Limit-H_exact"].to_numpy(dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        failed = (measured < low) | (measured > high)  # NaN limits never fail
+    outcomes = np.where(failed, OUTCOME_FAIL, OUTCOME_PASS).astype(np.int8)
+    outcomes[np.isnan(measured)] = OUTCOME_NOT_TESTED
+    return outcomes, sequences
+
+
+def simulate_bins(sort_incidence, outcomes, test_numbers=None, unbinned=UNBINNED, chunk_size=1_000_000):
+    """
+    Bin number per device.
+
+    Args:
+        sort_incidence (SortIncidence): Decoded sort plans.
+        outcomes (array-like): (devices x tests) outcomes, 1 / 0 / -1.
+        test_numbers (list, optional): Test number of each outcome column
+            (default: column j is test j + 1).
+        unbinned (int): Bin for devices no sort row takes.
+        chunk_size (int): Devices evaluated per pass, to bound memory.
+
+    Returns:
+        np.ndarray: int64 BinNumber per device.
+    """
+    outcomes = np.asarray(outcomes)  # a memmap stays lazily read
+    num_devices, num_cols = outcomes.shape
+    if test_numbers is None:
+        test_numbers = range(1, num_cols + 1)
+    column_of = {int(num): j for j, num in enumerate(test_numbers)}
+
+    # Compile each sort row once: outcome columns and required outcomes of its conditions
+    order = np.argsort(sort_incidence.sort_sequence, kind="stable")
+    logic_conditions = sort_incidence.logic_conditions
+    rules = []
+    for row in order:
+        start, end = sort_incidence.indptr[row], sort_incidence.indptr[row + 1]
+        cols, required = [], []
+        for num, flag in zip(sort_incidence.test_nums[start:end], sort_incidence.result_flags[start:end]):
+            if flag not in (RESULT_PASS, RESULT_FAIL):
+                continue  # Unknown result byte: the condition never holds
+            if int(num) in column_of:
+                cols.append(column_of[int(num)])
+                required.append(OUTCOME_PASS if flag == RESULT_PASS else OUTCOME_FAIL)
+        has_unmatchable = len(cols) < end - start
+        rules.append((
+            logic_conditions[row], int(sort_incidence.bin_number[row]),
+            np.array(cols, dtype=np.int64), np.array(required, dtype=np.int8), has_unmatchable,
+        ))
+
+    bins = np.full(num_devices, unbinned, dtype=np.int64)
+    for lo in range(0, num_devices, chunk_size):
+        chunk = np.asarray(outcomes[lo:lo + chunk_size], dtype=np.int8)
+        chunk_bins = bins[lo:lo + chunk_size]
+        open_rows = np.ones(len(chunk), dtype=bool)
+
+        for logic, bin_number, cols, required, has_unmatchable in rules:
+            if not open_rows.any():
+                break
+            if logic == "REJECT":
+                hit = open_rows
+            elif logic == "ALL PASS":
+                hit = open_rows & (chunk != OUTCOME_FAIL).all(axis=1) & (chunk == OUTCOME_PASS).any(axis=1)
+            elif logic in ("AND", "ALL"):
+                if not len(cols) or has_unmatchable:
+                    continue
+                hit = open_rows & (chunk[:, cols] == required).all(axis=1)
+            elif logic in ("OR", "OSC"):
+                if not len(cols):
+                    continue
+                hit = open_rows & (chunk[:, cols] == required).any(axis=1)
+            else:
+                continue  # Unknown logic byte: never taken
+            chunk_bins[hit] = bin_number
+            open_rows &= ~hit
+
+    return bins
+
+
+def bin_distribution(bins):
+    """Devices and share per bin, largest first."""
+    values, counts = np.unique(np.asarray(bins), return_counts=True)
+    summary = pd.DataFrame({"BinNumber": values, "Devices": counts})
+    summary["Share"] = summary["Devices"] / max(int(counts.sum()), 1)
+    return summary.sort_values(["Devices", "BinNumber"], ascending=[False, True]).reset_index(drop=True)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Predict per-device bins of a .tst sort plan from a pass/fail datalog."
+    )
+    parser.add_argument("program", help=".tst program whose sort plans are simulated")
+    parser.add_argument("datalog", help="Outcomes as .csv or .npy")
+    parser.add_argument("--values", action="store_true",
+                        help="The datalog holds measured values; judge them against the program's limits")
+    parser.add_argument("--bins-out", help="Also write the bin of every device as CSV")
+    parser.add_argument("-o", "--output", help="Write the bin distribution as CSV (default: print it)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    warn = lambda message: print(message, file=sys.stderr)
+    try:
+        with MappedTstFile(args.program) as tst:
+            if args.values:
+                program = NormalizedProgram.from_bytes(tst.data, warn=warn)
+                sort_incidence = program.sort_incidence
+            else:
+                _, sort_incidence = tst.sections(warn=warn)
+        if args.values:
+            if program.tests is None:
+                raise ValueError(f"{args.program} has no test plans to judge values against")
+            values, test_numbers = load_measurements(args.datalog)
+            outcomes, test_numbers = outcomes_from_values(program.mirrored_tests, values, test_numbers, warn=warn)
+        else:
+            outcomes, test_numbers = load_outcomes(args.datalog)
+    except (OSError, ValueError) as e:
+        print(f"Could not read input: {e}", file=sys.stderr)
+        return 2
+
+    bins = simulate_bins(sort_incidence, outcomes, test_numbers)
+    summary = bin_distribution(bins)
+
+    if args.bins_out:
+        pd.DataFrame({"Device": np.arange(len(bins)), "BinNumber": bins}).to_csv(args.bins_out, index=False)
+    if args.output:
+        summary.to_csv(args.output, index=False)
+    else:
+        print(summary.to_string(index=False))
+    print(f"{len(bins)} device(s), {len(summary)} bin(s) from {os.path.basename(args.program)}",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+# tst_cache.py
+# Content-hash keyed, size-bounded LRU cache of parsed + normalized programs.
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from tst_program import NormalizedProgram
+
+
+def content_key(data):
+    """Hash of the raw file bytes; identical uploads share one cache entry."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def frame_nbytes(df):
+    """Approximate memory held by a DataFrame (0 for None)."""
+    if df is None:
+        return 0
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+# Frames a NormalizedProgram builds on first use, after it was cached
+DERIVED_FRAMES = ("_mirrored_tests", "_sorts", "_sort_bins")
+
+
+def derived_state(program):
+    """Which of the DERIVED_FRAMES the program holds so far."""
+    return tuple(getattr(program, name) is not None for name in DERIVED_FRAMES)
+
+
+def program_nbytes(program):
+    """
+    Approximate memory held by a NormalizedProgram: the test table, the
+    compact sort plan and whichever derived frames (SAME-mirrored tests,
+    wide sorts, sort bins) have been built.
+    """
+    sort_incidence = program.sort_incidence
+    nbytes = frame_nbytes(program.tests) + (sort_incidence.nbytes if sort_incidence is not None else 0)
+    return nbytes + sum(frame_nbytes(getattr(program, name)) for name in DERIVED_FRAMES)
+
+
+class ProgramCache:
+    """
+    LRU cache of NormalizedProgram objects keyed by content_key(data).
+
+    Entries are evicted least-recently-used first once either the total
+    estimated size exceeds max_bytes or the entry count exceeds
+    max_entries. An entry larger than max_bytes on its own is never kept.
+    Programs grow as their derived frames are built, so a cached program
+    is re-measured on a hit when its derived_state() changed.
+
+    Cached programs are shared between callers (and Streamlit sessions);
+    treat their DataFrames as read-only and .copy() before modifying.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, max_entries=2048):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (value, nbytes, state)
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        """Cached value for key (marking it most recently used) or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, nbytes, state=None):
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (value, nbytes, state)
+            self.current_bytes += nbytes
+            while self._entries and (
+                self.current_bytes > self.max_bytes or len(self._entries) > self.max_entries
+            ):
+                _, (_, evicted_bytes, _) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_bytes
+
+    def _put_program(self, key, program):
+        self.put(key, program, program_nbytes(program), derived_state(program))
+
+    def _remeasure(self, key, program):
+        """Re-count a cached program whose derived frames were built since it was measured."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] is program and entry[2] != derived_state(program):
+            self._put_program(key, program)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        return {
+            "Entries": len(self._entries),
+            "Bytes": self.current_bytes,
+            "MaxBytes": self.max_bytes,
+            "Hits": self.hits,
+            "Misses": self.misses,
+        }
+
+    def get_program(self, data, warn=print, timings=None):
+        """
+        NormalizedProgram for the given file bytes, parsed on a miss only.
+
+        Parser warnings are stored with the program and replayed through
+        `warn` on every hit, so a cached rerun shows the same messages.
+        `timings` (dict, optional) receives "parse" and "normalize" seconds
+        on a miss, or the "cache" lookup seconds (hashing included) on a hit.
+        """
+        started = time.perf_counter()
+        key = content_key(data)
+        program = self.get(key)
+        if program is None:
+            program = NormalizedProgram.from_bytes(data, warn=lambda message: None, timings=timings)
+            self._put_program(key, program)
+        else:
+            self._remeasure(key, program)
+            if timings is not None:
+                timings["cache"] = time.perf_counter() - started
+
+        for message in program.warnings:
+            warn(message)
+        return program
+
+    def get_programs(self, datas, warn=print, timings=None):
+        """
+        get_program for a batch of files: the misses are parsed and their
+        test tables normalized in one pass (NormalizedProgram.from_bytes_batch).
+
+        `timings` (list, optional) receives one dict per file, filled as by
+        get_program. Identical files in the batch are parsed once.
+        """
+        programs = [None] * len(datas)
+        keys = []
+        misses = {}  # key -> first position
+        for k, data in enumerate(datas):
+            started = time.perf_counter()
+            key = content_key(data)
+            keys.append(key)
+            if key in misses:
+                if timings is not None:
+                    timings[k]["cache"] = time.perf_counter() - started
+                continue
+            programs[k] = self.get(key)
+            if programs[k] is None:
+                misses[key] = k
+                continue
+            self._remeasure(key, programs[k])
+            if timings is not None:
+                timings[k]["cache"] = time.perf_counter() - started
+
+        positions = list(misses.values())
+        built = NormalizedProgram.from_bytes_batch(
+            [datas[k] for k in positions], warn=lambda message: None,
+            timings=[timings[k] for k in positions] if timings is not None else None,
+        )
+        for key, k, program in zip(misses, positions, built):
+            programs[k] = program
+            self._put_program(key, program)
+        by_key = dict(zip(misses, built))
+        for k, key in enumerate(keys):
+            if programs[k] is None:
+                programs[k] = by_key[key]
+
+        for program in programs:
+            for message in program.warnings:
+                warn(message)
+        return programs
@@ -0,0 +1,491 @@
+# tst_catalog.py
+# Persistent SQLite catalog of parsed programs and their validation results.
+#
+#   python tst_catalog.py add library/ --db tst_catalog.sqlite
+#   python tst_catalog.py query "SELECT * FROM tests WHERE ItemName = 'HFE' AND Bias2_num > 20"
+#   python tst_catalog.py query --example "ALL PASS bin is not 1" -o not_bin1.csv
+#
+# Tables (test and sort rows are stored once per distinct file content):
+#   programs        file_name -> file_hash, sizes, paper spec, expected bin
+#   tests           normalized test rows (display columns + "<col>_num")
+#   sorts           one row per sort block
+#   sort_conditions (sort row, test number, PASS/FAIL) pairs
+#   spec_mappings   compiled paper-spec plans, by spec file name
+#   issues          every issue of every VALIDATION_RULES rule, per program
+# Indexed on ItemName, Sequence, BinNumber and file_hash, so fleet-wide
+# questions are answered without re-parsing any binary.
+import argparse
+import contextlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from tst_cache import content_key
+from tst_fleet import Fleet
+from tst_parser import NUMERIC_SUFFIX, SI_VALUE_COLUMNS, TEST_COLUMN_ORDER
+from tst_program import NormalizedProgram
+from tst_reader import MappedTstFile, find_tst_files
+from tst_rules import VALIDATION_RULES, spec_path_for
+from tst_sorts import result_label
+from tst_specs import spec_catalog_for
+
+SCHEMA_VERSION = 1
+
+TEST_COLUMNS = TEST_COLUMN_ORDER + [f"{col}{NUMERIC_SUFFIX}" for col in SI_VALUE_COLUMNS]
+SORT_COLUMNS = ["SortSequence", "LogicCondition", "BinNumber", "UserName"]
+SPEC_COLUMNS = ["ItemName", "Parameter", "Comparator", "SeqValue", "Sequence", "SpecValue", "SpecNum"]
+
+# Authorizer actions query() lets through; everything else (ATTACH, PRAGMA,
+# writes, temp tables, ...) is denied
+QUERY_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION}
+_DENIED_ACTION_NAMES = {
+    getattr(sqlite3, f"SQLITE_{name}"): name
+    for name in ("ATTACH", "DETACH", "PRAGMA", "INSERT", "UPDATE", "DELETE", "TRANSACTION", "SAVEPOINT",
+                 "CREATE_TABLE", "CREATE_TEMP_TABLE", "CREATE_VIEW", "CREATE_TEMP_VIEW", "CREATE_INDEX",
+                 "CREATE_TEMP_INDEX", "DROP_TABLE", "DROP_VIEW", "DROP_INDEX", "ALTER_TABLE", "RECURSIVE")
+}
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _column_type(name):
+    if name == "Sequence":
+        return "INTEGER"
+    return "REAL" if name.endswith(NUMERIC_SUFFIX) else "TEXT"
+
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS programs (
+    file_name TEXT PRIMARY KEY,
+    file_hash TEXT NOT NULL,
+    size INTEGER,
+    num_tests INTEGER,
+    num_sorts INTEGER,
+    spec_name TEXT,
+    expected_bin_number INTEGER,
+    added_at REAL
+);
+CREATE INDEX IF NOT EXISTS programs_file_hash ON programs (file_hash);
+
+CREATE TABLE IF NOT EXISTS tests (
+    file_hash TEXT NOT NULL,
+    row INTEGER NOT NULL,
+    {", ".join(f"{_quote(col)} {_column_type(col)}" for col in TEST_COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS tests_file_hash ON tests (file_hash, "Sequence");
+CREATE INDEX IF NOT EXISTS tests_item_name ON tests ("ItemName");
+CREATE INDEX IF NOT EXISTS tests_sequence ON tests ("Sequence");
+
+CREATE TABLE IF NOT EXISTS sorts (
+    file_hash TEXT NOT NULL,
+    row INTEGER NOT NULL,
+    "SortSequence" INTEGER,
+    "LogicCondition" TEXT,
+    "BinNumber" INTEGER,
+    "UserName" TEXT
+);
+CREATE INDEX IF NOT EXISTS sorts_file_hash ON sorts (file_hash, row);
+CREATE INDEX IF NOT EXISTS sorts_bin_number ON sorts ("BinNumber");
+
+CREATE TABLE IF NOT EXISTS sort_conditions (
+    file_hash TEXT NOT NULL,
+    row INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    test_number INTEGER,
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS sort_conditions_file_hash ON sort_conditions (file_hash, row);
+CREATE INDEX IF NOT EXISTS sort_conditions_test_number ON sort_conditions (test_number);
+
+CREATE TABLE IF NOT EXISTS spec_mappings (
+    spec_name TEXT NOT NULL,
+    "ItemName" TEXT,
+    "Parameter" TEXT,
+    "Comparator" TEXT,
+    "SeqValue" TEXT,
+    "Sequence" REAL,
+    "SpecValue" TEXT,
+    "SpecNum" REAL
+);
+CREATE INDEX IF NOT EXISTS spec_mappings_spec_name ON spec_mappings (spec_name, "Sequence");
+CREATE INDEX IF NOT EXISTS spec_mappings_item_name ON spec_mappings ("ItemName");
+
+CREATE TABLE IF NOT EXISTS issues (
+    file_name TEXT NOT NULL,
+    file_hash TEXT NOT NULL,
+    rule TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    item_name TEXT,
+    message TEXT,
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS issues_file_name ON issues (file_name, rule);
+CREATE INDEX IF NOT EXISTS issues_file_hash ON issues (file_hash);
+CREATE INDEX IF NOT EXISTS issues_rule ON issues (rule);
+"""
+
+# Canned questions for the query tab / --example
+EXAMPLE_QUERIES = {
+    "Programs using HFE with Bias2 > 20": """
+SELECT p.file_name, t."Sequence", t."ItemName", t."Bias2", t."Limit-L", t."Limit-H"
+FROM tests t JOIN programs p ON p.file_hash = t.file_hash
+WHERE t."ItemName" = 'HFE' AND t."Bias2_num" > 20
+ORDER BY p.file_name, t."Sequence"
+""",
+    "ALL PASS bin is not 1": """
+SELECT p.file_name, s."SortSequence", s."BinNumber", s."UserName"
+FROM sorts s JOIN programs p ON p.file_hash = s.file_hash
+WHERE s."LogicCondition" = 'ALL PASS' AND s."BinNumber" <> 1
+ORDER BY p.file_name
+""",
+    "Issues per rule": """
+SELECT rule, COUNT(DISTINCT file_name) AS programs, COUNT(*) AS issues
+FROM issues GROUP BY rule ORDER BY issues DESC
+""",
+    "Programs per ItemName": """
+SELECT t."ItemName", COUNT(DISTINCT p.file_name) AS programs, COUNT(*) AS tests
+FROM tests t JOIN programs p ON p.file_hash = t.file_hash
+GROUP BY t."ItemName" ORDER BY programs DESC
+""",
+    "Tests not covered by the spec": """
+SELECT p.file_name, t."Sequence", t."ItemName"
+FROM programs p JOIN tests t ON t.file_hash = p.file_hash
+WHERE p.spec_name IS NOT NULL AND NOT EXISTS (
+    SELECT 1 FROM spec_mappings m WHERE m.spec_name = p.spec_name AND m."Sequence" = t."Sequence"
+)
+ORDER BY p.file_name, t."Sequence"
+""",
+}
+
+
+def _sql_values(values):
+    """Object array with NaN / NA as None and numpy scalars as Python ones."""
+    out = np.asarray(values, dtype=object).copy()
+    for pos, value in enumerate(out):
+        if value is None or value is pd.NA or (isinstance(value, float) and np.isnan(value)):
+            out[pos] = None
+        elif isinstance(value, np.generic):
+            out[pos] = value.item()
+    return out
+
+
+def _frame_rows(df, columns, *prefix):
+    """Rows of df[columns] (missing columns as NULL) for executemany, each led by `prefix`."""
+    values = [
+        _sql_values(df[col].to_numpy(dtype=object)) if col in df.columns else np.full(len(df), None, dtype=object)
+        for col in columns
+    ]
+    return [prefix + (row,) + tuple(v[row] for v in values) for row in range(len(df))]
+
+
+def _issue_row(file_name, file_hash, rule, position, issue):
+    if isinstance(issue, dict):
+        message = issue.get("Error") or issue.get("Reason") or str(issue)
+        item_name = issue.get("ItemName")
+        detail = json.dumps({k: v for k, v in issue.items()}, default=str)
+    else:
+        message, item_name, detail = str(issue), None, None
+    return (file_name, file_hash, rule, position, None if item_name is None else str(item_name), message, detail)
+
+
+def load_programs(datas, warn=print):
+    """
+    NormalizedPrograms for many files' bytes, normalized in one batch; when
+    the batch fails, file by file with None for each file that cannot be
+    parsed (reported through `warn`).
+    """
+    try:
+        return NormalizedProgram.from_bytes_batch(datas, warn=lambda message: None)
+    except Exception:
+        pass
+    programs = []
+    for k, data in enumerate(datas):
+        try:
+            programs.append(NormalizedProgram.from_bytes(data, warn=lambda message: None))
+        except Exception as e:
+            warn(f"File {k + 1}: could not parse: {type(e).__name__}: {e}")
+            programs.append(None)
+    return programs
+
+
+class ProgramCatalog:
+    """
+    The SQLite catalog at `path` (created on first use).
+
+    Each call opens its own connection, so one catalog can be shared
+    between threads (and Streamlit sessions); writes are serialized by a
+    lock. query() runs on a read-only, query_only connection that may
+    only read.
+    """
+
+    def __init__(self, path="tst_catalog.sqlite"):
+        self.path = os.path.abspath(path)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    @contextlib.contextmanager
+    def _connect(self, read_only=False):
+        if read_only:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        else:
+            conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def __len__(self):
+        with self._connect(read_only=True) as conn:
+            return conn.execute("SELECT COUNT(*) FROM programs").fetchone()[0]
+
+    def stats(self):
+        """Row counts of every table."""
+        with self._connect(read_only=True) as conn:
+            return {
+                table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("programs", "tests", "sorts", "sort_conditions", "spec_mappings", "issues")
+            }
+
+    def file_hashes(self):
+        """{file_name: file_hash} of every catalogued program."""
+        with self._connect(read_only=True) as conn:
+            return dict(conn.execute("SELECT file_name, file_hash FROM programs"))
+
+    def add_programs(self, file_names, datas, programs=None, expected_bin_number=1,
+                     spec_dir="paper-spec", spec_catalog=None, warn=print):
+        """
+        Catalog programs with the issues of every VALIDATION_RULES rule.
+
+        Files already catalogued with the same content (and expected bin)
+        are skipped; a file name with new content replaces its old rows.
+
+        Args:
+            file_names (list): Names of the .tst files.
+            datas (list): Their bytes.
+            programs (list, optional): NormalizedPrograms already built for
+                datas (e.g. from the program cache); parsed here otherwise.
+            expected_bin_number (int): BinNumber required for 'ALL PASS'.
+            spec_dir (str): Directory holding the paper-spec CSVs.
+            spec_catalog (SpecCatalog, optional): Compiled paper specs.
+            warn (callable): Receives files that cannot be parsed.
+
+        Returns:
+            int: Number of programs added or replaced.
+        """
+        hashes = [content_key(data) for data in datas]
+        known = self.file_hashes()
+        with self._connect(read_only=True) as conn:
+            known_bins = dict(conn.execute("SELECT file_name, expected_bin_number FROM programs"))
+        todo = [
+            k for k, (name, file_hash) in enumerate(zip(file_names, hashes))
+            if known.get(name) != file_hash or known_bins.get(name) != expected_bin_number
+        ]
+        todo = list({file_names[k]: k for k in todo}.values())  # last upload of a name wins
+        if not todo:
+            return 0
+
+        if programs is None:
+            built = load_programs([datas[k] for k in todo], warn=warn)
+        else:
+            built = [programs[k] for k in todo]
+        ok = [(k, program) for k, program in zip(todo, built) if program is not None]
+        names = [file_names[k] for k, _ in ok]
+        spec_catalog = spec_catalog or spec_catalog_for(spec_dir)
+        results = Fleet(names, [program for _, program in ok]).validate(
+            list(VALIDATION_RULES.items()), expected_bin_number=expected_bin_number,
+            spec_dir=spec_dir, catch_errors=True, spec_catalog=spec_catalog, warn=lambda message: None,
+        )
+
+        specs = {}
+        for name in names:
+            spec_path = spec_path_for(name, spec_dir)
+            if os.path.isfile(spec_path):
+                try:
+                    specs[os.path.basename(spec_path)] = spec_catalog.plan(spec_path)
+                except Exception as e:
+                    warn(f"{os.path.basename(spec_path)}: could not read spec: {e}")
+
+        with self._lock, self._connect() as conn:
+            stored = {row[0] for row in conn.execute("SELECT DISTINCT file_hash FROM programs")}
+            for (k, program), all_errors in zip(ok, results):
+                name, file_hash = file_names[k], hashes[k]
+                spec_name = os.path.basename(spec_path_for(name, spec_dir))
+                conn.execute("DELETE FROM issues WHERE file_name = ?", (name,))
+                conn.execute(
+                    "INSERT OR REPLACE INTO programs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (name, file_hash, len(datas[k]),
+                     0 if program.tests is None else len(program.tests),
+                     0 if program.sort_incidence is None else len(program.sort_incidence),
+                     spec_name if spec_name in specs else None, expected_bin_number, time.time()),
+                )
+                if file_hash not in stored:
+                    self._insert_content(conn, file_hash, program)
+                    stored.add(file_hash)
+                conn.executemany(
+                    "INSERT INTO issues VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [_issue_row(name, file_hash, rule, position, issue)
+                     for rule, errors in all_errors.items() for position, issue in enumerate(errors)],
+                )
+            for spec_name, plan in specs.items():
+                conn.execute("DELETE FROM spec_mappings WHERE spec_name = ?", (spec_name,))
+                conn.executemany(
+                    f"INSERT INTO spec_mappings VALUES (?, {', '.join('?' * len(SPEC_COLUMNS))})",
+                    [(spec_name,) + row[1:] for row in _frame_rows(plan, SPEC_COLUMNS)],
+                )
+            self._drop_orphans(conn)
+        return len(ok)
+
+    def add_files(self, paths, warn=print, **kwargs):
+        """add_programs for .tst files on disk (catalogued by base name)."""
+        file_names, datas = [], []
+        for path in paths:
+            try:
+                with MappedTstFile(path) as tst:
+                    datas.append(bytes(tst.data))
+                file_names.append(os.path.basename(path))
+            except (OSError, ValueError) as e:
+                warn(f"{path}: could not read file: {e}")
+        return self.add_programs(file_names, datas, warn=warn, **kwargs)
+
+    def remove(self, file_name):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM programs WHERE file_name = ?", (file_name,))
+            conn.execute("DELETE FROM issues WHERE file_name = ?", (file_name,))
+            self._drop_orphans(conn)
+
+    @staticmethod
+    def _insert_content(conn, file_hash, program):
+        if program.tests is not None:
+            conn.executemany(
+                f"INSERT INTO tests VALUES (?, ?, {', '.join('?' * len(TEST_COLUMNS))})",
+                _frame_rows(program.tests, TEST_COLUMNS, file_hash),
+            )
+        incidence = program.sort_incidence
+        if incidence is not None and len(incidence):
+            conn.executemany(
+                f"INSERT INTO sorts VALUES (?, ?, {', '.join('?' * len(SORT_COLUMNS))})",
+                _frame_rows(incidence.bins, SORT_COLUMNS, file_hash),
+            )
+            rows = np.repeat(np.arange(len(incidence)), np.diff(incidence.indptr))
+            positions = np.arange(len(rows)) - incidence.indptr[rows]
+            labels = {flag: result_label(flag) for flag in np.unique(incidence.result_flags).tolist()}
+            conn.executemany(
+                "INSERT INTO sort_conditions VALUES (?, ?, ?, ?, ?)",
+                [(file_hash, row, position, test_number, labels[flag]) for row, position, test_number, flag in zip(
+                    rows.tolist(), positions.tolist(), incidence.test_nums.tolist(), incidence.result_flags.tolist(),
+                )],
+            )
+
+    @staticmethod
+    def _drop_orphans(conn):
+        """Delete content rows no program refers to any more."""
+        for table in ("tests", "sorts", "sort_conditions"):
+            conn.execute(f"DELETE FROM {table} WHERE file_hash NOT IN (SELECT file_hash FROM programs)")
+
+    def query(self, sql, params=()):
+        """
+        Result of one read-only SQL statement as a DataFrame.
+
+        Raises:
+            ValueError: The statement does more than read (ATTACH, PRAGMA,
+                writes, temp tables, ...); nothing of it was run.
+        """
+        denied = []
+
+        def authorize(action, arg1, arg2, db_name, trigger):
+            if action in QUERY_ACTIONS:
+                return sqlite3.SQLITE_OK
+            denied.append(" ".join(str(part) for part in (_DENIED_ACTION_NAMES.get(action, action), arg1) if part))
+            return sqlite3.SQLITE_DENY
+
+        with self._connect(read_only=True) as conn:
+            conn.execute("PRAGMA query_only = ON")
+            conn.set_authorizer(authorize)
+            try:
+                return pd.read_sql_query(sql, conn, params=params)
+            except (sqlite3.Error, pd.errors.DatabaseError):
+                if denied:
+                    raise ValueError(f"only SELECT statements are allowed (denied: {denied[0]})") from None
+                raise
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Build and query a SQLite catalog of .tst programs and their validation issues."
+    )
+    parser.add_argument("--db", default="tst_catalog.sqlite", help="Catalog file (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="Parse, validate and catalog .tst files")
+    add.add_argument("sources", nargs="+", help="Directories, files or glob patterns")
+    add.add_argument("--pattern", default="*.tst", help="File pattern inside directories (default: %(default)s)")
+    add.add_argument("--spec-dir", default="paper-spec",
+                     help="Directory of paper-spec CSVs (default: %(default)s)")
+    add.add_argument("--expected-bin", type=int, default=1,
+                     help="Expected BinNumber for 'ALL PASS' (default: %(default)s)")
+
+    query = commands.add_parser("query", help="Run a read-only SQL query")
+    query.add_argument("sql", nargs="?", help="SQL statement")
+    query.add_argument("--example", choices=sorted(EXAMPLE_QUERIES), help="Run a canned query instead")
+    query.add_argument("-o", "--output", help="Write the result as CSV (default: print)")
+
+    commands.add_parser("stats", help="Row counts of the catalog tables")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    catalog = ProgramCatalog(args.db)
+
+    if args.command == "add":
+        paths = []
+        for source in args.sources:
+            paths.extend(find_tst_files(source, args.pattern))
+        paths = list(dict.fromkeys(paths))
+        if not paths:
+            print("No .tst files found.", file=sys.stderr)
+            return 2
+        added = catalog.add_files(
+            paths, expected_bin_number=args.expected_bin, spec_dir=args.spec_dir,
+            warn=lambda message: print(message, file=sys.stderr),
+        )
+        print(f"{added} program(s) added or updated, {len(catalog)} in {args.db}", file=sys.stderr)
+        return 0
+
+    if args.command == "query":
+        sql = EXAMPLE_QUERIES[args.example] if args.example else args.sql
+        if not sql:
+            print("Give an SQL statement or --example.", file=sys.stderr)
+            return 2
+        try:
+            df = catalog.query(sql)
+        except ValueError as e:
+            print(f"Query rejected: {e}", file=sys.stderr)
+            return 2
+        except (sqlite3.Error, pd.errors.DatabaseError) as e:
+            print(f"Query failed: {e}", file=sys.stderr)
+            return 2
+        if args.output:
+            df.to_csv(args.output, index=False)
+        else:
+            print(df.to_string(index=False))
+        return 0
+
+    for table, count in catalog.stats().items():
+        print(f"{table:16} {count}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
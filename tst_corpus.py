@@ -0,0 +1,246 @@
+# tst_corpus.py
+# Synthetic .tst programs for benchmarks and sharing, no customer data.
+#
+#   python tst_corpus.py corpus/ -n 1000
+#   python tst_corpus.py corpus/ -n 10000 --tests 20-200 --like programs/ --seed 7
+#
+# Items are drawn from code_name_map (uniformly, or with the ItemName
+# frequencies of a sample library given with --like). Programs follow the
+# house layout the validation rules expect: PassBranch 0, every fail
+# branches past the last test, one ALL PASS row, OR rows that together fail every test, one
+# OSC and one REJECT row. --defect-rate breaks that layout on some rows so
+# the rules have something to report.
+#
+# Every program is written with encode_tst, so decoding and re-encoding a
+# generated file gives the same bytes.
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from tst_derived import DERIVED_ITEMS, RATIO_LIMIT_ITEMS
+from tst_parser import (
+    LIMIT_SUFFIX_MAP, VALUE_SUFFIX_MAP, calc_si, decode_limit_with_suffix, decode_value_with_suffix,
+)
+from tst_reader import MappedTstFile, find_tst_files
+from tst_rules import CLAMP_CHECK_ITEMS
+from tst_sorts import RESULT_FAIL, SortIncidence
+from tst_writer import ITEM_CODES, encode_tst
+
+# Items whose Bias1 (and Bias2 for two-operand codes) name an earlier Sequence
+REFERENCE_ITEMS = {"SAME": 1}
+REFERENCE_ITEMS.update({
+    name: sum(kind == "seq" for kind in kinds) for name, (kinds, _) in DERIVED_ITEMS.items()
+})
+
+# Suffix codes drawn for each field (mostly u / m / unit scale)
+LIMIT_CODES = list(range(4, 13))
+BIAS_CODES = list(range(4, 16))
+TIME_CODES = list(range(6, 10))
+
+# Bias column kept at or below 20 (validate_bias_lowvolt_for_special_items)
+LOW_BIAS_ITEMS = {
+    "Bias1": {"VFEC", "VFBE", "VCESAT", "VBESAT", "IDON", "RDON", "VFSD", "VDSON", "VFGS"},
+    "Bias2": {"HFE", "BTON"},
+}
+
+PASS_BIN = 1
+
+
+def item_weights(paths=None):
+    """
+    Probability per ItemName: uniform over the encodable code_name_map
+    items, or the ItemName frequencies of the given .tst files.
+    """
+    if not paths:
+        names = sorted(ITEM_CODES)
+        return pd.Series(1.0 / len(names), index=names)
+
+    counts = pd.Series(dtype=np.float64)
+    for path in paths:
+        with MappedTstFile(path) as tst:
+            df_tests, _ = tst.sections(warn=lambda message: None)
+        if df_tests is not None:
+            counts = counts.add(df_tests["ItemName"].value_counts(), fill_value=0)
+    counts = counts[counts.index.isin(list(ITEM_CODES))]
+    if counts.empty:
+        raise ValueError("no known ItemName in the sample programs")
+    return counts / counts.sum()
+
+
+def _si_texts(rng, count, digits, codes, suffix_map, high=None):
+    """count SI texts with raw BCD values 1 .. high (default: all digits) and the given suffix codes."""
+    raw = rng.integers(1, (high or 10 ** digits - 1) + 1, size=count)
+    code = rng.choice(codes, size=count)
+    decode = decode_limit_with_suffix if suffix_map is LIMIT_SUFFIX_MAP else decode_value_with_suffix
+    return np.array([decode(int(r), int(c)) for r, c in zip(raw, code)], dtype=object)
+
+
+def generate_tests(rng, num_tests, weights, defect_rate=0.0):
+    """Raw test table (as parse_tst_sections decodes it) of num_tests rows."""
+    names = rng.choice(weights.index.to_numpy(dtype=object), size=num_tests, p=weights.to_numpy())
+    # The first test has nothing to refer to
+    if num_tests and names[0] in REFERENCE_ITEMS:
+        plain = weights[~weights.index.isin(list(REFERENCE_ITEMS))]
+        names[0] = plain.idxmax()
+
+    limit = _si_texts(rng, num_tests, 4, LIMIT_CODES, LIMIT_SUFFIX_MAP)
+    bias1 = _si_texts(rng, num_tests, 3, BIAS_CODES, VALUE_SUFFIX_MAP)
+    bias2 = _si_texts(rng, num_tests, 3, BIAS_CODES, VALUE_SUFFIX_MAP)
+    test_time = _si_texts(rng, num_tests, 3, TIME_CODES, VALUE_SUFFIX_MAP)
+
+    limit_type = np.where(rng.random(num_tests) < 0.3, "Min", "Max").astype(object)
+    for column, items in LOW_BIAS_ITEMS.items():
+        rows = np.isin(names, list(items))
+        low_bias = _si_texts(rng, int(rows.sum()), 3, [11], VALUE_SUFFIX_MAP, high=200)  # 0.1 - 20.0
+        (bias1 if column == "Bias1" else bias2)[rows] = low_bias
+    # Clamp items: a uA-range upper limit under a Bias2 of at least 10 mV
+    clamp = np.isin(names, list(CLAMP_CHECK_ITEMS))
+    limit[clamp] = _si_texts(rng, int(clamp.sum()), 4, [4, 5, 6], LIMIT_SUFFIX_MAP)
+    bias2[clamp] = _si_texts(rng, int(clamp.sum()), 3, [10, 11, 12], VALUE_SUFFIX_MAP)
+    limit_type[clamp] = "Max"
+
+    for i, name in enumerate(names):
+        operands = REFERENCE_ITEMS.get(name, 0)
+        if operands >= 1:
+            bias1[i] = f"{float(rng.integers(1, i + 1))}"
+        if operands == 2:
+            bias2[i] = f"{float(rng.integers(1, i + 1))}"
+        if name in RATIO_LIMIT_ITEMS:
+            numerator, _ = RATIO_LIMIT_ITEMS[name]
+            if numerator == "Limit":
+                limit[i] = calc_si(limit[i], bias1[i], "/")
+            else:
+                limit[i] = calc_si(bias2[i], limit[i], "/")
+
+    pass_branch = np.full(num_tests, "0", dtype=object)
+    # Branching past the last test goes to sorting (251 itself is SORT)
+    fail_branch = np.full(num_tests, str(num_tests + 1) if num_tests + 1 < 251 else "SORT", dtype=object)
+    cb1 = np.zeros(num_tests, dtype=bool)
+    cb2 = np.ones(num_tests, dtype=bool)
+    defects = rng.random(num_tests) < defect_rate
+    for i in np.flatnonzero(defects):
+        target = str(int(rng.integers(1, num_tests + 1)))
+        if rng.random() < 0.5:
+            pass_branch[i], cb1[i] = target, True
+        else:
+            fail_branch[i] = target
+
+    flag = lambda p: rng.random(num_tests) < p
+    return pd.DataFrame({
+        "Sequence": np.arange(1, num_tests + 1),
+        "ItemName": names,
+        "Limit": limit,
+        "LimitType": limit_type,
+        "Bias1": bias1,
+        "Bias2": bias2,
+        "TestTime": test_time,
+        "PassBranch": pass_branch,
+        "FailBranch": fail_branch,
+        "RV": flag(0.1),
+        "Oi": flag(0.05),
+        "Ai": flag(0.05),
+        "AR": flag(0.2),
+        "Di": flag(0.05),
+        "C/B1": cb1,
+        "C/B2": cb2,
+        "CP": flag(0.1),
+        "AC": flag(0.02),
+    })
+
+
+def generate_sorts(rng, num_tests, num_or_rows, defect_rate=0.0):
+    """
+    Sort plans: ALL PASS, num_or_rows OR rows that split the tests between
+    them (FAIL conditions), then OSC and REJECT.
+    """
+    tests = rng.permutation(np.arange(1, num_tests + 1))
+    if defect_rate and len(tests) and rng.random() < defect_rate:
+        tests = tests[:-1]  # one test no OR row catches
+    groups = [np.sort(group) for group in np.array_split(tests, max(num_or_rows, 1)) if len(group)]
+
+    logic = [0x80] + [0x02] * len(groups) + [0x04, 0x08]
+    conditions = [np.empty(0, dtype=np.int64)] + groups + [np.empty(0, dtype=np.int64)] * 2
+    num_rows = len(logic)
+    bins = [PASS_BIN] + list(range(PASS_BIN + 1, PASS_BIN + num_rows))
+    indptr = np.concatenate(([0], np.cumsum([len(c) for c in conditions])))
+    test_nums = np.concatenate(conditions) if conditions else np.empty(0, dtype=np.int64)
+    return SortIncidence(
+        np.arange(1, num_rows + 1), logic, bins, [f"BIN{b:02d}" for b in bins],
+        indptr, test_nums, np.full(len(test_nums), RESULT_FAIL),
+    )
+
+
+def generate_program(rng, num_tests, weights, num_or_rows=None, defect_rate=0.0):
+    """(.tst bytes, raw test table, SortIncidence) of one synthetic program."""
+    df_tests = generate_tests(rng, num_tests, weights, defect_rate)
+    if num_or_rows is None:
+        num_or_rows = int(rng.integers(1, min(max(num_tests // 4, 1), 250) + 1))
+    sort_incidence = generate_sorts(rng, num_tests, num_or_rows, defect_rate)
+    return encode_tst(df_tests, sort_incidence), df_tests, sort_incidence
+
+
+def write_corpus(out_dir, num_programs, tests=(20, 120), weights=None, seed=0, defect_rate=0.0):
+    """
+    Write num_programs synthetic programs to out_dir as SYN00000.tst, ...
+
+    The same seed always gives the same files.
+
+    Returns:
+        list: Paths written.
+    """
+    rng = np.random.default_rng(seed)
+    weights = item_weights() if weights is None else weights
+    os.makedirs(out_dir, exist_ok=True)
+    width = max(len(str(num_programs - 1)), 5)
+    paths = []
+    for k in range(num_programs):
+        num_tests = int(rng.integers(tests[0], tests[1] + 1))
+        data, _, _ = generate_program(rng, num_tests, weights, defect_rate=defect_rate)
+        path = os.path.join(out_dir, f"SYN{k:0{width}d}.tst")
+        with open(path, "wb") as f:
+            f.write(data)
+        paths.append(path)
+    return paths
+
+
+def _test_range(text):
+    low, _, high = text.partition("-")
+    low, high = int(low), int(high or low)
+    if not 1 <= low <= high <= 255:
+        raise argparse.ArgumentTypeError(f"test count range must be within 1-255, got {text}")
+    return low, high
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Write a synthetic corpus of .tst programs.")
+    parser.add_argument("out_dir", help="Directory to write the programs to")
+    parser.add_argument("-n", "--programs", type=int, default=100, help="Number of programs (default: 100)")
+    parser.add_argument("--tests", type=_test_range, default=(20, 120),
+                        help="Tests per program, N or MIN-MAX (default: 20-120)")
+    parser.add_argument("--like", help="Sample .tst file, directory or glob pattern whose ItemName mix to copy")
+    parser.add_argument("--defect-rate", type=float, default=0.0,
+                        help="Share of rows (and programs, for sorts) that break the house layout")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    try:
+        weights = item_weights(find_tst_files(args.like) if args.like else None)
+    except (OSError, ValueError) as e:
+        print(f"Could not read sample programs: {e}", file=sys.stderr)
+        return 2
+
+    paths = write_corpus(args.out_dir, args.programs, args.tests, weights, args.seed, args.defect_rate)
+    total = sum(os.path.getsize(path) for path in paths)
+    print(f"Wrote {len(paths)} program(s), {total} bytes, to {args.out_dir}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+# tst_derived.py
+# Numeric, vectorized evaluation of derived (computational) test items.
+#
+# Operands follow the SAME convention: Bias1 / Bias2 hold the Sequence of the
+# test whose value is used (A / B), except where an operand is a constant.
+#
+#   ADD     A + B            ABSDEL  |A - B|
+#   MULTI   A * B            SQRT    sqrt(A)
+#   DIVID   A / B            POW     A ** Bias2   (Bias2 is the exponent)
+#   CMPDIV  A / B            LOG     ln(A)
+#   DEF     Bias1 (constant) LOG10   log10(A)
+#
+# Ratio limits (the RDON / HFE special cases of the parser) are computed
+# here too, as numbers; the parser formats them for display and keeps the
+# number as the limit's "_exact" column. tst_binsim --values evaluates derived
+# items over a datalog of measured values.
+import numpy as np
+import pandas as pd
+
+from tst_units import si_series_to_float
+
+# name -> (operand kinds, function); "seq" operands are values of the
+# referenced test, "const" operands are the bias value itself
+DERIVED_ITEMS = {
+    "ADD": (("seq", "seq"), np.add),
+    "MULTI": (("seq", "seq"), np.multiply),
+    "DIVID": (("seq", "seq"), np.divide),
+    "CMPDIV": (("seq", "seq"), np.divide),
+    "ABSDEL": (("seq", "seq"), lambda a, b: np.abs(a - b)),
+    "SQRT": (("seq",), np.sqrt),
+    "POW": (("seq", "const"), np.power),
+    "LOG": (("seq",), np.log),
+    "LOG10": (("seq",), np.log10),
+    "DEF": (("const",), lambda a: a),
+}
+
+# ItemName -> (numerator column, denominator column) of its displayed limit
+RATIO_LIMIT_ITEMS = {
+    "RDON": ("Limit", "Bias1"),
+    "HRDON": ("Limit", "Bias1"),
+    "RDON-": ("Limit", "Bias1"),
+    "HRDON-": ("Limit", "Bias1"),
+    "HFE": ("Bias2", "Limit"),
+    "HHFE": ("Bias2", "Limit"),
+}
+
+
+def ratio_limit_values(item_names, columns):
+    """
+    Numeric limits of the ratio items (RDON = Limit / Bias1,
+    HFE = Bias2 / Limit).
+
+    Args:
+        item_names (array-like): ItemName per row.
+        columns (dict): "Limit", "Bias1", "Bias2" -> float arrays.
+
+    Returns:
+        tuple: (values, applies) float and bool arrays; values are NaN
+        where the item is not a ratio item, inf/NaN where the
+        denominator is zero.
+    """
+    item_names = np.asarray(item_names, dtype=object)
+    values = np.full(len(item_names), np.nan)
+    applies = np.zeros(len(item_names), dtype=bool)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for name, (numerator, denominator) in RATIO_LIMIT_ITEMS.items():
+            rows = item_names == name
+            if rows.any():
+                values[rows] = columns[numerator][rows] / columns[denominator][rows]
+                applies |= rows
+    return values, applies
+
+
+class DerivedPlan:
+    """
+    The derived items of one test table, compiled once.
+
+    Attributes:
+        rows (np.ndarray): Row position of each derived item.
+        items (list): ItemName of each derived item.
+        operands (list): Per item, a tuple of ("seq", row position or -1)
+            / ("const", value) operands.
+    """
+
+    def __init__(self, df_tests):
+        item_names = df_tests["ItemName"].to_numpy(dtype=object)
+        bias = {
+            col: (df_tests[f"{col}_num"] if f"{col}_num" in df_tests.columns
+                  else si_series_to_float(df_tests[col])).to_numpy(dtype=np.float64)
+            for col in ("Bias1", "Bias2")
+        }
+        sequences = pd.Index(df_tests["Sequence"].to_numpy())
+        first_pos = pd.Series(np.arange(len(df_tests)), index=sequences)[~sequences.duplicated()]
+
+        self.num_tests = len(df_tests)
+        self.sequences = df_tests["Sequence"].to_numpy()
+        self.rows = np.flatnonzero(np.isin(item_names, list(DERIVED_ITEMS)))
+        self.items = [item_names[row] for row in self.rows]
+        self.operands = []
+        for row, item in zip(self.rows, self.items):
+            kinds, _ = DERIVED_ITEMS[item]
+            operands = []
+            for kind, col in zip(kinds, ("Bias1", "Bias2")):
+                value = bias[col][row]
+                if kind == "const":
+                    operands.append(("const", value))
+                else:
+                    pos = first_pos.get(np.trunc(value), -1) if np.isfinite(value) else -1
+                    operands.append(("seq", int(pos)))
+            self.operands.append(tuple(operands))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def evaluate(self, measurements, warn=print):
+        """
+        Fill in the derived items over a whole datalog.
+
+        Args:
+            measurements (array-like): (devices x tests) float values, one
+                column per test row (1-D for a single device).
+            warn (callable): Receives a message per item that cannot be
+                evaluated (missing or circular reference); it stays NaN.
+
+        Returns:
+            np.ndarray: Copy of measurements with derived columns computed.
+        """
+        values = np.array(measurements, dtype=np.float64, copy=True)
+        single = values.ndim == 1
+        if single:
+            values = values[None, :]
+        if values.shape[1] != self.num_tests:
+            raise ValueError(f"expected {self.num_tests} test columns, got {values.shape[1]}")
+
+        derived_rows = set(self.rows.tolist())
+        values[:, self.rows] = np.nan
+        done = set()
+        pending = list(range(len(self.rows)))
+        with np.errstate(all="ignore"):
+            # Items referring to other derived items wait until those are done
+            while pending:
+                progressed = []
+                for k in pending:
+                    refs = [pos for kind, pos in self.operands[k] if kind == "seq"]
+                    if any(pos in derived_rows and pos not in done for pos in refs):
+                        continue
+                    _, func = DERIVED_ITEMS[self.items[k]]
+                    args = [
+                        np.full(len(values), pos) if kind == "const"
+                        else values[:, pos] if pos >= 0 else np.full(len(values), np.nan)
+                        for kind, pos in self.operands[k]
+                    ]
+                    values[:, self.rows[k]] = func(*args)
+                    done.add(int(self.rows[k]))
+                    progressed.append(k)
+                    if any(pos < 0 for pos in refs):
+                        warn(f"{self.items[k]} at Sequence {self.sequences[self.rows[k]]} "
+                             f"refers to a missing Sequence")
+                if not progressed:
+                    for k in pending:
+                        warn(f"{self.items[k]} at Sequence {self.sequences[self.rows[k]]} "
+                             f"is part of a circular reference")
+                    break
+                pending = [k for k in pending if k not in progressed]
+
+        return values[0] if single else values
+
+
+def evaluate_derived(df_tests, measurements, warn=print):
+    """DerivedPlan(df_tests).evaluate(measurements) in one call."""
+    return DerivedPlan(df_tests).evaluate(measurements, warn=warn)
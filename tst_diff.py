@@ -0,0 +1,426 @@
+# tst_diff.py
+# Revision diff of .tst programs, aligned on Sequence and item signature.
+#
+#   python tst_diff.py released/KF5N50F.tst new/KF5N50F.tst
+#   python tst_diff.py released/ revisions/ -o diff_summary.csv --details diff_details.csv
+#
+# Tests of the two revisions are paired in passes, each over the rows not
+# paired yet:
+#   1. same Sequence and same content              -> unchanged
+#   2. same content at another Sequence            -> moved
+#   3. same Sequence and signature (ItemName+biases) -> changed
+#   4. same signature at another Sequence          -> moved and changed
+#   5. same Sequence and ItemName                  -> changed (biases too)
+# and whatever is left is deleted (baseline) or inserted (revision). Paired
+# tests that keep their order (longest increasing run) but not their number
+# are only renumbered; the others are moved when their Sequence changed and
+# reordered (same Sequence, another block position) when it did not. The
+# content of a row is one hash over its decoded columns, so unchanged rows
+# cost a dict lookup. Sort bins are paired by BinNumber and their
+# conditions compared after renumbering baseline tests to the revision.
+import argparse
+import bisect
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from tst_cache import content_key
+from tst_parser import TEST_COLUMN_ORDER
+from tst_program import NormalizedProgram
+from tst_reader import MappedTstFile, find_tst_files
+from tst_sorts import result_label
+
+# Decoded columns compared between revisions (Sequence is the alignment key)
+DIFF_COLUMNS = [col for col in TEST_COLUMN_ORDER if col != "Sequence"]
+SIGNATURE_COLUMNS = ["ItemName", "Bias1", "Bias2"]
+
+TEST_CHANGE_COLUMNS = ["Kind", "OldSequence", "NewSequence", "ItemName", "Field", "Old", "New"]
+SORT_CHANGE_COLUMNS = ["Kind", "BinNumber", "Field", "Old", "New"]
+
+
+def row_hashes(df_tests, columns=DIFF_COLUMNS):
+    """One uint64 per test row over the given decoded columns."""
+    columns = [col for col in columns if col in df_tests.columns]
+    return pd.util.hash_pandas_object(df_tests[columns], index=False).to_numpy()
+
+
+def _keys(*columns):
+    """Row keys (tuples) over the given arrays."""
+    return list(zip(*columns)) if len(columns) > 1 else list(columns[0])
+
+
+def _pair(old_keys, new_keys, old_free, new_free):
+    """Pair still unpaired rows with equal keys, first come first served."""
+    waiting = {}
+    for pos in np.flatnonzero(old_free):
+        waiting.setdefault(old_keys[pos], []).append(pos)
+    pairs = []
+    for pos in np.flatnonzero(new_free):
+        queue = waiting.get(new_keys[pos])
+        if queue:
+            pairs.append((queue.pop(0), pos))
+    for old_pos, new_pos in pairs:
+        old_free[old_pos] = False
+        new_free[new_pos] = False
+    return pairs
+
+
+def align_tests(old_tests, new_tests):
+    """
+    Pair the rows of two normalized test tables (see the passes above).
+
+    Returns:
+        tuple: (pairs, deleted, inserted) where pairs is a list of
+        (old row, new row) positions and deleted / inserted are the row
+        positions left over on each side.
+    """
+    old_seq = old_tests["Sequence"].to_numpy()
+    new_seq = new_tests["Sequence"].to_numpy()
+    old_hash, new_hash = row_hashes(old_tests), row_hashes(new_tests)
+    old_sig = _keys(*(old_tests[col].to_numpy(dtype=object) for col in SIGNATURE_COLUMNS))
+    new_sig = _keys(*(new_tests[col].to_numpy(dtype=object) for col in SIGNATURE_COLUMNS))
+    old_item = old_tests["ItemName"].to_numpy(dtype=object)
+    new_item = new_tests["ItemName"].to_numpy(dtype=object)
+
+    old_free = np.ones(len(old_tests), dtype=bool)
+    new_free = np.ones(len(new_tests), dtype=bool)
+    pairs = []
+    for old_keys, new_keys in (
+        (_keys(old_seq, old_hash), _keys(new_seq, new_hash)),
+        (_keys(old_hash), _keys(new_hash)),
+        (_keys(old_seq, old_sig), _keys(new_seq, new_sig)),
+        (old_sig, new_sig),
+        (_keys(old_seq, old_item), _keys(new_seq, new_item)),
+    ):
+        if not old_free.any() or not new_free.any():
+            break
+        pairs.extend(_pair(old_keys, new_keys, old_free, new_free))
+    return pairs, np.flatnonzero(old_free), np.flatnonzero(new_free)
+
+
+def _in_order(positions):
+    """Mask of a longest increasing subsequence of positions."""
+    tails, tail_index, previous = [], [], [-1] * len(positions)
+    for k, pos in enumerate(positions):
+        i = bisect.bisect_left(tails, pos)
+        if i == len(tails):
+            tails.append(pos)
+            tail_index.append(k)
+        else:
+            tails[i] = pos
+            tail_index[i] = k
+        previous[k] = tail_index[i - 1] if i else -1
+    mask = np.zeros(len(positions), dtype=bool)
+    k = tail_index[-1] if tail_index else -1
+    while k >= 0:
+        mask[k] = True
+        k = previous[k]
+    return mask
+
+
+class ProgramDiff:
+    """
+    Differences between a baseline and a revision of one program.
+
+    Attributes:
+        tests (pd.DataFrame): One row per inserted / deleted / moved /
+            reordered test and per changed field (TEST_CHANGE_COLUMNS);
+            a reordered row's Old / New are its block positions.
+        sorts (pd.DataFrame): One row per added / removed sort bin and per
+            changed bin field (SORT_CHANGE_COLUMNS).
+        counts (dict): Unchanged, Renumbered, Inserted, Deleted, Moved,
+            Reordered and Changed tests;
+            SortAdded, SortRemoved and SortChanged bins.
+    """
+
+    def __init__(self, tests, sorts, counts):
+        self.tests = tests
+        self.sorts = sorts
+        self.counts = counts
+
+    @property
+    def identical(self):
+        return self.tests.empty and self.sorts.empty
+
+    def summary(self):
+        return dict(self.counts)
+
+
+def _empty_counts():
+    return {"Unchanged": 0, "Renumbered": 0, "Inserted": 0, "Deleted": 0, "Moved": 0, "Reordered": 0,
+            "Changed": 0, "SortAdded": 0, "SortRemoved": 0, "SortChanged": 0}
+
+
+def diff_tests(old_tests, new_tests):
+    """
+    Test changes between two normalized test tables.
+
+    Returns:
+        tuple: (changes DataFrame, counts dict, {old Sequence: new Sequence}
+        for every paired test)
+    """
+    counts = _empty_counts()
+    old_tests = old_tests if old_tests is not None else pd.DataFrame(columns=TEST_COLUMN_ORDER)
+    new_tests = new_tests if new_tests is not None else pd.DataFrame(columns=TEST_COLUMN_ORDER)
+    pairs, deleted, inserted = align_tests(old_tests, new_tests)
+
+    old_seq = old_tests["Sequence"].to_numpy()
+    new_seq = new_tests["Sequence"].to_numpy()
+    old_item = old_tests["ItemName"].to_numpy(dtype=object)
+    new_item = new_tests["ItemName"].to_numpy(dtype=object)
+    old_hash, new_hash = row_hashes(old_tests), row_hashes(new_tests)
+    columns = [col for col in DIFF_COLUMNS if col in old_tests.columns and col in new_tests.columns]
+    old_values = {col: old_tests[col].to_numpy(dtype=object) for col in columns}
+    new_values = {col: new_tests[col].to_numpy(dtype=object) for col in columns}
+
+    rows = []
+    pairs = sorted(pairs, key=lambda pair: pair[1])
+    in_order = _in_order([old_pos for old_pos, _ in pairs])
+    for (old_pos, new_pos), kept in zip(pairs, in_order):
+        same = old_hash[old_pos] == new_hash[new_pos]
+        if not kept and old_seq[old_pos] == new_seq[new_pos]:
+            counts["Reordered"] += 1
+            rows.append(("reordered", int(old_seq[old_pos]), int(new_seq[new_pos]), new_item[new_pos],
+                         "Position", int(old_pos), int(new_pos)))
+        elif not kept:
+            counts["Moved"] += 1
+            rows.append(("moved", int(old_seq[old_pos]), int(new_seq[new_pos]), new_item[new_pos],
+                         "Sequence", int(old_seq[old_pos]), int(new_seq[new_pos])))
+        elif old_seq[old_pos] != new_seq[new_pos]:
+            counts["Renumbered"] += 1
+        if same:
+            if kept and old_seq[old_pos] == new_seq[new_pos]:
+                counts["Unchanged"] += 1
+            continue
+        counts["Changed"] += 1
+        for col in columns:
+            old_value, new_value = old_values[col][old_pos], new_values[col][new_pos]
+            if old_value != new_value:
+                rows.append(("changed", int(old_seq[old_pos]), int(new_seq[new_pos]), new_item[new_pos],
+                             col, old_value, new_value))
+    for pos in deleted:
+        counts["Deleted"] += 1
+        rows.append(("deleted", int(old_seq[pos]), None, old_item[pos], "", None, None))
+    for pos in inserted:
+        counts["Inserted"] += 1
+        rows.append(("inserted", None, int(new_seq[pos]), new_item[pos], "", None, None))
+
+    changes = pd.DataFrame(rows, columns=TEST_CHANGE_COLUMNS, dtype=object)
+    changes[["OldSequence", "NewSequence"]] = changes[["OldSequence", "NewSequence"]].astype("Int64")
+    sequence_map = {int(old_seq[o]): int(new_seq[n]) for o, n in pairs}
+    return changes, counts, sequence_map
+
+
+def _conditions(sort_incidence, row, sequence_map=None):
+    """Set of (test number, result) of one sort row, renumbered through sequence_map."""
+    tests = sort_incidence.tests_of(row)
+    results = sort_incidence.result_flags[sort_incidence.indptr[row]:sort_incidence.indptr[row + 1]]
+    if sequence_map is not None:
+        # Tests that are gone keep their baseline number, negated so they never match
+        tests = [sequence_map.get(int(t), -int(t)) for t in tests]
+    return {(int(t), int(r)) for t, r in zip(tests, results)}
+
+
+def _condition_text(conditions):
+    return " ".join(f"{abs(t)}:{result_label(r)}" for t, r in sorted(conditions, key=lambda c: (abs(c[0]), c[1])))
+
+
+def diff_sorts(old_incidence, new_incidence, sequence_map):
+    """
+    Sort bin changes; bins are paired by BinNumber (repeats in row order)
+    and baseline test numbers renumbered with sequence_map first.
+
+    Returns:
+        tuple: (changes DataFrame, counts dict)
+    """
+    counts = {"SortAdded": 0, "SortRemoved": 0, "SortChanged": 0}
+    old_len = len(old_incidence) if old_incidence is not None else 0
+    new_len = len(new_incidence) if new_incidence is not None else 0
+    old_free = np.ones(old_len, dtype=bool)
+    new_free = np.ones(new_len, dtype=bool)
+    old_bins = old_incidence.bin_number.tolist() if old_len else []
+    new_bins = new_incidence.bin_number.tolist() if new_len else []
+    pairs = _pair(old_bins, new_bins, old_free, new_free)
+    old_logic = old_incidence.logic_conditions if old_len else []
+    new_logic = new_incidence.logic_conditions if new_len else []
+
+    rows = []
+    for old_row, new_row in sorted(pairs, key=lambda pair: pair[1]):
+        bin_number = int(new_bins[new_row])
+        fields = {
+            "LogicCondition": (old_logic[old_row], new_logic[new_row]),
+            "UserName": (old_incidence.user_name[old_row], new_incidence.user_name[new_row]),
+        }
+        old_conditions = _conditions(old_incidence, old_row, sequence_map)
+        new_conditions = _conditions(new_incidence, new_row)
+        changed = [(field, old, new) for field, (old, new) in fields.items() if old != new]
+        if old_conditions != new_conditions:
+            changed.append(("Conditions", _condition_text(old_conditions - new_conditions),
+                            _condition_text(new_conditions - old_conditions)))
+        counts["SortChanged"] += bool(changed)
+        rows.extend(("changed", bin_number, field, old, new) for field, old, new in changed)
+    for row in np.flatnonzero(old_free):
+        counts["SortRemoved"] += 1
+        rows.append(("removed", int(old_bins[row]), "", old_logic[row], None))
+    for row in np.flatnonzero(new_free):
+        counts["SortAdded"] += 1
+        rows.append(("added", int(new_bins[row]), "", None, new_logic[row]))
+    changes = pd.DataFrame(rows, columns=SORT_CHANGE_COLUMNS, dtype=object)
+    changes["BinNumber"] = changes["BinNumber"].astype("Int64")
+    return changes, counts
+
+
+def diff_programs(old, new):
+    """ProgramDiff between two NormalizedPrograms (baseline, revision)."""
+    test_changes, counts, sequence_map = diff_tests(old.tests, new.tests)
+    sort_changes, sort_counts = diff_sorts(old.sort_incidence, new.sort_incidence, sequence_map)
+    counts.update(sort_counts)
+    return ProgramDiff(test_changes, sort_changes, counts)
+
+
+def diff_bytes(old_data, new_data, warn=print):
+    """ProgramDiff between two .tst files' bytes; identical files are not parsed."""
+    if content_key(old_data) == content_key(new_data):
+        return _identical_diff(NormalizedProgram.from_bytes(new_data, warn=warn))
+    old, new = NormalizedProgram.from_bytes_batch([old_data, new_data], warn=warn)
+    return diff_programs(old, new)
+
+
+def _identical_diff(program=None, num_tests=None):
+    counts = _empty_counts()
+    counts["Unchanged"] = num_tests if num_tests is not None else (
+        len(program.tests) if program is not None and program.tests is not None else 0
+    )
+    return ProgramDiff(pd.DataFrame(columns=TEST_CHANGE_COLUMNS), pd.DataFrame(columns=SORT_CHANGE_COLUMNS), counts)
+
+
+def _parse_or_none(data):
+    try:
+        return NormalizedProgram.from_bytes(data, warn=lambda message: None)
+    except Exception:
+        return None
+
+
+def diff_directories(baseline_dir, revision_dir, pattern="*.tst", warn=print):
+    """
+    Diff every revision against the baseline file of the same name.
+
+    Byte-identical pairs are counted without parsing; all other files are
+    parsed with their test tables normalized in one batch.
+
+    Returns:
+        tuple: (summary DataFrame, one row per file with a Status of
+        identical / changed / added / removed / unreadable and the counts; details
+        DataFrame of all test and sort changes with File and Section)
+    """
+    baseline = {os.path.basename(path): path for path in find_tst_files(baseline_dir, pattern)}
+    revision = {os.path.basename(path): path for path in find_tst_files(revision_dir, pattern)}
+    names = sorted(set(baseline) | set(revision))
+
+    def read(path):
+        with MappedTstFile(path) as tst:
+            return bytes(tst.data)
+
+    summary, to_parse, datas = [], [], []
+    for name in names:
+        if name not in baseline or name not in revision:
+            summary.append({"File": name, "Status": "added" if name in revision else "removed"})
+            continue
+        try:
+            old_data, new_data = read(baseline[name]), read(revision[name])
+        except (OSError, ValueError) as e:
+            warn(f"{name}: could not read file: {e}")
+            summary.append({"File": name, "Status": "unreadable"})
+            continue
+        if content_key(old_data) == content_key(new_data):
+            num_test_plans = new_data[9] if len(new_data) > 9 else 0  # header count, no parse needed
+            summary.append({"File": name, "Status": "identical", **_identical_diff(num_tests=num_test_plans).counts})
+            continue
+        summary.append({"File": name})
+        to_parse.append(len(summary) - 1)
+        datas.extend([old_data, new_data])
+
+    try:
+        programs = NormalizedProgram.from_bytes_batch(datas, warn=lambda message: None)
+    except Exception:
+        # One bad file fails the whole batch; parse file by file instead
+        programs = [_parse_or_none(data) for data in datas]
+    details = []
+    for k, index in enumerate(to_parse):
+        old, new = programs[2 * k], programs[2 * k + 1]
+        if old is None or new is None:
+            warn(f"{summary[index]['File']}: could not parse the {'baseline' if old is None else 'revision'}")
+            summary[index]["Status"] = "unreadable"
+            continue
+        result = diff_programs(old, new)
+        summary[index].update({"Status": "identical" if result.identical else "changed", **result.counts})
+        name = summary[index]["File"]
+        if not result.tests.empty:
+            details.append(result.tests.assign(File=name, Section="Tests"))
+        if not result.sorts.empty:
+            details.append(result.sorts.assign(File=name, Section="Sorts"))
+
+    summary_df = pd.DataFrame(summary, columns=["File", "Status"] + list(_empty_counts()))
+    count_columns = list(_empty_counts())
+    summary_df[count_columns] = summary_df[count_columns].astype("Int64")
+    detail_columns = ["File", "Section", "Kind", "OldSequence", "NewSequence", "BinNumber", "ItemName",
+                      "Field", "Old", "New"]
+    details_df = pd.concat(details, ignore_index=True) if details else pd.DataFrame(columns=detail_columns)
+    details_df = details_df.reindex(columns=detail_columns)
+    details_df[["OldSequence", "NewSequence", "BinNumber"]] = \
+        details_df[["OldSequence", "NewSequence", "BinNumber"]].astype("Int64")
+    return summary_df, details_df
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Compare .tst program revisions against a baseline (files or directories)."
+    )
+    parser.add_argument("baseline", help="Baseline .tst file or directory")
+    parser.add_argument("revision", help="Revision .tst file or directory")
+    parser.add_argument("-o", "--output", help="Summary CSV (directories; default: print)")
+    parser.add_argument("--details", help="Also write every test and sort change as CSV")
+    parser.add_argument("--pattern", default="*.tst",
+                        help="File pattern inside directories (default: %(default)s)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if os.path.isdir(args.baseline) and os.path.isdir(args.revision):
+        summary_df, details_df = diff_directories(
+            args.baseline, args.revision, args.pattern, warn=lambda message: print(message, file=sys.stderr),
+        )
+        if args.output:
+            summary_df.to_csv(args.output, index=False)
+        else:
+            print(summary_df.to_string(index=False))
+        if args.details:
+            details_df.to_csv(args.details, index=False)
+        changed = summary_df[summary_df["Status"] != "identical"]
+        print(f"{len(summary_df)} program(s), {len(changed)} changed, added or removed", file=sys.stderr)
+        return 1 if not changed.empty else 0
+
+    try:
+        with MappedTstFile(args.baseline) as old, MappedTstFile(args.revision) as new:
+            result = diff_bytes(bytes(old.data), bytes(new.data), warn=lambda message: None)
+    except (OSError, ValueError) as e:
+        print(f"Could not read file: {e}", file=sys.stderr)
+        return 2
+
+    print(", ".join(f"{key} {value}" for key, value in result.counts.items()))
+    if not result.tests.empty:
+        print(result.tests.to_string(index=False))
+    if not result.sorts.empty:
+        print(result.sorts.to_string(index=False))
+    if args.details:
+        pd.concat([result.tests.assign(Section="Tests"), result.sorts.assign(Section="Sorts")],
+                  ignore_index=True).to_csv(args.details, index=False)
+    return 1 if not result.identical else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+# tst_export.py
+# Typed columnar export (Parquet, Arrow IPC stream) of fleet tables.
+#
+#   python tst_export.py programs/ -o exports/
+#       -> exports/tests.parquet, exports/sorts.parquet, exports/issues.parquet
+#   python tst_export.py programs/ -o exports/ --format arrow
+#
+# The tables keep their dtypes (Sequence and BinNumber as integers, the
+# "<col>_num" twins as float64, text as strings), so readers skip CSV
+# parsing. The Arrow IPC stream is written in record batches and can be
+# read batch by batch. export_downloads() hands the UI callables, so the
+# bytes are only built when a download is requested.
+import argparse
+import io
+import json
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+from tst_parser import NUMERIC_SUFFIX, SI_VALUE_COLUMNS, TEST_COLUMN_ORDER
+from tst_sorts import result_label
+
+EXPORT_FORMATS = {
+    "csv": {"label": "CSV", "extension": "csv", "mime": "text/csv"},
+    "parquet": {"label": "Parquet", "extension": "parquet", "mime": "application/vnd.apache.parquet"},
+    "arrow": {"label": "Arrow IPC", "extension": "arrows", "mime": "application/vnd.apache.arrow.stream"},
+}
+
+ARROW_BATCH_ROWS = 64 * 1024
+
+TEST_EXPORT_COLUMNS = ["File"] + TEST_COLUMN_ORDER + [f"{col}{NUMERIC_SUFFIX}" for col in SI_VALUE_COLUMNS]
+SORT_EXPORT_COLUMNS = ["File", "SortRow", "SortSequence", "LogicCondition", "BinNumber", "UserName",
+                       "Position", "TestNumber", "Result"]
+ISSUE_EXPORT_COLUMNS = ["File", "Validation", "Position", "ItemName", "Message", "Detail"]
+
+
+def available_formats():
+    """Export formats usable here (Parquet and Arrow need pyarrow)."""
+    return [fmt for fmt in EXPORT_FORMATS if fmt == "csv" or pa is not None]
+
+
+# --- Tables ---
+
+def fleet_test_table(file_names, programs):
+    """Normalized test rows of every program, led by a File column."""
+    frames = [
+        program.tests.assign(File=name) for name, program in zip(file_names, programs)
+        if program is not None and program.tests is not None
+    ]
+    if not frames:
+        return pd.DataFrame(columns=TEST_EXPORT_COLUMNS)
+    df = pd.concat(frames, ignore_index=True)
+    return df[[col for col in TEST_EXPORT_COLUMNS if col in df.columns]]
+
+
+def fleet_sort_table(file_names, programs):
+    """
+    Sort incidence of every program in long form: one row per (sort block,
+    condition), with bins that have no conditions kept once (TestNumber NA).
+    """
+    frames = []
+    for name, program in zip(file_names, programs):
+        incidence = program.sort_incidence if program is not None else None
+        if incidence is None or not len(incidence):
+            continue
+        bins = incidence.bins.assign(File=name, SortRow=np.arange(len(incidence)))
+        rows = np.repeat(np.arange(len(incidence)), np.diff(incidence.indptr))
+        conditions = pd.DataFrame({
+            "SortRow": rows,
+            "Position": np.arange(len(rows)) - incidence.indptr[rows],
+            "TestNumber": incidence.test_nums,
+            "Result": pd.Series([result_label(flag) for flag in incidence.result_flags.tolist()], dtype="string"),
+        })
+        frames.append(bins.merge(conditions, on="SortRow", how="left"))
+    if not frames:
+        return pd.DataFrame(columns=SORT_EXPORT_COLUMNS)
+    df = pd.concat(frames, ignore_index=True)[SORT_EXPORT_COLUMNS]
+    return df.astype({"Position": "Int64", "TestNumber": "Int64"})
+
+
+def issue_table(file_names, results):
+    """
+    One row per issue of {label: issues} results (one dict per file); dict
+    issues keep their fields as JSON in Detail.
+    """
+    rows = []
+    for name, all_errors in zip(file_names, results):
+        for label, errors in (all_errors or {}).items():
+            for position, issue in enumerate(errors):
+                if isinstance(issue, dict):
+                    message = issue.get("Error") or issue.get("Reason") or str(issue)
+                    item_name = issue.get("ItemName")
+                    detail = json.dumps(issue, default=str)
+                else:
+                    message, item_name, detail = str(issue), None, None
+                rows.append((name, label, position, None if item_name is None else str(item_name), message, detail))
+    df = pd.DataFrame(rows, columns=ISSUE_EXPORT_COLUMNS)
+    return df.astype({"Position": "int64", "File": "string", "Validation": "string", "ItemName": "string",
+                      "Message": "string", "Detail": "string"})
+
+
+_INTEGER_TEXT = re.compile(r"^[+-]?(0|[1-9][0-9]*)$")
+_FLOAT_TEXT = re.compile(r"^[+-]?((0|[1-9][0-9]*)(\.[0-9]*)?|\.[0-9]+)([eE][+-]?[0-9]+)?$")
+
+
+def typed_text_table(df):
+    """
+    Copy of a table of text fields (as read from report files) with each
+    column typed: Int64 when every non-blank value is an integer, Float64
+    when every one is a number, string otherwise. Values with leading zeros
+    ("007") keep the column a string.
+    """
+    typed = {}
+    for col in df.columns:
+        text = df[col].astype("string").str.strip()
+        filled = text[text.notna() & (text != "")]
+        if len(filled) and filled.str.fullmatch(_INTEGER_TEXT).all():
+            typed[col] = pd.to_numeric(text.replace("", pd.NA)).astype("Int64")
+        elif len(filled) and filled.str.fullmatch(_FLOAT_TEXT).all():
+            typed[col] = pd.to_numeric(text.replace("", pd.NA)).astype("Float64")
+        else:
+            typed[col] = df[col].astype("string")
+    return pd.DataFrame(typed, index=df.index)
+
+
+# --- Serialization ---
+
+def _arrow_ready(df):
+    """Object columns Arrow cannot type (mixed values) as strings; the index dropped."""
+    df = df.reset_index(drop=True)
+    for col in df.columns:
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True).startswith("mixed"):
+            df[col] = df[col].map(lambda value: value if value is None or value is pd.NA else str(value))
+    return df
+
+
+def _require_pyarrow(fmt):
+    if pa is None:
+        raise RuntimeError(f"{EXPORT_FORMATS[fmt]['label']} export needs pyarrow (pip install pyarrow).")
+
+
+def to_parquet_bytes(df):
+    _require_pyarrow("parquet")
+    buffer = io.BytesIO()
+    _arrow_ready(df).to_parquet(buffer, index=False, engine="pyarrow")
+    return buffer.getvalue()
+
+
+def to_arrow_stream_bytes(df, batch_rows=ARROW_BATCH_ROWS):
+    """Arrow IPC stream of df, `batch_rows` rows per record batch."""
+    _require_pyarrow("arrow")
+    table = pa.Table.from_pandas(_arrow_ready(df), preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=batch_rows):
+            writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def export_bytes(df, fmt):
+    """df serialized as "parquet", "arrow" (IPC stream) or "csv"."""
+    if fmt == "parquet":
+        return to_parquet_bytes(df)
+    if fmt == "arrow":
+        return to_arrow_stream_bytes(df)
+    if fmt == "csv":
+        return df.to_csv(index=False).encode("utf-8")
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+def export_downloads(build, base_name, formats=None, typed=None):
+    """
+    (format label, data callable, file name, mime) per format for download
+    buttons; build() is called only when a callable is. `typed` (optional)
+    is applied to the table for Parquet / Arrow only, so CSV stays as built.
+    """
+    def data(fmt):
+        df = build()
+        return export_bytes(typed(df) if typed is not None and fmt != "csv" else df, fmt)
+
+    return [
+        (EXPORT_FORMATS[fmt]["label"], lambda fmt=fmt: data(fmt),
+         f"{base_name}.{EXPORT_FORMATS[fmt]['extension']}", EXPORT_FORMATS[fmt]["mime"])
+        for fmt in (formats or available_formats())
+    ]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Export the test table, sort incidence and issues of .tst programs as Parquet / Arrow."
+    )
+    parser.add_argument("sources", nargs="+", help="Directories, files or glob patterns")
+    parser.add_argument("-o", "--output-dir", default=".", help="Directory to write to (default: %(default)s)")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="parquet",
+                        help="File format (default: %(default)s)")
+    parser.add_argument("--pattern", default="*.tst", help="File pattern inside directories (default: %(default)s)")
+    parser.add_argument("--spec-dir", default="paper-spec",
+                        help="Directory of paper-spec CSVs (default: %(default)s)")
+    parser.add_argument("--expected-bin", type=int, default=1,
+                        help="Expected BinNumber for 'ALL PASS' (default: %(default)s)")
+    parser.add_argument("--no-issues", action="store_true", help="Skip validation and the issue table")
+    return parser
+
+
+def main(argv=None):
+    from tst_catalog import load_programs
+    from tst_fleet import Fleet
+    from tst_reader import MappedTstFile, find_tst_files
+    from tst_rules import VALIDATION_RULES
+    from tst_specs import spec_catalog_for
+
+    args = build_parser().parse_args(argv)
+    if args.format not in available_formats():
+        print(f"{EXPORT_FORMATS[args.format]['label']} export needs pyarrow.", file=sys.stderr)
+        return 2
+
+    paths = []
+    for source in args.sources:
+        paths.extend(find_tst_files(source, args.pattern))
+    paths = list(dict.fromkeys(paths))
+    if not paths:
+        print("No .tst files found.", file=sys.stderr)
+        return 2
+
+    file_names, datas = [], []
+    for path in paths:
+        try:
+            with MappedTstFile(path) as tst:
+                datas.append(bytes(tst.data))
+            file_names.append(os.path.basename(path))
+        except (OSError, ValueError) as e:
+            print(f"{path}: could not read file: {e}", file=sys.stderr)
+    programs = load_programs(datas, warn=lambda message: print(message, file=sys.stderr))
+
+    tables = {
+        "tests": fleet_test_table(file_names, programs),
+        "sorts": fleet_sort_table(file_names, programs),
+    }
+    if not args.no_issues:
+        names = [name for name, program in zip(file_names, programs) if program is not None]
+        results = Fleet(names, [program for program in programs if program is not None]).validate(
+            list(VALIDATION_RULES.items()), expected_bin_number=args.expected_bin, spec_dir=args.spec_dir,
+            catch_errors=True, spec_catalog=spec_catalog_for(args.spec_dir), warn=lambda message: None,
+        )
+        tables["issues"] = issue_table(names, results)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    extension = EXPORT_FORMATS[args.format]["extension"]
+    for name, df in tables.items():
+        path = os.path.join(args.output_dir, f"{name}.{extension}")
+        with open(path, "wb") as f:
+            f.write(export_bytes(df, args.format))
+        print(f"{path}: {len(df)} row(s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,416 @@
+# tst_fleet.py
+# Fleet mode: VALIDATION_RULES evaluated over many programs at once.
+#
+# The programs of a batch are concatenated into one test table and one sort
+# table, each row tagged with the position of its program (its file code).
+# Every rule then runs once over the whole fleet, grouped by file where it
+# needs a per-program figure (max Sequence, first FailBranch, row counts),
+# and its issues are split back per file. The issues are the same, in the
+# same order, as run_validations gives file by file.
+#
+# Programs the fleet cannot hold (no test table, no sort plans, other test
+# columns) and rules without a fleet form still run file by file.
+import time
+
+import numpy as np
+import pandas as pd
+
+from tst_rules import (
+    CLAMP_CHECK_ITEMS, LOWVOLT_BIAS_ITEMS, RAW_TABLE_RULES, SPECIAL_LOGIC_CONDITIONS, _as_float, _column_values,
+    _map_distinct, _numeric_values, _plain_numeric_values, apply_same_mirroring, apply_spec_plan, compile_spec_plan,
+    issue_message, run_validations, spec_load_error, spec_path_for,
+)
+from tst_sorts import logic_label
+
+
+def _split(num_files, file_codes, issues):
+    """Issue lists per fleet file from issues in fleet row order and their file codes."""
+    per_file = [[] for _ in range(num_files)]
+    for code, issue in zip(file_codes, issues):
+        per_file[code].append(issue)
+    return per_file
+
+
+class Fleet:
+    """
+    Many NormalizedPrograms as one test table and one sort table.
+
+    Attributes:
+        members (np.ndarray): Position (in `programs`) of each fleet file;
+            fleet file codes index this array.
+        fallback (list): Positions of the programs validated file by file.
+        tests (pd.DataFrame): Test tables of the members, concatenated; the
+            index keeps each program's own row labels.
+        test_file (np.ndarray): File code of every tests row.
+        sorts (pd.DataFrame): Narrow sort tables (SortIncidence.bins) of
+            the members, concatenated the same way.
+        sort_file (np.ndarray): File code of every sorts row.
+        condition_row, condition_test (np.ndarray): Sort conditions as
+            (sorts row position, test number) pairs.
+    """
+
+    def __init__(self, file_names, programs):
+        self.file_names = list(file_names)
+        self.programs = list(programs)
+
+        columns = None
+        members = []
+        for k, program in enumerate(self.programs):
+            if program.tests is None or program.tests.empty or program.sort_bins is None:
+                continue
+            if columns is None:
+                columns = list(program.tests.columns)
+            if list(program.tests.columns) == columns:
+                members.append(k)
+        member_set = set(members)
+        self.members = np.array(members, dtype=np.int64)
+        self.fallback = [k for k in range(len(self.programs)) if k not in member_set]
+        self.num_files = len(members)
+        if not members:
+            return
+
+        tables = [self.programs[k].tests for k in members]
+        self.tests = pd.concat(tables)
+        self.test_file = np.repeat(np.arange(self.num_files), [len(df) for df in tables])
+
+        incidences = [self.programs[k].sort_incidence for k in members]
+        sizes = np.array([len(incidence) for incidence in incidences], dtype=np.int64)
+        self.sort_file = np.repeat(np.arange(self.num_files), sizes)
+        starts = np.concatenate(([0], np.cumsum(sizes)))
+        logic_code = np.concatenate([incidence.logic_code for incidence in incidences])
+        self.sorts = pd.DataFrame({
+            "SortSequence": np.concatenate([incidence.sort_sequence for incidence in incidences]),
+            "LogicCondition": _map_distinct(
+                logic_code, lambda code: logic_label(code) if code >= 0 else ""
+            ),
+            "BinNumber": np.concatenate([incidence.bin_number for incidence in incidences]),
+            "UserName": np.concatenate([incidence.user_name for incidence in incidences]),
+        }, index=np.arange(starts[-1]) - np.repeat(starts[:-1], sizes))
+
+        self.condition_row = np.concatenate([
+            incidence.row_of(np.arange(len(incidence.test_nums))) + start
+            for incidence, start in zip(incidences, starts[:-1])
+        ])
+        self.condition_test = np.concatenate([incidence.test_nums for incidence in incidences])
+
+    def __len__(self):
+        return len(self.programs)
+
+    def max_sequence(self, df_tests):
+        """Max Sequence per fleet file (as df_tests["Sequence"].max() of each program)."""
+        return df_tests["Sequence"].groupby(self.test_file).max().to_numpy()
+
+    def validate(self, selected_validations, expected_bin_number=None, spec_dir="paper-spec",
+                 catch_errors=False, spec_catalog=None, timings=None, warn=print):
+        """
+        run_validations for every program; returns one {label: list of issues}
+        per program, in the order of `programs`.
+
+        `timings` (dict, optional) receives the seconds per rule label over the
+        whole fleet (plus "apply_same_mirroring"). SAME mirroring warnings go
+        to `warn`.
+        """
+        results = [{} for _ in self.programs]
+        if not selected_validations:
+            return results
+
+        df_tests_mirrored = None
+        if self.num_files and any(label in FLEET_RULES and label not in RAW_TABLE_RULES
+                                  for label, _ in selected_validations):
+            started = time.perf_counter()
+            df_tests_mirrored = apply_same_mirroring(self.tests, warn=warn, groups=self.test_file)
+            if timings is not None:
+                timings["apply_same_mirroring"] = time.perf_counter() - started
+
+        for label, func in selected_validations:
+            started = time.perf_counter()
+            per_file = None
+            fleet_func = FLEET_RULES.get(label) if self.num_files else None
+            if fleet_func is not None:
+                try:
+                    if label == "Spec & Bias1-2 Correlation":
+                        per_file = fleet_func(self, self.tests, spec_dir, spec_catalog)
+                    elif label in RAW_TABLE_RULES:
+                        per_file = fleet_func(self, self.tests)
+                    elif label == "Once ALL PASS with expected BinNumber":
+                        per_file = fleet_func(self, expected_bin_number)
+                    else:
+                        per_file = fleet_func(self, df_tests_mirrored)
+                except (ValueError, KeyError, TypeError):
+                    # Data the fleet form cannot take (missing column, mixed types):
+                    # run file by file, so errors surface exactly as they would there
+                    per_file = None
+
+            for code, k in enumerate(self.members):
+                if per_file is not None:
+                    results[k][label] = per_file[code]
+                    continue
+                program = self.programs[k]
+                results[k].update(run_validations(
+                    self.file_names[k], program.tests, program.sort_bins, [(label, func)],
+                    expected_bin_number=expected_bin_number, spec_dir=spec_dir,
+                    catch_errors=catch_errors, spec_catalog=spec_catalog,
+                    sort_incidence=program.sort_incidence,
+                    df_tests_mirrored=program.mirrored_tests if label not in RAW_TABLE_RULES else None,
+                ))
+            if timings is not None:
+                timings[label] = time.perf_counter() - started
+
+        for k in self.fallback:
+            results[k] = self.programs[k].validate(
+                self.file_names[k], selected_validations,
+                expected_bin_number=expected_bin_number, spec_dir=spec_dir,
+                catch_errors=catch_errors, spec_catalog=spec_catalog,
+            )
+        return results
+
+
+# --- Test table rules (one fleet form per VALIDATION_RULES entry) ---
+
+def fleet_bv_bias2_gt_limith(fleet, df_tests):
+    """validate_bv_bias2_gt_limith over the fleet."""
+    items = _column_values(df_tests, 'ItemName', '')
+    checked = _map_distinct(
+        items, lambda item: str(item).strip() in CLAMP_CHECK_ITEMS, missing=False,
+    ).astype(bool)
+    # NaN never compares, so unparseable values never violate the rule
+    bad = checked & (_numeric_values(df_tests, 'Bias2') <= _numeric_values(df_tests, 'Limit-H'))
+
+    bias2_raw = _column_values(df_tests, 'Bias2', None)
+    limit_h_raw = _column_values(df_tests, 'Limit-H', None)
+    return _split(fleet.num_files, fleet.test_file[bad], [
+        issue_message("clamp", row=idx, bias2=b2, limit_h=lh, item=str(item).strip())
+        for idx, b2, lh, item in zip(df_tests.index[bad], bias2_raw[bad], limit_h_raw[bad], items[bad])
+    ])
+
+
+def fleet_cb2_all_B(fleet, df_tests):
+    """check_cb2_all_B over the fleet."""
+    cb2 = _column_values(df_tests, "C/B2", None)
+    bad = np.asarray(cb2 != "B", dtype=bool)
+
+    items = _column_values(df_tests, "ItemName", "")
+    return _split(fleet.num_files, fleet.test_file[bad], [
+        issue_message("cb2_not_branch", row=idx, value=cb2_value, item=item)
+        for idx, cb2_value, item in zip(df_tests.index[bad], cb2[bad], items[bad])
+    ])
+
+
+def fleet_failbranch_vs_sequence(fleet, df_tests):
+    """check_failbranch_vs_sequence over the fleet (max Sequence per file)."""
+    max_sequence = fleet.max_sequence(df_tests)
+    row_max = max_sequence[fleet.test_file]
+
+    fail_branch = df_tests["FailBranch"].to_numpy(dtype=object)
+    not_numeric = _map_distinct(fail_branch, lambda val: _as_float(val) is None, missing=False).astype(bool)
+    numeric = _map_distinct(fail_branch, lambda val: _as_float(val) is not None, missing=False).astype(bool)
+    fail_branch_value = _map_distinct(fail_branch, _as_float, missing=None)
+    values = np.where(numeric, fail_branch_value, np.nan).astype(np.float64)
+    too_low = numeric & ~(values > row_max)
+
+    items = _column_values(df_tests, "ItemName", "")
+    bad = np.flatnonzero(not_numeric | too_low)
+    issues = []
+    for pos in bad:
+        idx, item = df_tests.index[pos], items[pos]
+        if not_numeric[pos]:
+            issues.append(issue_message("failbranch_not_numeric", row=idx, value=fail_branch[pos], item=item))
+        else:
+            issues.append(issue_message(
+                "failbranch_in_plan", row=idx, value=fail_branch_value[pos],
+                max_sequence=max_sequence[fleet.test_file[pos]], item=item,
+            ))
+    return _split(fleet.num_files, fleet.test_file[bad], issues)
+
+
+def fleet_failbranch_uniform(fleet, df_tests):
+    """check_failbranch_uniform over the fleet (the first FailBranch of each file is its common value)."""
+    fail_values = df_tests["FailBranch"]
+    common = fail_values.groupby(fleet.test_file).first().to_numpy(dtype=object)[fleet.test_file]
+
+    fail_branch = fail_values.to_numpy(dtype=object)
+    bad = ~pd.isna(fail_branch) & np.asarray(fail_branch != common, dtype=bool)
+
+    items = _column_values(df_tests, "ItemName", "")
+    return _split(fleet.num_files, fleet.test_file[bad], [
+        issue_message("failbranch_not_common", row=idx, value=val, common=common_value, item=item)
+        for idx, val, common_value, item in zip(df_tests.index[bad], fail_branch[bad], common[bad], items[bad])
+    ])
+
+
+def fleet_passbranch_all_zero(fleet, df_tests):
+    """check_passbranch_all_zero over the fleet."""
+    pass_branch = df_tests["PassBranch"].to_numpy(dtype=object)
+    is_zero = _map_distinct(
+        pass_branch, lambda val: bool(pd.to_numeric(val, errors='coerce') == 0), missing=False
+    )
+    bad = ~is_zero.astype(bool)
+
+    items = _column_values(df_tests, "ItemName", "")
+    return _split(fleet.num_files, fleet.test_file[bad], [
+        issue_message("passbranch_not_zero", row=idx, value=val, item=item)
+        for idx, val, item in zip(df_tests.index[bad], pass_branch[bad], items[bad])
+    ])
+
+
+def fleet_bias_lowvolt_for_special_items(fleet, df_tests):
+    """validate_bias_lowvolt_for_special_items over the fleet (Bias1 issues, then Bias2, per file)."""
+    items = df_tests['ItemName'].to_numpy(dtype=object)
+    per_file = [[] for _ in range(fleet.num_files)]
+    for column in ('Bias1', 'Bias2'):
+        values = _plain_numeric_values(df_tests, column)
+        bad = df_tests['ItemName'].isin(LOWVOLT_BIAS_ITEMS[column]).to_numpy() & (values > 20)
+        for code, item, value in zip(fleet.test_file[bad], items[bad], values[bad].tolist()):
+            per_file[code].append({
+                'ItemName': item,
+                column: value,
+                'Error': issue_message("bias_over_limit", item=item, column=column, value=value)
+            })
+    return per_file
+
+
+def fleet_correlate_spec_with_validspec(fleet, df_tests, spec_dir="paper-spec", spec_catalog=None):
+    """
+    correlate_spec_with_validspec over the fleet: the plan of every file is
+    joined to that file's tests in one apply_spec_plan call.
+    """
+    per_file = [[] for _ in range(fleet.num_files)]
+    compiled = {}  # spec path -> plan or load error, without a catalog
+    plans, plan_codes = [], []
+    for code, k in enumerate(fleet.members):
+        spec_path = spec_path_for(fleet.file_names[k], spec_dir)
+        try:
+            if spec_catalog is not None:
+                plan = spec_catalog.plan(spec_path)
+            else:
+                if spec_path not in compiled:
+                    try:
+                        compiled[spec_path] = compile_spec_plan(pd.read_csv(spec_path))
+                    except Exception as e:
+                        compiled[spec_path] = e
+                plan = compiled[spec_path]
+                if isinstance(plan, Exception):
+                    raise plan
+        except Exception as e:
+            per_file[code] = [spec_load_error(e)]
+            continue
+        plans.append(plan)
+        plan_codes.append(np.full(len(plan), code))
+
+    if plans:
+        plan_file = np.concatenate(plan_codes)
+        issue_rows, issues = apply_spec_plan(
+            pd.concat(plans, ignore_index=True), df_tests, plan_groups=plan_file, groups=fleet.test_file,
+        )
+        for code, issue in zip(plan_file[issue_rows], issues):
+            per_file[code].append(issue)
+    return per_file
+
+
+# --- Sort table rules ---
+
+def _condition_counts(fleet, condition):
+    """Rows with LogicCondition == condition, per fleet file."""
+    rows = (fleet.sorts["LogicCondition"] == condition).to_numpy(dtype=bool)
+    return np.bincount(fleet.sort_file[rows], minlength=fleet.num_files)
+
+
+def fleet_logiccondition_osc_once(fleet, df_tests=None):
+    """validate_logiccondition_osc_once over the fleet."""
+    per_file = [[] for _ in range(fleet.num_files)]
+    for code, osc_count in enumerate(_condition_counts(fleet, "OSC")):
+        if osc_count == 0:
+            per_file[code].append(issue_message("osc_missing"))
+        elif osc_count > 1:
+            per_file[code].append(issue_message("osc_multiple", count=osc_count))
+    return per_file
+
+
+def fleet_logiccondition_reject_once(fleet, df_tests=None):
+    """validate_logiccondition_reject_once over the fleet."""
+    per_file = [[] for _ in range(fleet.num_files)]
+    for code, reject_count in enumerate(_condition_counts(fleet, "REJECT")):
+        if reject_count == 0:
+            per_file[code].append(issue_message("reject_missing"))
+        elif reject_count > 1:
+            per_file[code].append(issue_message("reject_multiple", count=reject_count))
+    return per_file
+
+
+def fleet_logiccondition_all_pass_once(fleet, expected_bin_number):
+    """validate_logiccondition_all_pass_once over the fleet."""
+    rows = np.flatnonzero((fleet.sorts["LogicCondition"] == "ALL PASS").to_numpy(dtype=bool))
+    counts = np.bincount(fleet.sort_file[rows], minlength=fleet.num_files)
+    bin_numbers = fleet.sorts["BinNumber"].to_numpy()
+
+    per_file = [[] for _ in range(fleet.num_files)]
+    for code, count_all_pass in enumerate(counts.tolist()):
+        if count_all_pass == 0:
+            per_file[code].append(issue_message("all_pass_missing"))
+        elif count_all_pass > 1:
+            per_file[code].append(issue_message("all_pass_multiple", count=count_all_pass))
+    # Exactly one ALL PASS row: check its BinNumber
+    single = rows[counts[fleet.sort_file[rows]] == 1]
+    for code, bin_number in zip(fleet.sort_file[single], bin_numbers[single].tolist()):
+        if bin_number != expected_bin_number:
+            per_file[code].append(issue_message("all_pass_bin", bin_number=bin_number, expected=expected_bin_number))
+    return per_file
+
+
+def fleet_logiccondition_or_except_special(fleet, df_tests=None):
+    """validate_logiccondition_or_except_special over the fleet."""
+    logic = fleet.sorts["LogicCondition"].to_numpy(dtype=object)
+    bad = _map_distinct(
+        logic, lambda val: val not in SPECIAL_LOGIC_CONDITIONS and val != "OR", missing=True
+    ).astype(bool)
+    return _split(fleet.num_files, fleet.sort_file[bad], [
+        issue_message("logic_invalid", row=idx+1, value=val, allowed=SPECIAL_LOGIC_CONDITIONS)
+        for idx, val in zip(fleet.sorts.index[bad], logic[bad])
+    ])
+
+
+def fleet_or_logic_contains_all_tests(fleet, df_tests):
+    """validate_or_logic_contains_all_tests over the fleet (one coverage row per file)."""
+    max_sequence = fleet.max_sequence(df_tests)
+    if not np.issubdtype(max_sequence.dtype, np.integer):
+        raise TypeError("Sequence is not an integer column")
+
+    or_rows = (fleet.sorts["LogicCondition"] == "OR").to_numpy(dtype=bool)
+    has_or = np.bincount(fleet.sort_file[or_rows], minlength=fleet.num_files) > 0
+
+    # Tests referenced by any OR row (PASS or FAIL), per file
+    width = max(int(max_sequence.max()) + 1, 256)
+    covered = np.zeros((fleet.num_files, width), dtype=bool)
+    used = or_rows[fleet.condition_row] & (fleet.condition_test >= 0) & (fleet.condition_test < 256)
+    covered[fleet.sort_file[fleet.condition_row[used]], fleet.condition_test[used]] = True
+
+    numbers = np.arange(width)
+    wanted = (numbers >= 1) & (numbers <= max_sequence[:, None])
+    missing_file, missing_test = np.nonzero(wanted & ~covered & has_or[:, None])
+    bounds = np.searchsorted(missing_file, np.arange(fleet.num_files + 1))
+
+    per_file = [[] for _ in range(fleet.num_files)]
+    for code in range(fleet.num_files):
+        if not has_or[code]:
+            per_file[code].append(issue_message("or_rows_missing"))
+            continue
+        missing = missing_test[bounds[code]:bounds[code + 1]].tolist()
+        if missing:
+            per_file[code].append(issue_message("or_tests_missing", missing=missing))
+    return per_file
+
+
+FLEET_RULES = {
+    "Clamp condition are correct": fleet_bv_bias2_gt_limith,
+    "All FailSort are Branch condition": fleet_cb2_all_B,
+    "Each FailSort over Test Plan End": fleet_failbranch_vs_sequence,
+    "Each FailSort same value": fleet_failbranch_uniform,
+    "No use PassSort": fleet_passbranch_all_zero,
+    "Once OSC include SortPlan": fleet_logiccondition_osc_once,
+    "Once REJECT include SortPlan": fleet_logiccondition_reject_once,
+    "Once ALL PASS with expected BinNumber": fleet_logiccondition_all_pass_once,
+    "All FailSort use OR logical": fleet_logiccondition_or_except_special,
+    "OR logical contain all Test number": fleet_or_logic_contains_all_tests,
+    "Spec & Bias1-2 Correlation": fleet_correlate_spec_with_validspec,
+    "LowVolt's I-Bias not over 20A": fleet_bias_lowvolt_for_special_items,
+}
@@ -0,0 +1,325 @@
+# tst_flow.py
+# Branch graph of a test program: reachability, loops, test time and UPH.
+#
+#   python tst_flow.py programs/ -o flow_summary.csv
+#   python tst_flow.py KF5N50F.tst --pass-rates rates.csv --index-time 0.25 --sites 4
+#
+# Each test has two successors. On pass it branches to PassBranch when
+# C/B1 is 'B' and PassBranch is non-zero, otherwise it continues with the
+# next test; on fail the same holds for C/B2 / FailBranch. 'SORT' (251), a
+# branch past the last Sequence and running off the end all go to sorting.
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from tst_program import NormalizedProgram
+from tst_reader import MappedTstFile, find_tst_files
+from tst_units import si_series_to_float
+
+SORT = -1  # successor index meaning "go to sorting"
+
+
+def _branches(flags, targets, sequence_pos, num_tests):
+    """Successor row index per test for one outcome (pass or fail)."""
+    successors = np.arange(1, num_tests + 1)
+    successors[successors == num_tests] = SORT
+    dangling = np.zeros(num_tests, dtype=bool)
+    last_sequence = max(sequence_pos, default=0)
+
+    for i, (flag, target) in enumerate(zip(flags, targets)):
+        if not (flag is True or flag == "B"):
+            continue
+        target = str(target).strip()
+        if target == "SORT":
+            successors[i] = SORT
+        elif target.isdigit() and int(target) != 0:
+            pos = sequence_pos.get(int(target))
+            successors[i] = SORT if pos is None else pos
+            dangling[i] = pos is None and int(target) <= last_sequence
+    return successors, dangling
+
+
+class FlowGraph:
+    """
+    Control-flow graph over the rows of a normalized test table.
+
+    Attributes:
+        sequences (np.ndarray): Sequence per node (row order).
+        item_names (np.ndarray): ItemName per node.
+        test_time (np.ndarray): TestTime in seconds (0 when not decodable).
+        pass_next / fail_next (np.ndarray): Successor node per outcome, SORT = -1.
+        dangling (np.ndarray): Node branches to a Sequence that does not exist
+            (below the last one); treated as going to sorting.
+    """
+
+    def __init__(self, df_tests):
+        n = len(df_tests)
+        self.sequences = df_tests["Sequence"].to_numpy()
+        self.item_names = df_tests["ItemName"].to_numpy(dtype=object)
+        if "TestTime_num" in df_tests.columns:
+            test_time = df_tests["TestTime_num"].to_numpy(dtype=np.float64)
+        else:
+            test_time = si_series_to_float(df_tests["TestTime"]).to_numpy(dtype=np.float64)
+        self.test_time = np.nan_to_num(test_time, nan=0.0)
+
+        sequence_pos = {}
+        for pos, seq in enumerate(self.sequences):
+            sequence_pos.setdefault(int(seq), pos)
+        self.pass_next, pass_dangling = _branches(
+            df_tests["C/B1"].to_numpy(dtype=object), df_tests["PassBranch"].to_numpy(dtype=object),
+            sequence_pos, n,
+        )
+        self.fail_next, fail_dangling = _branches(
+            df_tests["C/B2"].to_numpy(dtype=object), df_tests["FailBranch"].to_numpy(dtype=object),
+            sequence_pos, n,
+        )
+        self.dangling = pass_dangling | fail_dangling
+        self._closure = None
+
+    def __len__(self):
+        return len(self.sequences)
+
+    # --- Structure ---
+
+    def adjacency(self):
+        """(n, n) bool matrix: edge i -> j for either outcome."""
+        n = len(self)
+        adjacency = np.zeros((n, n), dtype=bool)
+        rows = np.arange(n)
+        for successors in (self.pass_next, self.fail_next):
+            ok = successors != SORT
+            adjacency[rows[ok], successors[ok]] = True
+        return adjacency
+
+    def closure(self):
+        """Transitive closure (paths of length >= 1) by repeated boolean squaring."""
+        if self._closure is None:
+            reach = self.adjacency()
+            for _ in range(max(len(self), 1).bit_length() + 1):
+                reach = reach | ((reach.astype(np.uint8) @ reach.astype(np.uint8)) > 0)
+            self._closure = reach
+        return self._closure
+
+    def reachable(self):
+        """Bool per node: reachable from the first test."""
+        if not len(self):
+            return np.zeros(0, dtype=bool)
+        reached = self.closure()[0].copy()
+        reached[0] = True
+        return reached
+
+    def unreachable_sequences(self):
+        return [int(seq) for seq in self.sequences[~self.reachable()]]
+
+    def loops(self):
+        """Sequences of each loop (strongly connected group with a cycle) reachable from the start."""
+        reach = self.closure()
+        on_cycle = np.diag(reach) & self.reachable()
+        loops, seen = [], np.zeros(len(self), dtype=bool)
+        for i in np.flatnonzero(on_cycle):
+            if seen[i]:
+                continue
+            members = reach[i] & reach[:, i]
+            members[i] = True
+            seen |= members
+            loops.append([int(seq) for seq in self.sequences[members]])
+        return loops
+
+    # --- Test time ---
+
+    def _path_time(self, pick):
+        """Fixed point of time[i] = t[i] + pick(time[pass_next], time[fail_next]), SORT = 0."""
+        n = len(self)
+        time = np.zeros(n + 1)  # slot n holds SORT
+        pass_next = np.where(self.pass_next == SORT, n, self.pass_next)
+        fail_next = np.where(self.fail_next == SORT, n, self.fail_next)
+        if pick is np.minimum:
+            time[:n] = np.inf
+        for _ in range(n + 1):
+            updated = time.copy()
+            updated[:n] = self.test_time + pick(time[pass_next], time[fail_next])
+            if np.array_equal(updated, time):
+                break
+            time = updated
+        return time
+
+    def best_time(self):
+        """Shortest test time from the first test to sorting."""
+        return float(self._path_time(np.minimum)[0]) if len(self) else 0.0
+
+    def worst_time(self):
+        """Longest test time to sorting (inf when a reachable loop exists)."""
+        if not len(self):
+            return 0.0
+        if self.loops():
+            return float("inf")
+        return float(self._path_time(np.maximum)[0])
+
+    def pass_rates(self, rates=None):
+        """Per-node pass probability from a scalar, {Sequence: rate} or an array (default 1.0)."""
+        if rates is None:
+            return np.ones(len(self))
+        if isinstance(rates, dict):
+            return np.array([rates.get(int(seq), 1.0) for seq in self.sequences], dtype=np.float64)
+        return np.broadcast_to(np.asarray(rates, dtype=np.float64), (len(self),)).copy()
+
+    def visit_probabilities(self, rates=None):
+        """
+        Expected number of visits per test for one device: the absorbing
+        Markov chain (I - Q)^T v = e_start over the tests a device can
+        reach with non-zero probability. inf when it can get stuck in a
+        loop that never reaches sorting.
+        """
+        n = len(self)
+        if not n:
+            return np.zeros(0)
+        p = np.clip(self.pass_rates(rates), 0.0, 1.0)
+        q = np.zeros((n + 1, n + 1))  # index n is SORT
+        rows = np.arange(n)
+        for successors, prob in ((self.pass_next, p), (self.fail_next, 1.0 - p)):
+            np.add.at(q, (rows, np.where(successors == SORT, n, successors)), prob)
+        q[n, n] = 1.0
+
+        # Nodes a device can actually visit, and whether each can still reach SORT
+        edges = q > 0
+        visited = np.zeros(n + 1, dtype=bool)
+        visited[0] = True
+        exits = edges[:, n].copy()
+        for _ in range(n + 1):
+            visited = visited | edges[visited].any(axis=0)
+            exits = exits | (edges & exits[None, :]).any(axis=1)
+        visited = visited[:n]
+        if (visited & ~exits[:n]).any():
+            return np.where(visited, np.inf, 0.0)
+
+        sub = np.flatnonzero(visited)
+        start = (sub == 0).astype(np.float64)
+        visits = np.zeros(n)
+        visits[sub] = np.linalg.solve((np.eye(len(sub)) - q[np.ix_(sub, sub)]).T, start)
+        return np.clip(visits, 0.0, None)
+
+    def expected_time(self, rates=None):
+        visits = self.visit_probabilities(rates)
+        if np.isinf(visits).any():
+            return float("inf")
+        return float(visits @ self.test_time)
+
+    def uph(self, rates=None, index_time=0.0, sites=1):
+        """Units per hour: sites devices per (expected test time + handler index time)."""
+        cycle = self.expected_time(rates) + index_time
+        return float(3600.0 * sites / cycle) if cycle > 0 else float("inf")
+
+    def hot_tests(self, rates=None, top=10):
+        """Tests by expected time per device (visits x TestTime), largest first."""
+        visits = self.visit_probabilities(rates)
+        hot = pd.DataFrame({
+            "Sequence": self.sequences,
+            "ItemName": self.item_names,
+            "TestTime": self.test_time,
+            "Visits": visits,
+            "ExpectedTime": visits * self.test_time,
+        })
+        return hot.sort_values("ExpectedTime", ascending=False, kind="stable").head(top).reset_index(drop=True)
+
+    def summary(self, rates=None, index_time=0.0, sites=1):
+        hot = self.hot_tests(rates, top=1)
+        return {
+            "Tests": len(self),
+            "Unreachable": self.unreachable_sequences(),
+            "Loops": self.loops(),
+            "DanglingBranches": [int(seq) for seq in self.sequences[self.dangling]],
+            "BestTime": self.best_time(),
+            "WorstTime": self.worst_time(),
+            "ExpectedTime": self.expected_time(rates),
+            "UPH": self.uph(rates, index_time, sites),
+            "HotTest": (f"{hot['Sequence'].iloc[0]} {hot['ItemName'].iloc[0]}" if len(hot) else ""),
+        }
+
+
+def load_pass_rates(path):
+    """
+    Pass rates from a CSV with Sequence and PassRate columns (0-1 or 0-100 %),
+    optionally per File. Returns {file name or None: {Sequence: rate}}.
+    """
+    rates = pd.read_csv(path)
+    if not {"Sequence", "PassRate"} <= set(rates.columns):
+        raise ValueError(f"{path}: needs 'Sequence' and 'PassRate' columns")
+    rate = rates["PassRate"].astype(float)
+    if rate.max() > 1.0:
+        rate = rate / 100.0
+    files = rates["File"].astype("string") if "File" in rates.columns else pd.Series(None, index=rates.index)
+    by_file = {}
+    for file_name, seq, value in zip(files, rates["Sequence"].astype(int), rate):
+        by_file.setdefault(file_name if pd.notna(file_name) else None, {})[seq] = value
+    return by_file
+
+
+def _csv_cell(value):
+    """Lists as space-separated text; a list of loops as '1 2; 5 6'."""
+    if not isinstance(value, list):
+        return value
+    if value and isinstance(value[0], list):
+        return "; ".join(_csv_cell(v) for v in value)
+    return " ".join(map(str, value))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Analyze the branch flow and test time of .tst programs."
+    )
+    parser.add_argument("sources", nargs="+", help="Directories, files or glob patterns")
+    parser.add_argument("-o", "--output", default="flow_summary.csv",
+                        help="Per-program summary CSV (default: %(default)s)")
+    parser.add_argument("--pass-rates", help="CSV of [File,] Sequence, PassRate")
+    parser.add_argument("--index-time", type=float, default=0.0,
+                        help="Handler index time per insertion in seconds (default: %(default)s)")
+    parser.add_argument("--sites", type=int, default=1,
+                        help="Devices tested in parallel (default: %(default)s)")
+    parser.add_argument("--pattern", default="*.tst",
+                        help="File pattern inside directories (default: %(default)s)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    paths = []
+    for source in args.sources:
+        paths.extend(find_tst_files(source, args.pattern))
+    paths = list(dict.fromkeys(paths))
+    if not paths:
+        print("No .tst files found.", file=sys.stderr)
+        return 2
+
+    try:
+        rates_by_file = load_pass_rates(args.pass_rates) if args.pass_rates else {}
+    except (OSError, ValueError) as e:
+        print(f"Could not read pass rates: {e}", file=sys.stderr)
+        return 2
+
+    rows = []
+    for path in paths:
+        file_name = os.path.basename(path)
+        try:
+            with MappedTstFile(path) as tst:
+                program = NormalizedProgram.from_bytes(tst.data, warn=lambda message: None)
+        except (OSError, ValueError) as e:
+            print(f"Skipping file: {e}", file=sys.stderr)
+            continue
+        if program.tests is None:
+            continue
+        rates = rates_by_file.get(file_name, rates_by_file.get(None))
+        summary = FlowGraph(program.tests).summary(rates, args.index_time, args.sites)
+        rows.append({"File": file_name, **{key: _csv_cell(value) for key, value in summary.items()}})
+
+    summary_df = pd.DataFrame(rows)
+    summary_df.to_csv(args.output, index=False)
+    print(f"{len(rows)} program(s) -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
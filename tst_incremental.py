@@ -0,0 +1,204 @@
+# tst_incremental.py
+# Incremental revalidation of edited programs from per-block fingerprints.
+#
+# Every decoded test row gets one uint64 per column and every sort block
+# one per field. A rule's input fingerprint hashes only the blocks it reads
+# (RULE_INPUTS: table, columns, ItemName scope, sort fields), so editing two
+# limits of a 300-test program leaves the fingerprint of every rule that
+# does not read those columns, or is limited to other items, unchanged.
+# RuleResultCache keeps the last results of each program (by file name)
+# with their fingerprints and reruns only the rules whose fingerprint
+# changed, plus the rules without RULE_INPUTS.
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from tst_rules import RULE_INPUTS
+
+INDEX = "(index)"  # pseudo column: the index labels ("Row {idx}" in messages)
+
+
+def _hash_values(values):
+    """
+    One uint64 per value: the bits of numeric values, hash() of each
+    distinct other value (nulls all hash alike). hash() of str is salted
+    per process, so fingerprints are only compared within one process.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind in "biuf":
+        return np.ascontiguousarray(values, dtype=np.float64).view(np.uint64)
+    codes, uniques = pd.factorize(values)
+    lookup = np.array([hash(value) for value in uniques] + [0], dtype=np.int64).view(np.uint64)
+    return lookup[codes]
+
+
+class BlockFingerprints:
+    """
+    Fingerprints of one program's decoded blocks, computed per column or
+    field on first use.
+
+    column(table, name) is a uint64 array over the test rows of "raw" or
+    "mirrored" (None when the column is missing); sort_field(name) one
+    value per sort block for "logic", "bin" or "conditions".
+    """
+
+    def __init__(self, program):
+        self.program = program
+        self._columns = {}
+        self._scopes = {}
+        self._sorts = {}
+
+    def table(self, table):
+        return self.program.mirrored_tests if table == "mirrored" else self.program.tests
+
+    def column(self, table, name):
+        key = (table, name)
+        if key not in self._columns:
+            df = self.table(table)
+            if name == INDEX:
+                self._columns[key] = _hash_values(df.index.to_numpy())
+            elif name in df.columns:
+                self._columns[key] = _hash_values(df[name].to_numpy())
+            else:
+                self._columns[key] = None
+        return self._columns[key]
+
+    def scope(self, table, items):
+        """Mask of the rows whose (stripped) ItemName is in items."""
+        key = (table, items)
+        if key not in self._scopes:
+            df = self.table(table)
+            if "ItemName" in df.columns:
+                names = df["ItemName"].to_numpy(dtype=object)
+                codes, uniques = pd.factorize(names)
+                keep = np.array([str(name).strip() in items for name in uniques] + [False], dtype=bool)
+                self._scopes[key] = keep[codes]
+            else:
+                self._scopes[key] = np.ones(len(df), dtype=bool)
+        return self._scopes[key]
+
+    def sort_field(self, name):
+        if name not in self._sorts:
+            incidence = self.program.sort_incidence
+            if incidence is None:
+                self._sorts[name] = None
+            elif name == "logic":
+                self._sorts[name] = incidence.logic_code
+            elif name == "bin":
+                self._sorts[name] = incidence.bin_number
+            else:
+                self._sorts[name] = np.array([
+                    int.from_bytes(hashlib.blake2b(
+                        incidence.test_nums[start:end].tobytes() + incidence.result_flags[start:end].tobytes(),
+                        digest_size=8,
+                    ).digest(), "little")
+                    for start, end in zip(incidence.indptr[:-1], incidence.indptr[1:])
+                ], dtype=np.uint64)
+        return self._sorts[name]
+
+
+def rule_fingerprint(label, fingerprints, args=None):
+    """
+    Hash of everything the rule reads according to RULE_INPUTS, or None
+    when the rule has no entry (it must always be rerun).
+    """
+    inputs = RULE_INPUTS.get(label)
+    if inputs is None:
+        return None
+    args = args or {}
+    h = hashlib.blake2b(label.encode("utf-8"), digest_size=16)
+    table = inputs.get("table")
+    if table is not None:
+        if fingerprints.table(table) is None:
+            h.update(b"\0no tests")
+        else:
+            items = inputs.get("items")
+            rows = fingerprints.scope(table, items) if items is not None else slice(None)
+            for name in [INDEX] + list(inputs.get("columns", ())):
+                values = fingerprints.column(table, name)
+                h.update(name.encode("utf-8"))
+                h.update(b"\0missing" if values is None else values[rows].tobytes())
+    for name in inputs.get("sorts", ()):
+        values = fingerprints.sort_field(name)
+        h.update(name.encode("utf-8"))
+        h.update(b"\0no sorts" if values is None else np.ascontiguousarray(values).tobytes())
+    for name in sorted(set(inputs.get("args", ())) | {"catch_errors"}):
+        h.update(f"{name}={args.get(name)!r}".encode("utf-8"))
+    return h.hexdigest()
+
+
+class RuleResultCache:
+    """
+    Per-rule results of the last validation of each program, by file name.
+
+    validate() returns the same {label: issues} as NormalizedProgram.validate
+    but reuses every result whose rule fingerprint is unchanged since the
+    program was last validated. Results are shared between callers (and
+    Streamlit sessions); treat them as read-only.
+
+    Args:
+        max_programs (int): Programs kept; the least recently validated one
+            is dropped first.
+    """
+
+    def __init__(self, max_programs=512):
+        self.max_programs = max_programs
+        self._entries = OrderedDict()  # file name -> {label: (fingerprint, issues)}
+        self._lock = threading.Lock()
+        self.reused = 0
+        self.rerun = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def validate(self, file_name, program, selected_validations, expected_bin_number=None,
+                 spec_dir="paper-spec", catch_errors=False, spec_catalog=None, timings=None):
+        """
+        program.validate(...), rerunning only the rules whose inputs changed.
+        `timings` receives "fingerprint" (including the SAME mirroring the
+        fingerprints need) and the seconds of each rule that was rerun.
+        """
+        started = time.perf_counter()
+        fingerprints = BlockFingerprints(program)
+        args = {"expected_bin_number": expected_bin_number, "catch_errors": catch_errors}
+        keys = {label: rule_fingerprint(label, fingerprints, args) for label, _ in selected_validations}
+        with self._lock:
+            cached = self._entries.get(file_name, {})
+        rerun = [
+            (label, func) for label, func in selected_validations
+            if keys[label] is None or label not in cached or cached[label][0] != keys[label]
+        ]
+        if timings is not None:
+            timings["fingerprint"] = time.perf_counter() - started
+
+        fresh = program.validate(
+            file_name, rerun, expected_bin_number=expected_bin_number, spec_dir=spec_dir,
+            catch_errors=catch_errors, spec_catalog=spec_catalog, timings=timings,
+        ) if rerun else {}
+
+        results = {
+            label: fresh[label] if label in fresh else list(cached[label][1])
+            for label, _ in selected_validations
+        }
+        entry = dict(cached)
+        entry.update({label: (keys[label], issues) for label, issues in fresh.items() if keys[label] is not None})
+        with self._lock:
+            self._entries[file_name] = entry
+            self._entries.move_to_end(file_name)
+            while len(self._entries) > self.max_programs:
+                self._entries.popitem(last=False)
+            self.reused += len(selected_validations) - len(rerun)
+            self.rerun += len(rerun)
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {"programs": len(self._entries), "reused": self.reused, "rerun": self.rerun}
@@ -0,0 +1,317 @@
+# tst_metrics.py
+# Process-wide counters and latency histograms of a long-running validation
+# server, exported as Prometheus text.
+#
+#   TST_METRICS_PORT=9464 streamlit run streamlit_test_SPEKTRA_V9.py
+#       -> http://host:9464/metrics
+#   TST_METRICS_FILE=/var/lib/node_exporter/tst.prom streamlit run ...
+#       -> the same text rewritten every TST_METRICS_INTERVAL seconds (default 15)
+#
+# The file is replaced atomically, so it can be read by node_exporter's
+# textfile collector or simply tailed. Recording a value is a dict update
+# under a lock; nothing is computed until the text is rendered.
+import bisect
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implied
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+SESSION_WINDOW = 15 * 60  # a session counts as active this long after its last run
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """
+    Counters, gauges and histograms keyed by (name, labels).
+
+    Labels are given as keyword arguments (rule="Spec check"). Callbacks
+    registered with add_callback are read at render time, so values that
+    other objects already keep (cache bytes, catalog hits) are never copied.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._meta = {}  # name -> (type, help), in registration order
+        self._values = {}  # (name, labels) -> number
+        self._histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+        self._callbacks = []  # (name, func)
+        self._sessions = {}  # session id -> last seen (time.monotonic())
+
+    def describe(self, name, kind, help_text):
+        self._meta.setdefault(name, (kind, help_text))
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._values[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._histograms.get(key)
+            if entry is None:
+                entry = self._histograms[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            entry[index] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def add_callback(self, name, kind, help_text, func):
+        """func() -> number, or {labels tuple: number}; read on every render."""
+        self.describe(name, kind, help_text)
+        self._callbacks.append((name, func))
+
+    # --- Sessions ---
+
+    def touch_session(self, session_id):
+        """Mark a session as active now (call once per script run)."""
+        with self._lock:
+            self._sessions[session_id] = time.monotonic()
+
+    def active_sessions(self, window=SESSION_WINDOW):
+        cutoff = time.monotonic() - window
+        with self._lock:
+            for session_id in [s for s, seen in self._sessions.items() if seen < cutoff]:
+                del self._sessions[session_id]
+            return len(self._sessions)
+
+    # --- Rendering ---
+
+    def _samples(self):
+        """{name: [(suffix, labels, value), ...]} of everything, callbacks included."""
+        samples = {}
+        with self._lock:
+            for (name, labels), value in self._values.items():
+                samples.setdefault(name, []).append(("", labels, value))
+            for (name, labels), entry in self._histograms.items():
+                rows = samples.setdefault(name, [])
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), entry[:-2]):
+                    cumulative += count
+                    rows.append(("_bucket", labels + (("le", _number(bound)),), cumulative))
+                rows.append(("_sum", labels, entry[-2]))
+                rows.append(("_count", labels, entry[-1]))
+        for name, func in self._callbacks:
+            try:
+                value = func()
+            except Exception:
+                continue
+            rows = samples.setdefault(name, [])
+            if isinstance(value, dict):
+                rows.extend(("", tuple(labels), v) for labels, v in value.items())
+            elif value is not None:
+                rows.append(("", (), value))
+        return samples
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        samples = self._samples()
+        lines = []
+        for name in list(self._meta) + sorted(set(samples) - set(self._meta)):
+            rows = samples.get(name)
+            if not rows:
+                continue
+            kind, help_text = self._meta.get(name, ("untyped", ""))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{name}{suffix}{_labels_text(labels)} {_number(value)}" for suffix, labels, value in rows)
+        return "\n".join(lines) + "\n"
+
+
+class ValidationMetrics(MetricsRegistry):
+    """
+    The metrics of the validation app: parse/normalize/rule latencies,
+    files and bytes parsed, issues per rule, active sessions and the
+    program cache / spec catalog figures.
+    """
+
+    def __init__(self, program_cache=None, spec_catalog=None, buckets=LATENCY_BUCKETS):
+        super().__init__(buckets)
+        self.describe("tst_files_parsed_total", "counter", "Programs parsed and normalized (program cache hits not counted).")
+        self.describe("tst_bytes_parsed_total", "counter", "Bytes of .tst data parsed.")
+        self.describe("tst_files_loaded_total", "counter", "Programs requested, by source (cache or parse).")
+        self.describe("tst_parse_seconds", "histogram", "Seconds to decode one .tst file.")
+        self.describe("tst_normalize_seconds", "histogram", "Seconds to normalize one test table.")
+        self.describe("tst_rule_seconds", "histogram", "Seconds per validation rule and program.")
+        self.describe("tst_rule_issues_total", "counter", "Issues reported, by validation rule.")
+        self.describe("tst_fleet_rule_seconds", "histogram", "Seconds per validation rule over a fleet batch.")
+        self.describe("tst_fleet_files_total", "counter", "Programs validated in fleet batches.")
+        self.add_callback("tst_active_sessions", "gauge",
+                          f"Sessions with a run in the last {SESSION_WINDOW // 60} minutes.", self.active_sessions)
+        if resource is not None:
+            self.add_callback("tst_process_max_rss_bytes", "gauge", "Peak resident set size of the server process.",
+                              _max_rss_bytes)
+        if program_cache is not None:
+            self.add_program_cache(program_cache)
+        if spec_catalog is not None:
+            self.add_spec_catalog(spec_catalog)
+
+    def add_program_cache(self, cache):
+        self.add_callback("tst_program_cache_bytes", "gauge", "Estimated bytes held by the program cache.",
+                          lambda: cache.current_bytes)
+        self.add_callback("tst_program_cache_max_bytes", "gauge", "Size bound of the program cache.",
+                          lambda: cache.max_bytes)
+        self.add_callback("tst_program_cache_entries", "gauge", "Programs in the program cache.", lambda: len(cache))
+        self.add_callback("tst_program_cache_hits_total", "counter", "Program cache hits.", lambda: cache.hits)
+        self.add_callback("tst_program_cache_misses_total", "counter", "Program cache misses.", lambda: cache.misses)
+
+    def add_spec_catalog(self, catalog):
+        self.add_callback("tst_spec_catalog_specs", "gauge", "Compiled paper specs in the catalog.",
+                          lambda: len(catalog))
+        self.add_callback("tst_spec_catalog_hits_total", "counter", "Spec plans served without recompiling.",
+                          lambda: catalog.hits)
+        self.add_callback("tst_spec_catalog_misses_total", "counter", "Spec plans read and compiled.",
+                          lambda: catalog.misses)
+
+    def add_rule_results(self, rule_results):
+        self.add_callback("tst_rule_results_reused_total", "counter",
+                          "Rule results reused from an earlier revision of the program.",
+                          lambda: rule_results.reused)
+        self.add_callback("tst_rule_results_rerun_total", "counter",
+                          "Rules rerun because their inputs changed (or were not cached).",
+                          lambda: rule_results.rerun)
+
+    def record_load(self, timings, num_bytes):
+        """Record a {"parse", "normalize"} or {"cache"} dict as filled by get_program / from_bytes."""
+        if "parse" in timings:
+            self.inc("tst_files_loaded_total", source="parse")
+            self.inc("tst_files_parsed_total")
+            self.inc("tst_bytes_parsed_total", num_bytes)
+            self.observe("tst_parse_seconds", timings["parse"])
+            if "normalize" in timings:
+                self.observe("tst_normalize_seconds", timings["normalize"])
+        elif "cache" in timings:
+            self.inc("tst_files_loaded_total", source="cache")
+
+    def record_rules(self, timings, issues=None):
+        """Record per-rule seconds (and issue counts) as filled by run_validations."""
+        issues = issues or {}
+        for label, seconds in timings.items():
+            if label in ("apply_same_mirroring", "fingerprint"):
+                continue
+            self.observe("tst_rule_seconds", seconds, rule=label)
+            if label in issues:
+                self.inc("tst_rule_issues_total", len(issues[label]), rule=label)
+
+    def record_fleet_rules(self, timings, results):
+        """Record the per-rule seconds of one Fleet.validate and the issues of its programs."""
+        self.inc("tst_fleet_files_total", len(results))
+        for label, seconds in timings.items():
+            if label in ("apply_same_mirroring", "fleet"):
+                continue
+            self.observe("tst_fleet_rule_seconds", seconds, rule=label)
+            self.inc("tst_rule_issues_total", sum(len(errors.get(label, ())) for errors in results), rule=label)
+
+
+def _max_rss_bytes():
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+# --- Exporters ---
+
+def write_metrics_file(registry, path):
+    """Write registry.render() to path atomically."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(registry.render())
+    os.replace(tmp_path, path)
+
+
+class MetricsFileWriter(threading.Thread):
+    """Daemon thread rewriting the metrics file every `interval` seconds."""
+
+    def __init__(self, registry, path, interval=15.0):
+        super().__init__(name="tst-metrics-file", daemon=True)
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        while True:
+            try:
+                write_metrics_file(self.registry, self.path)
+            except OSError as e:
+                print(f"Warning: could not write metrics file {self.path}: {e}")
+            if self._stopped.wait(self.interval):
+                return
+
+    def stop(self):
+        self._stopped.set()
+
+
+def start_http_server(registry, port, addr=""):
+    """Serve registry.render() at /metrics from a daemon thread; returns the server."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((addr, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="tst-metrics-http", daemon=True).start()
+    return server
+
+
+def start_exporters(registry, environ=os.environ):
+    """
+    Start the exporters configured by TST_METRICS_PORT / TST_METRICS_FILE
+    (and TST_METRICS_INTERVAL); returns what was started.
+    """
+    started = {}
+    port = environ.get("TST_METRICS_PORT")
+    if port:
+        try:
+            started["http"] = start_http_server(registry, int(port), environ.get("TST_METRICS_ADDR", ""))
+        except (OSError, ValueError) as e:
+            print(f"Warning: metrics endpoint not started on port {port}: {e}")
+    path = environ.get("TST_METRICS_FILE")
+    if path:
+        writer = MetricsFileWriter(registry, path, float(environ.get("TST_METRICS_INTERVAL", 15)))
+        writer.start()
+        started["file"] = writer
+    return started
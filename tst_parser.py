@@ -0,0 +1,709 @@
+# tst_parser.py
+# Decoding of SPEKTRA .tst binary test programs.
+# Kept free of Streamlit so batch jobs and the UI share the same parser.
+import pandas as pd
+import numpy as np
+
+from tst_derived import RATIO_LIMIT_ITEMS, ratio_limit_values
+from tst_sorts import SortIncidence
+from tst_units import format_si, format_si_array, si_series_to_float, si_to_float
+
+
+def calc_si(txt_a: str, txt_b: str, op: str = "/") -> str:
+    """
+    Calculate the result of txt_a <op> txt_b where txt_a and txt_b
+    are strings like '80u', '100m', etc.
+    Automatically scales the result to keep it between 1 and 999,
+    with an appropriate SI prefix, formatted to 4 significant digits.
+    """
+
+    # Parse '80u' → 80 × 1e-6
+    def parse_value(s):
+        value = si_to_float(s)
+        if np.isnan(value):
+            raise ValueError(f"Invalid token: {s}")
+        return value
+
+    # Convert inputs
+    a = parse_value(txt_a)
+    b = parse_value(txt_b)
+
+    # Perform operation
+    if op == "/":
+        result_value = a / b
+    elif op == "*":
+        result_value = a * b
+    elif op == "+":
+        result_value = a + b
+    elif op == "-":
+        result_value = a - b
+    else:
+        raise ValueError(f"Unsupported operator: {op}")
+
+    # Auto-scale to 1 <= scaled < 1000, 4 significant digits
+    return format_si(result_value, digits=4)
+
+
+# suffix code -> (divisor, SI prefix) for Bias1/Bias2/TestTime
+VALUE_SUFFIX_MAP = {
+    0:  (1, 'p'),
+    1:  (100, 'n'),        2:  (10, 'n'),        3:  (1, 'n'),
+    4:  (100, 'u'),        5:  (10, 'u'),        6:  (1, 'u'),
+    7:  (100, 'm'),        8:  (10, 'm'),        9:  (1, 'm'),
+    10: (100, ''),        11: (10, ''),        12: (1, ''),
+    13: (100, 'k'),        14: (10, 'k'),        15: (1, 'k'),
+}
+
+# suffix code -> (divisor, SI prefix) for Limit (one more BCD digit)
+LIMIT_SUFFIX_MAP = {
+    0:  (10, 'p'),
+    1:  (1000, 'n'),        2:  (100, 'n'),        3:  (10, 'n'),
+    4:  (1000, 'u'),        5:  (100, 'u'),        6:  (10, 'u'),
+    7:  (1000, 'm'),        8:  (100, 'm'),        9:  (10, 'm'),
+    10: (1000, ''),        11: (100, ''),        12: (10, ''),
+    13: (1000, 'k'),        14: (100, 'k'),        15: (10, 'k'),
+}
+
+
+def decode_value_with_suffix(raw_value, suffix_code):
+    divisor, suffix = VALUE_SUFFIX_MAP.get(suffix_code, (1, ''))
+    decoded_value = raw_value / divisor
+    return f"{decoded_value}{suffix}"
+
+
+def decode_limit_with_suffix(raw_value, suffix_code):
+    divisor, suffix = LIMIT_SUFFIX_MAP.get(suffix_code, (1, ''))
+    decoded_value = raw_value / divisor
+    return f"{decoded_value}{suffix}"
+
+
+code_name_map = {
+    (0x00, 0x00): 'BVCEO',    (0x00, 0x01): 'BVCES',    (0x00, 0x02): 'BVCER',
+    (0x00, 0x08): 'VBRDS',    (0x01, 0x00): 'BVCBO',    (0x01, 0x01): 'BVCBS',
+    (0x01, 0x02): 'BVCBR',    (0x01, 0x0F): 'ZZBC',    (0x02, 0x00): 'BVEB',
+    (0x03, 0x00): 'VFBC',    (0x03, 0x0F): 'RM(1)',    (0x04, 0x00): 'VFBE',
+    (0x04, 0x04): 'SPCONT',    (0x04, 0x08): 'VFDI',    (0x04, 0x0A): 'VI-',
+    (0x04, 0x0C): 'RM(4)',    (0x04, 0x0D): 'RM(3)',    (0x04, 0x0E): 'ROI',
+    (0x04, 0x0F): 'VI+',    (0x05, 0x00): 'VFEC',    (0x05, 0x01): 'VFECS',
+    (0x05, 0x08): 'VDSF',    (0x05, 0x0E): 'RII',    (0x05, 0x0F): 'RM(2)',
+    (0x06, 0x00): 'VCESAT',    (0x06, 0x08): 'VDSONF',    (0x06, 0x0F): 'VCESAF',
+    (0x07, 0x00): 'VBESAT',    (0x08, 0x00): 'IB',    (0x08, 0x09): 'LINEIA',
+    (0x08, 0x0A): 'LOADIA',    (0x08, 0x0B): 'IADJIH',    (0x08, 0x0C): 'IADJ',
+    (0x08, 0x0D): 'IBN-',    (0x08, 0x0E): 'IG-',    (0x08, 0x0F): 'IG+',
+    (0x09, 0x00): 'BTON',    (0x09, 0x09): 'LINERA',    (0x09, 0x0A): 'LOADRA',
+    (0x09, 0x0D): 'VREFIH',    (0x09, 0x0E): 'VOUTA',    (0x09, 0x0F): 'VREF',
+    (0x0A, 0x00): 'HFE',    (0x0A, 0x07): 'HFE7',    (0x0B, 0x00): 'HHFE',
+    (0x0C, 0x00): 'ICEO',    (0x0C, 0x01): 'ICES',    (0x0C, 0x02): 'ICER',
+    (0x0C, 0x0B): 'VSCE',    (0x0D, 0x00): 'ICBO',    (0x0D, 0x01): 'ICBS',
+    (0x0D, 0x02): 'ICBR',    (0x0D, 0x0B): 'VSCB',    (0x0E, 0x00): 'IEB',
+    (0x0E, 0x0B): 'VSEB',    (0x0F, 0x00): 'CONT',    (0x0F, 0x0D): 'KB',
+    (0x0F, 0x0E): 'KC',    (0x0F, 0x0F): 'KE',    (0x10, 0x00): 'HVBCEO',
+    (0x10, 0x01): 'HVBCES',    (0x10, 0x02): 'HVBCER',    (0x11, 0x00): 'HVBCBO',
+    (0x11, 0x01): 'HVBCBS',    (0x11, 0x02): 'HVBCBR',    (0x12, 0x00): 'HBTON',
+    (0x12, 0x0D): 'HVP-',    (0x12, 0x0F): 'HVP',    (0x13, 0x00): 'ICS',
+    (0x14, 0x00): 'IR@',    (0x15, 0x00): 'DVDS',    (0x16, 0x00): 'DIFVBE',
+    (0x17, 0x00): 'VPT',    (0x18, 0x00): 'DVBE',    (0x19, 0x00): 'HIB',
+    (0x1A, 0x00): 'VOUT',    (0x1A, 0x04): 'VOUTLI',    (0x1A, 0x08): 'VDROP',
+    (0x1A, 0x09): 'LINERG',    (0x1A, 0x0A): 'LOADRG',    (0x1A, 0x0B): 'VOUT11',
+    (0x1A, 0x0C): 'VOUT12',    (0x1A, 0x0D): 'VOUT13',    (0x1A, 0x0E): 'VOUT14',
+    (0x1A, 0x0F): 'VOUTS',    (0x1B, 0x07): 'DVGS2',    (0x1C, 0x00): 'HILCEO',
+    (0x1C, 0x01): 'HILCES',    (0x1C, 0x02): 'HILCER',    (0x1C, 0x08): 'IF',
+    (0x1C, 0x09): 'IRDI',    (0x1C, 0x0E): 'RIV',    (0x1C, 0x0F): 'IOMAX',
+    (0x1D, 0x00): 'HILCBO',    (0x1D, 0x01): 'HILCBS',    (0x1D, 0x02): 'HILCBR',
+    (0x1E, 0x00): 'HVICEO',    (0x1E, 0x01): 'HVICES',    (0x1E, 0x02): 'HVICER',
+    (0x1F, 0x00): 'HVICBO',    (0x1F, 0x01): 'HVICBS',    (0x1F, 0x02): 'HVICBR',
+    (0x20, 0x00): 'BVCEX',    (0x20, 0x0F): 'BVCEX-',    (0x21, 0x00): 'HCESAT',
+    (0x21, 0x01): 'HVFECS',    (0x21, 0x09): 'HVFEC',    (0x22, 0x00): 'HBESAT',
+    (0x22, 0x08): 'HVFBE8',    (0x22, 0x09): 'HVFBE',    (0x22, 0x0E): 'HVGFM',
+    (0x22, 0x0F): 'HVFGS',    (0x23, 0x00): 'IQ',    (0x23, 0x08): 'IQ8',
+    (0x23, 0x09): 'LINEIQ',    (0x23, 0x0A): 'LOADIQ',    (0x24, 0x00): 'IDSX2S',
+    (0x24, 0x08): 'IDSX28',    (0x25, 0x00): 'BVDG2O',    (0x26, 0x00): 'HVTM',
+    (0x27, 0x00): 'SCAN',    (0x27, 0x07): 'EXT',    (0x28, 0x00): 'HRDON',
+    (0x28, 0x0D): 'HRDON-',    (0x29, 0x00): 'PSCAN',    (0x29, 0x01): 'BITST1',
+    (0x29, 0x02): 'BITST2',    (0x29, 0x03): 'BITST3',    (0x29, 0x04): 'BITST4',
+    (0x29, 0x05): 'BITST5',    (0x29, 0x06): 'BITST6',    (0x29, 0x0B): 'PSCANC',
+    (0x29, 0x0C): 'PSCANB',    (0x29, 0x0D): 'PSCANE',    (0x29, 0x0E): 'BITCL2',
+    (0x29, 0x0F): 'BITCLR',    (0x2A, 0x07): 'EXTY',    (0x2A, 0x0E): 'COFF',
+    (0x2A, 0x0F): 'CON',    (0x2B, 0x00): 'AUXZ0',    (0x2B, 0x01): 'AUXZ1',
+    (0x2B, 0x07): 'EXTZ',    (0x2B, 0x0F): 'PASS#',    (0x2C, 0x00): 'ICEX',
+    (0x2C, 0x0F): 'ICEX-',    (0x2D, 0x07): 'SOA',    (0x2E, 0x07): 'DVBE2',
+    (0x2F, 0x00): 'ICCLV',    (0x35, 0x00): 'VFSD',    (0x35, 0x01): 'VFSDS',
+    (0x38, 0x03): 'VG1SR',    (0x39, 0x00): 'ADD',    (0x3A, 0x00): 'MULTI',
+    (0x3B, 0x00): 'SAME',    (0x3C, 0x00): 'ABSDEL',    (0x3D, 0x00): 'DEF',
+    (0x3E, 0x00): 'DIVID',    (0x3E, 0x01): 'CMPDIV',    (0x3F, 0x00): 'QTY',
+    (0x3F, 0x01): 'TPCNT',    (0x40, 0x00): 'BVDSO',    (0x40, 0x01): 'BVDSS',
+    (0x40, 0x08): 'BVDSS8',    (0x40, 0x09): 'BVDSS9',    (0x41, 0x00): 'BVDGO',
+    (0x41, 0x01): 'BVDGS',    (0x42, 0x00): 'BVSGO',    (0x42, 0x05): 'BVSGS',
+    (0x43, 0x00): 'VFGD',    (0x44, 0x00): 'VFGS',    (0x44, 0x06): 'VTH',
+    (0x45, 0x00): 'HGMP',    (0x45, 0x0D): 'HGMP-',    (0x46, 0x00): 'RVSAT',
+    (0x47, 0x00): 'BVDSX1',    (0x48, 0x00): 'BVDSX2',    (0x49, 0x00): 'VP',
+    (0x49, 0x08): 'VP8',    (0x49, 0x0E): 'VP-',    (0x49, 0x0F): 'VP+',
+    (0x4A, 0x00): 'RHFE',    (0x4B, 0x00): 'BVDSX3',    (0x4C, 0x00): 'IDSO',
+    (0x4C, 0x01): 'IDSS',    (0x4C, 0x08): 'IDSS8',    (0x4D, 0x00): 'IDGO',
+    (0x4E, 0x00): 'ISGO',    (0x4E, 0x05): 'ISGS',    (0x4F, 0x00): 'HILEB',
+    (0x4F, 0x0F): 'ROV',    (0x50, 0x07): 'DVDS2',    (0x51, 0x00): 'BVSG1S',
+    (0x52, 0x00): 'BVSG2S',    (0x52, 0x08): 'VSG2SR',    (0x53, 0x00): 'BVSG2O',
+    (0x53, 0x01): 'BVSG23',    (0x53, 0x05): 'BVSG25',    (0x53, 0x08): 'VSG2OR',
+    (0x54, 0x00): 'BVDGSS',    (0x55, 0x00): 'IGG',    (0x56, 0x00): 'ISG1S',
+    (0x56, 0x05): 'ISG15',    (0x57, 0x00): 'ISG2S',    (0x57, 0x05): 'ISG25',
+    (0x57, 0x08): 'ISG28',    (0x58, 0x00): 'GMI',    (0x59, 0x00): 'VG1SC+',
+    (0x59, 0x0F): 'VG1SC-',    (0x5A, 0x00): 'GMP',    (0x5B, 0x00): 'VG2SC+',
+    (0x5B, 0x0F): 'VG2SC-',    (0x5C, 0x01): 'HIDSS',    (0x5D, 0x00): 'IDSX1S',
+    (0x5E, 0x03): 'VOUTH',    (0x5F, 0x00): 'GMI1',    (0x60, 0x00): 'BVDSX',
+    (0x60, 0x0F): 'BVDSX-',    (0x61, 0x00): 'VDSON1',    (0x62, 0x00): 'VDSON2',
+    (0x62, 0x08): 'VDSO28',    (0x63, 0x00): 'VDSON',    (0x63, 0x08): 'VDSON8',
+    (0x63, 0x0A): 'VDSO10',    (0x63, 0x0F): 'VDSON-',    (0x64, 0x00): 'BVOUT',
+    (0x65, 0x00): 'BVDSXX',    (0x66, 0x00): 'BVDG1O',    (0x67, 0x00): 'VV+',
+    (0x67, 0x0D): 'VV-',    (0x67, 0x0E): 'VD',    (0x67, 0x0F): 'VA',
+    (0x68, 0x00): 'GMV',    (0x68, 0x0F): 'GMV-',    (0x69, 0x00): 'BVSG1O',
+    (0x69, 0x01): 'BVSG13',    (0x69, 0x05): 'BVSG15',    (0x6A, 0x00): 'DVCE',
+    (0x6B, 0x00): 'DVF',    (0x6C, 0x00): 'IDSX',    (0x6C, 0x0D): 'IDSXN',
+    (0x6C, 0x0F): 'IDSX-',    (0x6D, 0x02): 'IDSON',    (0x6E, 0x00): 'IDON',
+    (0x6E, 0x03): 'SWON',    (0x6E, 0x08): 'IDON8',    (0x6E, 0x0F): 'IDON-',
+    (0x6F, 0x00): 'IGSX',    (0x70, 0x00): 'VFIN',    (0x71, 0x00): 'IRIN',
+    (0x73, 0x00): 'IROUT',    (0x74, 0x00): 'VONF',    (0x75, 0x00): 'IFTF',
+    (0x75, 0x03): 'IFTF3',    (0x75, 0x08): 'IFT',    (0x76, 0x00): 'IHF',
+    (0x76, 0x03): 'IHF3',    (0x77, 0x00): 'ICCL',    (0x78, 0x00): 'CTR',
+    (0x79, 0x00): 'VOL',    (0x7A, 0x00): 'IFTON',    (0x7B, 0x00): 'VONS',
+    (0x7C, 0x00): 'NOTCHF',    (0x7C, 0x0F): 'NOCHFH',    (0x7D, 0x00): 'IFTS',
+    (0x7D, 0x03): 'IFTS3',    (0x7E, 0x00): 'IHS',    (0x7E, 0x02): 'IHS2',
+    (0x7E, 0x03): 'IHS3',    (0x7F, 0x00): 'IDSXX',    (0x7F, 0x03): 'IDSXX3',
+    (0x80, 0x00): 'VDRM',    (0x80, 0x02): 'VDRM2',    (0x80, 0x03): 'VDRM3',
+    (0x81, 0x00): 'IGN',    (0x82, 0x00): 'VRGM',    (0x82, 0x02): 'VRGM2',
+    (0x82, 0x03): 'VRGM3',    (0x83, 0x00): 'IGR',    (0x84, 0x00): 'VGFM',
+    (0x85, 0x00): 'ZZL',    (0x85, 0x06): 'ZAKL',    (0x86, 0x00): 'HVBDSO',
+    (0x86, 0x01): 'HVBDSS',    (0x87, 0x00): 'HVBDGO',    (0x87, 0x01): 'HVBDGS',
+    (0x88, 0x00): 'HVIDSO',    (0x88, 0x01): 'HVIDSS',    (0x89, 0x00): 'HVIDGO',
+    (0x8A, 0x00): 'C',    (0x8A, 0x0D): 'DSUB',    (0x8A, 0x0E): 'N',
+    (0x8A, 0x0F): 'SUB',    (0x8B, 0x01): 'HHIDSS',    (0x8C, 0x00): 'IDRM',
+    (0x8C, 0x02): 'IDRM2',    (0x8C, 0x03): 'IDRM3',    (0x8D, 0x00): 'ICON',
+    (0x8E, 0x00): 'IRGM',    (0x8F, 0x00): 'RIB',    (0x90, 0x00): 'PVCEO',
+    (0x90, 0x01): 'PVCES',    (0x91, 0x00): 'PVCBO',    (0x92, 0x00): 'HVFGD',
+    (0x92, 0x08): 'HVFBC8',    (0x93, 0x00): 'IGTF',    (0x93, 0x02): 'IGTF2',
+    (0x93, 0x03): 'IGTF3',    (0x94, 0x00): 'IGTS',    (0x94, 0x02): 'IGTS2',
+    (0x94, 0x03): 'IGTS3',    (0x95, 0x00): 'VGTF',    (0x95, 0x02): 'VGTF2',
+    (0x95, 0x03): 'VGTF3',    (0x96, 0x00): 'VGTS',    (0x96, 0x02): 'VGTS2',
+    (0x96, 0x03): 'VGTS3',    (0x97, 0x00): 'GMPA',    (0x98, 0x07): 'DVF2',
+    (0x99, 0x00): 'HVDSON',    (0x99, 0x08): 'HVDSO8',    (0x99, 0x09): 'HVDSO9',
+    (0x99, 0x0A): 'HVDS10',    (0x99, 0x0D): 'HVDSO-',    (0x9A, 0x00): 'HICON',
+    (0x9B, 0x00): 'IH',    (0x9B, 0x02): 'IH2',    (0x9B, 0x03): 'IH3',
+    (0x9D, 0x00): 'IBD',    (0x9E, 0x00): 'HICS',    (0x9E, 0x0C): 'HICSH',
+    (0x9E, 0x0D): 'HICS-',    (0x9F, 0x0B): 'HVSCE2',    (0x9F, 0x0C): 'HVSCE3',
+    (0x9F, 0x0D): 'HVSCE',    (0x9F, 0x0E): 'HVSCB',    (0x9F, 0x0F): 'HVSEB',
+    (0xA0, 0x07): 'DVGSA2',    (0xA1, 0x00): 'HIDON',    (0xA1, 0x0D): 'HIDON-',
+    (0xA2, 0x00): 'HDVGS',    (0xA2, 0x0D): 'HDVGS-',    (0xA3, 0x0A): 'VREFRH',
+    (0xA3, 0x0B): 'VRFRH1',    (0xA3, 0x0C): 'VRFRH2',    (0xA4, 0x0D): 'SVCE',
+    (0xA4, 0x0E): 'SVCB',    (0xA4, 0x0F): 'SVEB',    (0xA6, 0x00): 'VTM',
+    (0xA7, 0x00): 'VOFS',    (0xA7, 0x0E): 'VOFS-',    (0xA7, 0x0F): 'VOFS+',
+    (0xA8, 0x00): 'BVIN',    (0xA9, 0x00): 'DVT',    (0xA9, 0x02): 'DVTR2',
+    (0xA9, 0x03): 'DVTR3',    (0xAA, 0x00): 'HVBEB',    (0xAB, 0x00): 'HVIEB',
+    (0xAC, 0x00): 'DVGSF',    (0xAD, 0x01): 'YOSS',    (0xAE, 0x00): 'VTMS',
+    (0xAF, 0x00): 'ICCHV',    (0xB0, 0x00): 'ILF',    (0xB0, 0x02): 'ILF2',
+    (0xB0, 0x03): 'ILF3',    (0xB1, 0x00): 'ILS',    (0xB1, 0x02): 'ILS2',
+    (0xB1, 0x03): 'ILS3',    (0xB2, 0x00): 'IOH',    (0xB3, 0x00): 'ICCHN',
+    (0xB4, 0x00): 'Q+',    (0xB4, 0x01): 'EXT1',    (0xB4, 0x02): 'EXT2',
+    (0xB4, 0x03): 'EXT3',    (0xB4, 0x04): 'EXT4',    (0xB5, 0x00): 'BVCEI',
+    (0xB8, 0x00): 'GMPH',    (0xB9, 0x00): 'COB',    (0xB9, 0x0F): 'COBF',
+    (0xBA, 0x00): 'CIB',    (0xBA, 0x0F): 'CIBF',    (0xBB, 0x00): 'PRESET',
+    (0xBB, 0x01): 'EXT1C',    (0xBB, 0x02): 'EXT2C',    (0xBB, 0x03): 'EXT3C',
+    (0xBB, 0x04): 'PRE4',    (0xBB, 0x05): 'EXT4C',    (0xBB, 0x07): 'DVBE1',
+    (0xBB, 0x08): 'DVCE1',    (0xBB, 0x09): 'DVGSA1',    (0xBB, 0x0A): 'DVGS1',
+    (0xBB, 0x0B): 'DVF1',    (0xBB, 0x0C): 'DVGK1',    (0xBB, 0x0D): 'DVT1',
+    (0xBB, 0x0E): 'DELAY',    (0xBB, 0x0F): 'DVDS1',    (0xBC, 0x00): 'X-AXIS',
+    (0xBC, 0x0F): 'Y-AXIS',    (0xBD, 0x00): 'GMI2',    (0xBE, 0x00): 'GMV1',
+    (0xBF, 0x00): 'GMV2',    (0xC0, 0x00): 'VZ',    (0xC0, 0x0D): 'VKARH',
+    (0xC0, 0x0E): 'VKARH2',    (0xC0, 0x0F): 'VKARH1',    (0xC1, 0x00): 'VFG1S',
+    (0xC1, 0x08): 'RG',    (0xC1, 0x09): 'VRG',    (0xC2, 0x00): 'VFG1D',
+    (0xC3, 0x00): 'VFG2S',    (0xC4, 0x00): 'VFG2D',    (0xC5, 0x00): 'VF',
+    (0xC5, 0x04): 'VREFR1',    (0xC5, 0x06): 'VREFR',    (0xC5, 0x07): 'VREFR2',
+    (0xC5, 0x08): 'VREFS',    (0xC5, 0x0C): 'VKAR',    (0xC5, 0x0D): 'IREF',
+    (0xC5, 0x0E): 'VKAR2',    (0xC5, 0x0F): 'VKAR1',    (0xC6, 0x00): 'IDX',
+    (0xC6, 0x04): 'IDX4',    (0xC6, 0x0A): 'IDX+',    (0xC6, 0x0B): 'IDXC',
+    (0xC6, 0x0C): 'IDXC+',    (0xC7, 0x00): 'IGX',    (0xC8, 0x00): 'ICEI',
+    (0xC9, 0x07): 'RTH',    (0xCA, 0x01): 'CHG1',    (0xCA, 0x02): 'CHG2',
+    (0xCA, 0x03): 'CHG3',    (0xCA, 0x04): 'CHG4',    (0xCA, 0x05): 'CHG5',
+    (0xCA, 0x06): 'CHG6',    (0xCA, 0x07): 'CHG7',    (0xCA, 0x08): 'CHG8',
+    (0xCA, 0x09): 'CHG9',    (0xCA, 0x0A): 'CHG10',    (0xCA, 0x0B): 'CHG11',
+    (0xCA, 0x0C): 'CHG12',    (0xCA, 0x0D): 'CHG13',    (0xCA, 0x0E): 'CHG14',
+    (0xCB, 0x00): 'IPEAK',    (0xCC, 0x00): 'IR',    (0xCC, 0x01): 'IOFF',
+    (0xCC, 0x06): 'IMIN',    (0xCD, 0x00): 'HVDRM',    (0xCE, 0x00): 'HVIDRM',
+    (0xD0, 0x00): 'HVVR',    (0xD1, 0x00): 'IDXX',    (0xD2, 0x00): 'VDSXX',
+    (0xD2, 0x08): 'VG1SRI',    (0xD3, 0x00): 'RESETV',    (0xD4, 0x00): 'IOP',
+    (0xD6, 0x00): 'INPUTI',    (0xD6, 0x01): 'ISC',    (0xD7, 0x00): 'IQIN',
+    (0xD8, 0x00): 'VPL',    (0xD8, 0x0D): 'VPL+',    (0xD8, 0x0E): 'VPL-',
+    (0xD9, 0x00): 'IFIN',    (0xDA, 0x00): 'NOV',    (0xDA, 0x0F): 'NOVC',
+    (0xDB, 0x00): 'RR',    (0xDB, 0x0F): 'RRC',    (0xDC, 0x07): 'DTEMP',
+    (0xDD, 0x07): 'DVCE2',    (0xDE, 0x00): 'HVIR',    (0xDF, 0x00): 'DVBEB',
+    (0xE0, 0x0F): 'VIOP',    (0xE1, 0x07): 'DVT2',    (0xE2, 0x07): 'DVGK2',
+    (0xE3, 0x00): 'RDON',    (0xE3, 0x0F): 'RDON-',    (0xE4, 0x00): 'POLA',
+    (0xE5, 0x00): 'VBO',    (0xE5, 0x02): 'VBO2',    (0xE5, 0x03): 'VBO3',
+    (0xE8, 0x01): 'ICSGS',    (0xED, 0x00): 'VREE',    (0xEE, 0x00): 'VRCC',
+    (0xEF, 0x01): 'VFDSS',    (0xF2, 0x00): 'ZZ',    (0xF2, 0x06): 'ZAK',
+    (0xF3, 0x00): 'VFSD+',    (0xF3, 0x0F): 'VFSD-',    (0xF4, 0x00): 'HVFSD+',
+    (0xF4, 0x0F): 'HVFSD-',    (0xF5, 0x00): 'CISS',    (0xF5, 0x0F): 'CISSF',
+    (0xF6, 0x00): 'COSS',    (0xF6, 0x0F): 'COSSF',    (0xF7, 0x00): 'ICCH',
+    (0xF8, 0x00): 'ISSS',    (0xF9, 0x00): 'VOH',    (0xFA, 0x00): 'IFTOFF',
+    (0xFB, 0x00): 'VFSS',    (0xFC, 0x00): 'NOTCHS',    (0xFC, 0x0F): 'NOCHSH',
+    (0xFD, 0x00): 'CRSS',    (0xFD, 0x0F): 'CRSSF',    (0x406E, 0x03): 'SWOFF',
+    (0x8000, 0x00): 'PDVBE1',    (0x8000, 0x01): 'PDVBE2',    (0x8000, 0x02): 'PDVDS1',
+    (0x8000, 0x03): 'PDVDS2',    (0x8000, 0x04): 'PDVGS1',    (0x8000, 0x05): 'PDVGS2',
+    (0x8000, 0x06): 'PK',    (0x8000, 0x07): 'PRTH',    (0x8000, 0x08): 'PDTEMP',
+    (0x8000, 0x09): 'PDVCE1',    (0x8000, 0x0A): 'PDVCE2',    (0x8000, 0x0B): 'PDVF1',
+    (0x8000, 0x0C): 'PDVF2',    (0x8000, 0x0D): 'PDSCAN',    (0x8001, 0x00): 'VLMT',
+    (0x8001, 0x01): 'VSTP',    (0x8001, 0x02): 'VST1',    (0x8001, 0x03): 'VST2',
+    (0x8001, 0x04): 'VST3',    (0x8001, 0x05): 'VST4',    (0x8001, 0x06): 'VST5',
+    (0x8001, 0x07): 'VST6',    (0x8001, 0x08): 'VSFP',    (0x8001, 0x09): 'VSF1',
+    (0x8001, 0x0A): 'VSF2',    (0x8001, 0x0B): 'VSF3',    (0x8001, 0x0C): 'VSF4',
+    (0x8001, 0x0D): 'VSF5',    (0x8001, 0x0E): 'VSF6',    (0x8002, 0x00): 'MANUAL',
+    (0x8002, 0x01): 'ENGINR',    (0x8003, 0x00): 'PCOB',    (0x8003, 0x01): 'PCIB',
+    (0x8003, 0x02): 'PCEB',    (0x8003, 0x03): 'PCCB',    (0x8003, 0x04): 'PCRE',
+    (0x8003, 0x05): 'PCCE',    (0x8003, 0x06): 'PCRB',    (0x8004, 0x00): 'PCOBF',
+    (0x8004, 0x01): 'PCIBF',    (0x8004, 0x02): 'PCEBF',    (0x8004, 0x03): 'PCCBF',
+    (0x8004, 0x04): 'PCREF',    (0x8004, 0x05): 'PCCEF',    (0x8004, 0x06): 'PCRBF',
+    (0x8005, 0x00): 'MIN',    (0x8005, 0x01): 'MAX',    (0x8006, 0x00): 'SETCOR',
+    (0x8006, 0x01): 'R-X',    (0x8006, 0x02): 'COROSL',    (0x8006, 0x03): 'FREQ',
+    (0x8006, 0x04): 'COREF',    (0x8007, 0x00): 'OPT_ON',    (0x8007, 0x01): 'OPT_OF',
+    (0x8009, 0x00): 'TRR01',    (0x8009, 0x01): 'TRR02',    (0x8009, 0x02): 'TRR03',
+    (0x8009, 0x03): 'TRR04',    (0x8009, 0x04): 'TRR05',    (0x8009, 0x05): 'TRR1',
+    (0x8009, 0x06): 'TRR2',    (0x800A, 0x00): 'PRSM01',    (0x800A, 0x01): 'PRSM02',
+    (0x800A, 0x02): 'PRSM03',    (0x800A, 0x03): 'PRSM04',    (0x800A, 0x04): 'PRSM05',
+    (0x800A, 0x05): 'PRSM1I',    (0x800A, 0x06): 'PRSM1V',    (0x800A, 0x07): 'PRSM1P',
+    (0x800A, 0x08): 'PRSM2I',    (0x800A, 0x09): 'PRSM2V',    (0x800A, 0x0A): 'PRSM2P',
+    (0x800B, 0x00): 'SQRT',    (0x800C, 0x00): 'POW',    (0x800D, 0x00): 'DELRB1',
+    (0x800E, 0x00): 'LOG',    (0x800E, 0x01): 'LOG10',
+}
+
+# Paste your helper functions and parsing code here:
+
+# get_item_name, get_test_flags, parse_test_plan_block,
+# parse_sort_plan_block, parse_tst_file (or parse_tst_data as needed)
+def get_item_name(block):
+    code_name1 = block[1]    
+    code_name2 = block[13] & 0x0F
+    key = (code_name1, code_name2)
+    return code_name_map.get(key, f"Unknown_{key}")
+
+def get_test_flags(block):
+    """
+    Extract only single-bit flags from option bytes (byte 14 and 15).
+    Excludes multi-bit flags like AC and Di.
+    """
+    opt1 = block[14]
+    opt2 = block[15]
+
+    return {
+        "RV": (opt1 & 0x80) != 0,  # Reverse
+        "Oi": (opt1 & 0x40) != 0,  # Osc Inhibit
+        "Ai": (opt1 & 0x20) != 0,  # AR Inhibit       
+        "AR": (opt1 & 0x10) != 0,  # AutoRange
+        "Di": (opt1 & 0x04) != 0,  # DL inhibit
+        "C/B1": (opt1 & 0x02) != 0,  # Cover or Branch          
+        "C/B2": (opt1 & 0x01) != 0,  # Cover or Branch  
+        "CP": (opt2 & 0x20) != 0,  # ContinuePower
+        "AC": (opt2 & 0x40) != 0,  # AC Test
+    }
+
+
+def parse_test_plan_block(block):
+    sequence_num = block[0]
+    item_name = get_item_name(block)
+
+    b5 = block[4]
+    b6 = block[5]
+    limit_raw = ((b5 >> 4) * 1000) + ((b5 & 0x0F) * 100) + ((b6 >> 4) * 10) + (b6 & 0x0F)
+    b7 = block[6]
+    limit_suffix_code = b7 & 0x0F
+    limit = decode_limit_with_suffix(limit_raw, limit_suffix_code)
+
+    b14 = block[13]
+    is_min_limit = (b14 & 0x80) == 0x80
+    limit_type = "Min" if is_min_limit else "Max"
+
+    b8 = block[7]
+    b9 = block[8]
+    bias1_raw = ((b8 >> 4) * 100) + ((b8 & 0x0F) * 10) + (b9 >> 4)
+    bias1_suffix_code = b9 & 0x0F
+    bias1 = decode_value_with_suffix(bias1_raw, bias1_suffix_code)
+
+    b10 = block[9]
+    b11 = block[10]
+    bias2_raw = ((b10 >> 4) * 100) + ((b10 & 0x0F) * 10) + (b11 >> 4)
+    bias2_suffix_code = b11 & 0x0F
+    bias2 = decode_value_with_suffix(bias2_raw, bias2_suffix_code)
+
+    b12 = block[11]
+    b13 = block[12]
+    test_time_raw = ((b12 >> 4) * 100) + ((b12 & 0x0F) * 10) + (b13 >> 4)
+    test_time_suffix_code = b13 & 0x0F
+    test_time = decode_value_with_suffix(test_time_raw, test_time_suffix_code)
+
+    pass_branch = block[16]
+    fail_branch = block[17]
+
+    pass_branch_str = "SORT" if pass_branch == 251 else str(pass_branch)
+    fail_branch_str = "SORT" if fail_branch == 251 else str(fail_branch)
+
+    flags = get_test_flags(block)
+
+    # ✅ Special cases using calc_si
+    try:
+        if item_name in ("RDON", "HRDON", "RDON-", "HRDON-"):
+            limit = calc_si(str(limit), str(bias1), "/")
+        elif item_name in ("HFE", "HHFE"):
+            limit = calc_si(str(bias2), str(limit), "/")
+    except Exception as e:
+        print(f"Warning: calc_si failed for {item_name}: {e}")
+    
+    return {
+        "Sequence": sequence_num,
+        "ItemName": item_name,
+        "Limit": limit,
+        "LimitType": limit_type,
+        "Bias1": bias1,
+        "Bias2": bias2,
+        "TestTime": test_time,
+        "PassBranch": pass_branch_str,
+        "FailBranch": fail_branch_str,
+        **flags,
+    }
+
+
+def parse_sort_plan_block(block):
+    if len(block) < 20 or (len(block) - 20) % 2 != 0:
+        return None
+
+    header = block[:20]
+    if header[0] != 0xFF or header[1] != 0xFF:
+        return None
+
+    sort_seq = header[2]
+    logic_code = header[3]
+    bin_number = header[4]
+    user_name = bytes(header[5:15]).decode('ascii', errors='ignore').strip()
+
+    condition_data = block[20:]
+    num_conditions = len(condition_data) // 2
+
+    conditions = []
+    for i in range(num_conditions):
+        test_num = condition_data[2 * i]
+        result_flag = condition_data[2 * i + 1]
+
+        if test_num == 0x00 and result_flag == 0x00:
+            continue  # padding
+
+        result = {
+            0x00: "PASS",
+            0x80: "FAIL"
+        }.get(result_flag, f"Unknown(0x{result_flag:02X})")
+
+        conditions.append({
+            "TestNum": test_num,
+            "Result": result
+        })
+
+    logic_map = {
+        0x00: "AND",
+        0x01: "ALL",
+        0x02: "OR",
+        0x04: "OSC",
+        0x08: "REJECT",
+        0x80: "ALL PASS"
+    }
+
+    condition_dict = {}
+    for idx, cond in enumerate(conditions, start=1):
+        condition_dict[f"Test{idx}"] = cond["TestNum"]
+        condition_dict[f"Test{idx}_Result"] = cond["Result"]
+
+    sort_plan_data = {
+        "SortSequence": sort_seq,
+        "LogicCondition": logic_map.get(logic_code, f"Unknown(0x{logic_code:02X})"),
+        "BinNumber": bin_number,
+        "UserName": user_name,
+    }
+    sort_plan_data.update(condition_dict)
+
+    return sort_plan_data
+
+
+# --- Lookup tables for the columnar test-plan decoder ---
+# ItemName by (block[1], block[13] & 0x0F); codes wider than one byte can't occur in a block.
+ITEM_NAME_TABLE = np.array(
+    [[f"Unknown_{(c1, c2)}" for c2 in range(16)] for c1 in range(256)], dtype=object
+)
+for (_c1, _c2), _name in code_name_map.items():
+    if _c1 < 256:
+        ITEM_NAME_TABLE[_c1, _c2] = _name
+
+BRANCH_TABLE = np.array(["SORT" if b == 251 else str(b) for b in range(256)], dtype=object)
+
+# (column, byte index, mask) — same bits as get_test_flags
+TEST_FLAG_BITS = [
+    ("RV", 14, 0x80), ("Oi", 14, 0x40), ("Ai", 14, 0x20), ("AR", 14, 0x10),
+    ("Di", 14, 0x04), ("C/B1", 14, 0x02), ("C/B2", 14, 0x01),
+    ("CP", 15, 0x20), ("AC", 15, 0x40),
+]
+
+
+def _decode_column(raw, suffix_code, suffix_map):
+    """
+    Vectorized decode_value_with_suffix / decode_limit_with_suffix.
+    numpy's float-to-str gives the same shortest repr as f"{value}".
+    """
+    divisors = np.array([suffix_map[c][0] for c in range(16)], dtype=np.float64)
+    suffixes = np.array([suffix_map[c][1] for c in range(16)])
+    values = raw / divisors[suffix_code]
+    return np.char.add(values.astype(str), suffixes[suffix_code]).astype(object)
+
+
+def parse_test_plan_blocks(data, num_test_plans, start=36):
+    """
+    Columnar version of parse_test_plan_block.
+
+    Views the test-plan region as an (N, 18) uint8 array and decodes every
+    field as a whole column.
+
+    Args:
+        data (bytes-like): Whole .tst file contents.
+        num_test_plans (int): Number of 18-byte blocks to decode.
+        start (int): Offset of the first block.
+
+    Returns:
+        pd.DataFrame: Same columns and values as pd.DataFrame of
+        parse_test_plan_block results (only complete blocks are decoded),
+        plus "Limit_num": the unrounded value of computed ratio limits
+        (NaN on every other row).
+    """
+    test_block_size = 18
+    available = max(len(data) - start, 0) // test_block_size
+    n = min(num_test_plans, available)
+
+    blocks = np.frombuffer(data, dtype=np.uint8, count=n * test_block_size, offset=start) \
+        if n > 0 else np.empty(0, dtype=np.uint8)
+    blocks = blocks.reshape(n, test_block_size).astype(np.int64)
+
+    hi = blocks >> 4
+    lo = blocks & 0x0F
+
+    # --- BCD digits ---
+    limit_raw = hi[:, 4] * 1000 + lo[:, 4] * 100 + hi[:, 5] * 10 + lo[:, 5]
+    bias1_raw = hi[:, 7] * 100 + lo[:, 7] * 10 + hi[:, 8]
+    bias2_raw = hi[:, 9] * 100 + lo[:, 9] * 10 + hi[:, 10]
+    test_time_raw = hi[:, 11] * 100 + lo[:, 11] * 10 + hi[:, 12]
+
+    item_name = ITEM_NAME_TABLE[blocks[:, 1], lo[:, 13]]
+    limit = _decode_column(limit_raw, lo[:, 6], LIMIT_SUFFIX_MAP)
+    bias1 = _decode_column(bias1_raw, lo[:, 8], VALUE_SUFFIX_MAP)
+    bias2 = _decode_column(bias2_raw, lo[:, 10], VALUE_SUFFIX_MAP)
+    test_time = _decode_column(test_time_raw, lo[:, 12], VALUE_SUFFIX_MAP)
+    limit_type = np.where((blocks[:, 13] & 0x80) == 0x80, "Min", "Max").astype(object)
+    limit_num = np.full(n, np.nan)
+
+    # ✅ Special cases (RDON/HFE ratio limits), computed as numbers and formatted like calc_si
+    ratio_rows = np.flatnonzero(np.isin(item_name, list(RATIO_LIMIT_ITEMS)))
+    if len(ratio_rows):
+        texts = {"Limit": limit[ratio_rows], "Bias1": bias1[ratio_rows], "Bias2": bias2[ratio_rows]}
+        # A handful of rows per program: per-value si_to_float (as calc_si) beats a pandas pass
+        numbers = {col: np.array([si_to_float(t) for t in text], dtype=np.float64)
+                   for col, text in texts.items()}
+        values, _ = ratio_limit_values(item_name[ratio_rows], numbers)
+        ok = np.isfinite(values)
+        for k in np.flatnonzero(~ok):
+            numerator, denominator = RATIO_LIMIT_ITEMS[item_name[ratio_rows[k]]]
+            bad = [texts[col][k] for col in (numerator, denominator) if np.isnan(numbers[col][k])]
+            reason = f"Invalid token: {bad[0]}" if bad else "float division by zero"
+            print(f"Warning: calc_si failed for {item_name[ratio_rows[k]]}: {reason}")
+        limit[ratio_rows[ok]] = format_si_array(values[ok], digits=4)
+        limit_num[ratio_rows[ok]] = values[ok]
+
+    columns = {
+        "Sequence": blocks[:, 0],
+        "ItemName": item_name,
+        "Limit": limit,
+        "LimitType": limit_type,
+        "Limit" + NUMERIC_SUFFIX: limit_num,
+        "Bias1": bias1,
+        "Bias2": bias2,
+        "TestTime": test_time,
+        "PassBranch": BRANCH_TABLE[blocks[:, 16]],
+        "FailBranch": BRANCH_TABLE[blocks[:, 17]],
+    }
+    for flag, byte_idx, mask in TEST_FLAG_BITS:
+        columns[flag] = (blocks[:, byte_idx] & mask) != 0
+
+    return pd.DataFrame(columns)
+
+
+
+# Adjust parse_tst_file to accept bytes instead of filepath or create parse_tst_data for bytes input.
+
+def parse_tst_data(data, warn=print):
+    num_test_plans = data[9]
+    num_sort_plans = data[10]
+    test_plan_start = 36
+    test_block_size = 18
+    sort_block_size = data[11]
+    test_plans = []
+
+    for i in range(num_test_plans):
+        start = test_plan_start + i * test_block_size
+        block = data[start:start + test_block_size]
+        if len(block) < test_block_size:
+            warn(f"Incomplete test block at index {i}")
+            continue
+        test_plan = parse_test_plan_block(block)
+        test_plans.append(test_plan)
+
+    sort_plan_start = test_plan_start + num_test_plans * test_block_size
+    sort_plans = []
+
+    offset = sort_plan_start
+    for i in range(num_sort_plans):
+        #block_size = 20 + (num_test_plans * 2)
+        block_size = 20 + (sort_block_size * 2)
+        block = data[offset:offset + block_size]
+        if len(block) < block_size:
+            warn(f"Incomplete sort block data at index {i}")
+            break
+        sort_plan = parse_sort_plan_block(block)
+        if sort_plan:
+            sort_plans.append(sort_plan)
+        offset += block_size
+
+    return test_plans, sort_plans
+
+
+def parse_tst_sections(data, warn=print):
+    """
+    Decode a .tst file into (df_tests, sort_incidence): the columnar test
+    table (None when empty) and the sort plans as a SortIncidence.
+    """
+    num_test_plans = data[9]
+    num_sort_plans = data[10]
+    test_plan_start = 36
+    test_block_size = 18
+    sort_block_size = data[11]
+
+    df_tests = parse_test_plan_blocks(data, num_test_plans, test_plan_start)
+    for i in range(len(df_tests), num_test_plans):
+        warn(f"Incomplete test block at index {i}")
+
+    offset = test_plan_start + num_test_plans * test_block_size
+    sort_incidence = SortIncidence.from_blocks(data, offset, num_sort_plans, sort_block_size, warn=warn)
+
+    df_tests = df_tests if not df_tests.empty else None
+    return df_tests, sort_incidence
+
+
+def parse_tst_frames(data, warn=print):
+    """
+    Like parse_tst_data, but decodes the test plans with the columnar
+    decoder and returns DataFrames (None when a section is empty).
+    """
+    df_tests, sort_incidence = parse_tst_sections(data, warn=warn)
+    return df_tests, sort_incidence.to_frame()
+
+
+# Display order of the normalized test table
+TEST_COLUMN_ORDER = [
+    "Sequence", "ItemName", "Limit-L", "Limit-H", "Bias1", "Bias2",
+    "TestTime", "C/B1", "PassBranch", "C/B2", "FailBranch",
+    "RV", "AR", "CP", "AC", "Oi", "Ai", "Di"
+]
+
+
+# SI display columns that get a float64 twin named "<column>_num"
+SI_VALUE_COLUMNS = ["Limit-L", "Limit-H", "Bias1", "Bias2", "TestTime"]
+NUMERIC_SUFFIX = "_num"
+
+# Limit columns that also get "<column>_exact": the _num value, except for
+# computed ratio limits, which keep the value before display rounding
+EXACT_LIMIT_COLUMNS = ["Limit-L", "Limit-H"]
+EXACT_SUFFIX = "_exact"
+
+
+def normalize_test_table(df_tests):
+    """
+    Turn a raw test table into the form the UI shows and the rules expect:
+    flag columns become labels ("RV", "B"/"C", ...), Limit/LimitType is
+    split into Limit-L/Limit-H and columns follow TEST_COLUMN_ORDER,
+    followed by the numeric "<column>_num" twins of SI_VALUE_COLUMNS.
+    The twins are parsed from the display strings, which is what specs
+    are written from; "Limit-L_exact" / "Limit-H_exact" hold the same
+    values except for computed ratio limits, which keep their unrounded
+    value (raw "Limit_num").
+    """
+    df_tests = df_tests.copy()
+
+    # Replace True/False flags (whole columns at once)
+    flag_columns = {
+        "RV": "RV", "AR": "AR", "CP": "CP", "AC": "AC",
+        "Oi": "Oi", "Ai": "Ai", "Di": "Di", "C/B1": "B", "C/B2": "B"
+    }
+    false_x_columns = {"C/B1", "C/B2"}
+    for col, label in flag_columns.items():
+        if col in df_tests.columns:
+            is_set = df_tests[col].to_numpy(dtype=object).astype(bool)
+            df_tests[col] = np.where(is_set, label, "C" if col in false_x_columns else "").astype(object)
+
+    # Convert Limit/LimitType
+    limit_num = None
+    if "Limit" in df_tests.columns and "LimitType" in df_tests.columns:
+        limit = df_tests["Limit"].to_numpy(dtype=object)
+        limit_type = df_tests["LimitType"].to_numpy(dtype=object)
+        if "Limit" + NUMERIC_SUFFIX in df_tests.columns:
+            limit_num = df_tests["Limit" + NUMERIC_SUFFIX].to_numpy(dtype=np.float64)
+        df_tests["Limit-L"] = np.where(limit_type == "Min", limit, "")
+        df_tests["Limit-H"] = np.where(limit_type == "Max", limit, "")
+        df_tests.drop(columns=["Limit", "LimitType"], inplace=True)
+
+    df_tests = df_tests[[col for col in TEST_COLUMN_ORDER if col in df_tests.columns]].copy()
+
+    # Decode the SI strings once; rules compare these instead of re-parsing
+    for col in SI_VALUE_COLUMNS:
+        if col in df_tests.columns:
+            df_tests[col + NUMERIC_SUFFIX] = si_series_to_float(df_tests[col])
+    for col, side in zip(EXACT_LIMIT_COLUMNS, ("Min", "Max")):
+        if col in df_tests.columns:
+            exact = df_tests[col + NUMERIC_SUFFIX].to_numpy(dtype=np.float64, copy=True)
+            if limit_num is not None:
+                rows = ~np.isnan(limit_num) & (limit_type == side)
+                exact[rows] = limit_num[rows]
+            df_tests[col + EXACT_SUFFIX] = exact
+
+    return df_tests
+
+
+def normalize_test_tables(frames):
+    """
+    normalize_test_table over many raw test tables in one pass.
+
+    normalize_test_table is vectorized, but on tables of a few dozen rows
+    its fixed per-call pandas overhead (copies, column assignments, SI
+    parsing setup) dominates. The tables are therefore concatenated,
+    normalized once and split again; each result equals normalizing that
+    table alone. None entries stay None; tables whose columns differ from
+    the first are normalized alone.
+    """
+    results = [None] * len(frames)
+    batch = [k for k, df in enumerate(frames) if df is not None]
+    if batch:
+        columns = list(frames[batch[0]].columns)
+        for k in [k for k in batch if list(frames[k].columns) != columns]:
+            results[k] = normalize_test_table(frames[k])
+            batch.remove(k)
+    if not batch:
+        return results
+
+    combined = normalize_test_table(pd.concat([frames[k] for k in batch], ignore_index=True))
+    bounds = np.cumsum([0] + [len(frames[k]) for k in batch])
+    for k, start, end in zip(batch, bounds[:-1], bounds[1:]):
+        # A copy, so one cached program does not keep the whole batch alive
+        results[k] = combined.iloc[start:end].set_axis(frames[k].index).copy()
+    return results
+
+
+def display_test_table(df_tests):
+    """The test table without helper columns, as shown in the UI."""
+    return df_tests[[col for col in TEST_COLUMN_ORDER if col in df_tests.columns]]
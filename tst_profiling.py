@@ -0,0 +1,164 @@
+# tst_profiling.py
+# On-demand cProfile + tracemalloc capture of one validation run.
+import cProfile
+import linecache
+import marshal
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+
+TRACE_FRAMES = 1  # frames kept per allocation; 1 = the allocating line only
+
+
+def no_phase(name):
+    """Stand-in for RunProfiler.phase when nothing is being profiled."""
+    return nullcontext()
+
+
+def _snapshot():
+    """tracemalloc snapshot without tracemalloc's own bookkeeping (an earlier snapshot held by phase())."""
+    return tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+
+
+def _site_label(frame):
+    return f"{os.path.basename(frame.filename)}:{frame.lineno}"
+
+
+class RunProfiler:
+    """
+    cProfile over a whole run plus tracemalloc snapshots around its phases.
+
+    Usage:
+        profiler = RunProfiler()
+        with profiler:  # start() ... stop(), also when the body raises
+            with profiler.phase("parse"):
+                ...
+
+    Phases with the same name (one per file) are summed. tracemalloc is
+    process-wide: when another run is already tracing, this one reads the
+    shared trace (allocations of both show up) and leaves it running.
+    """
+
+    def __init__(self, top=25):
+        self.top = top
+        self.profile = cProfile.Profile()
+        self.phases = {}  # name -> {"seconds", "net_bytes", "peak_bytes", "calls", "sites"}
+        self._owns_trace = False
+        self._running = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+            self._owns_trace = True
+        self.profile.enable()
+        self._running = True
+
+    def stop(self):
+        if not self._running:
+            return
+        self.profile.disable()
+        if self._owns_trace:
+            tracemalloc.stop()
+            self._owns_trace = False
+        self._running = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @contextmanager
+    def phase(self, name):
+        """Time the block and diff tracemalloc snapshots taken around it."""
+        if not self._running:
+            yield
+            return
+        # Snapshots are not part of the phase being measured
+        self.profile.disable()
+        before = _snapshot()
+        tracemalloc.reset_peak()
+        start_bytes, _ = tracemalloc.get_traced_memory()
+        self.profile.enable()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            self.profile.disable()
+            end_bytes, peak_bytes = tracemalloc.get_traced_memory()
+            after = _snapshot()
+            self._record(name, seconds, end_bytes - start_bytes, peak_bytes - start_bytes,
+                         after.compare_to(before, "lineno"))
+            self.profile.enable()
+
+    def _record(self, name, seconds, net_bytes, peak_bytes, stats):
+        entry = self.phases.setdefault(
+            name, {"seconds": 0.0, "net_bytes": 0, "peak_bytes": 0, "calls": 0, "sites": {}}
+        )
+        entry["seconds"] += seconds
+        entry["net_bytes"] += net_bytes
+        entry["peak_bytes"] = max(entry["peak_bytes"], peak_bytes)
+        entry["calls"] += 1
+        for stat in stats:
+            if stat.size_diff <= 0:
+                continue
+            site = _site_label(stat.traceback[0])
+            size, count, frame = entry["sites"].get(site, (0, 0, stat.traceback[0]))
+            entry["sites"][site] = (size + stat.size_diff, count + stat.count_diff, frame)
+
+    # --- Reports ---
+
+    def phase_summary(self):
+        """Per phase: calls, time, net allocated and peak traced memory."""
+        return pd.DataFrame([
+            {
+                "Phase": name,
+                "Calls": entry["calls"],
+                "Time (ms)": round(entry["seconds"] * 1000, 3),
+                "Allocated (KB)": round(entry["net_bytes"] / 1024, 1),
+                "Peak (KB)": round(entry["peak_bytes"] / 1024, 1),
+            }
+            for name, entry in self.phases.items()
+        ], columns=["Phase", "Calls", "Time (ms)", "Allocated (KB)", "Peak (KB)"])
+
+    def allocation_sites(self, top=None):
+        """The lines that allocated the most (still held at phase end), by phase."""
+        rows = []
+        for name, entry in self.phases.items():
+            for site, (size, count, frame) in entry["sites"].items():
+                rows.append({
+                    "Phase": name,
+                    "Site": site,
+                    "Size (KB)": round(size / 1024, 1),
+                    "Blocks": count,
+                    "Line": linecache.getline(frame.filename, frame.lineno).strip(),
+                })
+        df = pd.DataFrame(rows, columns=["Phase", "Site", "Size (KB)", "Blocks", "Line"])
+        return df.sort_values("Size (KB)", ascending=False).head(top or self.top).reset_index(drop=True)
+
+    def top_functions(self, top=None, sort="cumulative"):
+        """Functions by cumulative (or "total") time, like pstats print_stats."""
+        stats = pstats.Stats(self.profile).stats
+        rows = []
+        for (filename, line, func), (_, calls, total, cumulative, _) in stats.items():
+            where = f"{os.path.basename(filename)}:{line}" if filename != "~" else "built-in"
+            rows.append({
+                "Function": func,
+                "Where": where,
+                "Calls": calls,
+                "Total (ms)": round(total * 1000, 3),
+                "Cumulative (ms)": round(cumulative * 1000, 3),
+            })
+        key = "Cumulative (ms)" if sort == "cumulative" else "Total (ms)"
+        df = pd.DataFrame(rows, columns=["Function", "Where", "Calls", "Total (ms)", "Cumulative (ms)"])
+        return df.sort_values(key, ascending=False).head(top or self.top).reset_index(drop=True)
+
+    def prof_bytes(self):
+        """The run in .prof format (what Profile.dump_stats writes), for snakeviz / pstats."""
+        return marshal.dumps(pstats.Stats(self.profile).stats)
@@ -0,0 +1,147 @@
+# tst_program.py
+# One parsed and normalized .tst program, shared by the UI tabs, the cache and the CLI.
+import time
+
+from tst_parser import display_test_table, normalize_test_table, normalize_test_tables, parse_tst_sections
+from tst_profiling import no_phase
+from tst_rules import apply_same_mirroring, run_validations
+from tst_sorts import SortIncidence
+
+
+class NormalizedProgram:
+    """
+    A .tst program normalized exactly once.
+
+    Attributes:
+        tests (pd.DataFrame or None): Normalized test table (display columns
+            in TEST_COLUMN_ORDER plus the numeric "<column>_num" twins).
+        sorts (pd.DataFrame or None): Wide sort table (TestN/TestN_Result
+            columns), built from sort_incidence on first use.
+        sort_incidence (SortIncidence or None): Sort plans as a bin x test
+            incidence; what the rules use.
+        warnings (list of str): Parser warnings raised while decoding.
+
+    Programs may be shared between callers (and Streamlit sessions) through
+    ProgramCache; treat the frames as read-only and .copy() before modifying.
+    """
+
+    def __init__(self, tests, sorts, warnings=(), sort_incidence=None):
+        self.tests = tests
+        self._sorts = sorts
+        self._sort_incidence = sort_incidence
+        self.warnings = list(warnings)
+        self._mirrored_tests = None
+        self._sort_bins = None
+
+    @classmethod
+    def from_frames(cls, df_tests, df_sorts, warnings=()):
+        """Normalize raw (df_tests, df_sorts) as returned by parse_tst_frames."""
+        if df_tests is not None:
+            df_tests = normalize_test_table(df_tests)
+        return cls(df_tests, df_sorts, warnings)
+
+    @classmethod
+    def from_bytes(cls, data, warn=print, timings=None, phase=no_phase):
+        """
+        Parse and normalize raw .tst bytes; warnings go to `warn` and are kept.
+        `timings` (dict, optional) receives the "parse" and "normalize" seconds;
+        `phase(name)` wraps each of the two in a context (e.g. RunProfiler.phase).
+        """
+        warnings = []
+        started = time.perf_counter()
+        with phase("parse"):
+            df_tests, sort_incidence = parse_tst_sections(data, warn=warnings.append)
+        parsed = time.perf_counter()
+        for message in warnings:
+            warn(message)
+        if df_tests is not None:
+            with phase("normalize"):
+                df_tests = normalize_test_table(df_tests)
+        if timings is not None:
+            timings["parse"] = parsed - started
+            timings["normalize"] = time.perf_counter() - parsed
+        return cls(df_tests, None, warnings, sort_incidence=sort_incidence)
+
+    @classmethod
+    def from_bytes_batch(cls, datas, warn=print, timings=None, phase=no_phase):
+        """
+        from_bytes for many files, their test tables normalized together
+        (normalize_test_tables). `timings` (list, optional) receives one dict
+        per file: its own "parse" seconds and an equal share of the batch
+        "normalize" seconds.
+        """
+        parsed = []
+        parse_seconds = []
+        with phase("parse"):
+            for data in datas:
+                warnings = []
+                started = time.perf_counter()
+                df_tests, sort_incidence = parse_tst_sections(data, warn=warnings.append)
+                parse_seconds.append(time.perf_counter() - started)
+                parsed.append((df_tests, sort_incidence, warnings))
+        started = time.perf_counter()
+        with phase("normalize"):
+            tables = normalize_test_tables([df_tests for df_tests, _, _ in parsed])
+        normalize_share = (time.perf_counter() - started) / max(len(datas), 1)
+
+        programs = []
+        for k, ((_, sort_incidence, warnings), df_tests) in enumerate(zip(parsed, tables)):
+            for message in warnings:
+                warn(message)
+            if timings is not None:
+                timings[k]["parse"] = parse_seconds[k]
+                timings[k]["normalize"] = normalize_share
+            programs.append(cls(df_tests, None, warnings, sort_incidence=sort_incidence))
+        return programs
+
+    @property
+    def sorts(self):
+        if self._sorts is None and self._sort_incidence is not None:
+            self._sorts = self._sort_incidence.to_frame()
+        return self._sorts
+
+    @property
+    def sort_incidence(self):
+        if self._sort_incidence is None and self._sorts is not None:
+            self._sort_incidence = SortIncidence.from_frame(self._sorts)
+        return self._sort_incidence
+
+    @property
+    def sort_bins(self):
+        """Narrow sort table for the rules (None when there are no sort plans)."""
+        if self._sort_bins is None and self.sort_incidence is not None and len(self.sort_incidence):
+            self._sort_bins = self.sort_incidence.bins
+        return self._sort_bins
+
+    @property
+    def display_tests(self):
+        """The test table as shown in the UI (None when there is none)."""
+        return display_test_table(self.tests) if self.tests is not None else None
+
+    @property
+    def mirrored_tests(self):
+        """apply_same_mirroring(tests), computed on first use and then kept."""
+        if self._mirrored_tests is None and self.tests is not None:
+            self._mirrored_tests = apply_same_mirroring(self.tests)
+        return self._mirrored_tests
+
+    def validate(self, file_name, selected_validations, expected_bin_number=None,
+                 spec_dir="paper-spec", catch_errors=False, spec_catalog=None, timings=None):
+        """
+        run_validations on this program; returns {label: list of issues}.
+        `timings` (dict, optional) receives the seconds of each rule and of
+        the SAME mirroring when it runs for this call.
+        """
+        if timings is not None and selected_validations and self._mirrored_tests is None \
+                and self.tests is not None:
+            started = time.perf_counter()
+            self.mirrored_tests
+            timings["apply_same_mirroring"] = time.perf_counter() - started
+        return run_validations(
+            file_name, self.tests, self.sort_bins, selected_validations,
+            expected_bin_number=expected_bin_number, spec_dir=spec_dir,
+            catch_errors=catch_errors, spec_catalog=spec_catalog,
+            sort_incidence=self.sort_incidence,
+            df_tests_mirrored=self.mirrored_tests if selected_validations else None,
+            timings=timings,
+        )
@@ -0,0 +1,134 @@
+# tst_reader.py
+# Memory-mapped, zero-copy access to .tst programs stored on disk.
+import glob
+import mmap
+import os
+
+from tst_parser import parse_tst_data, parse_tst_frames, parse_tst_sections
+
+TST_HEADER_SIZE = 36
+TEST_BLOCK_SIZE = 18
+
+
+def _header_fields(header, file_size):
+    """Build the header dict from the first 36 bytes of a .tst file."""
+    num_test_plans = header[9]
+    num_sort_plans = header[10]
+    sort_block_size = header[11]
+    expected_size = (
+        TST_HEADER_SIZE
+        + num_test_plans * TEST_BLOCK_SIZE
+        + num_sort_plans * (20 + sort_block_size * 2)
+    )
+    return {
+        "NumTestPlans": num_test_plans,
+        "NumSortPlans": num_sort_plans,
+        "SortBlockSize": sort_block_size,
+        "ExpectedSize": expected_size,
+        "FileSize": file_size,
+        "Header": bytes(header[:TST_HEADER_SIZE]),
+    }
+
+
+def read_tst_header(path):
+    """
+    Header-only read: touches bytes 0-35 (which include the counts at
+    data[9], data[10] and data[11]) and nothing else.
+
+    Returns:
+        dict: NumTestPlans, NumSortPlans, SortBlockSize, ExpectedSize,
+        FileSize and the raw Header bytes.
+    """
+    with open(path, "rb") as f:
+        header = f.read(TST_HEADER_SIZE)
+        file_size = os.fstat(f.fileno()).st_size
+    if len(header) < TST_HEADER_SIZE:
+        raise ValueError(f"{path}: file too short for a .tst header ({len(header)} bytes)")
+    return _header_fields(header, file_size)
+
+
+class MappedTstFile:
+    """
+    A .tst file opened with mmap.
+
+    `data` is a memoryview over the mapping, so slicing it (as
+    parse_tst_data does per block) never copies bytes.
+
+    Use as a context manager; DataFrames returned by `frames()` hold no
+    references into the mapping and stay valid after close().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            if size < TST_HEADER_SIZE:
+                raise ValueError(f"{path}: file too short for a .tst header ({size} bytes)")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        self.data = memoryview(self._mmap)
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+    def header(self):
+        return _header_fields(self.data[:TST_HEADER_SIZE], len(self.data))
+
+    def parse(self, warn=print):
+        """parse_tst_data over the mapping (lists of dicts)."""
+        return parse_tst_data(self.data, warn=warn)
+
+    def frames(self, warn=print):
+        """parse_tst_frames over the mapping (df_tests, df_sorts)."""
+        return parse_tst_frames(self.data, warn=warn)
+
+    def sections(self, warn=print):
+        """parse_tst_sections over the mapping (df_tests, sort_incidence)."""
+        return parse_tst_sections(self.data, warn=warn)
+
+    def close(self):
+        if self.data is not None:
+            self.data.release()
+            self.data = None
+            self._mmap.close()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def find_tst_files(source, pattern="*.tst"):
+    """
+    Resolve a directory, a glob or a single file to a sorted list of paths.
+    """
+    if os.path.isdir(source):
+        return sorted(glob.glob(os.path.join(source, pattern)))
+    if os.path.isfile(source):
+        return [source]
+    return sorted(glob.glob(source, recursive=True))
+
+
+def iter_tst_library(source, pattern="*.tst", header_only=False, warn=print):
+    """
+    Walk a program library and yield (path, result) per file.
+
+    result is the header dict when header_only=True, otherwise
+    (df_tests, df_sorts) decoded straight from the mapping.
+    Unreadable files are reported through `warn` and skipped.
+    """
+    for path in find_tst_files(source, pattern):
+        try:
+            if header_only:
+                yield path, read_tst_header(path)
+            else:
+                with MappedTstFile(path) as tst:
+                    yield path, tst.frames(warn=warn)
+        except (OSError, ValueError) as e:
+            warn(f"Skipping file: {e}")
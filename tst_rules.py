@@ -0,0 +1,928 @@
+# tst_rules.py
+# Validation rules for parsed .tst programs (no Streamlit dependency).
+import os
+import time
+
+import pandas as pd
+import numpy as np
+
+from tst_sorts import SortIncidence
+from tst_units import si_series_to_float, si_to_float
+
+
+def _column_values(df, column, default):
+    """df[column] as an object array, or `default` per row when the column is missing (like row.get)."""
+    if column in df.columns:
+        return df[column].to_numpy(dtype=object)
+    return np.full(len(df), default, dtype=object)
+
+
+def _numeric_values(df, column):
+    """
+    Float array for an SI-valued column: the normalized `<column>_num` twin
+    when present, otherwise decoded here. Missing columns are all NaN.
+    """
+    if f"{column}_num" in df.columns:
+        return df[f"{column}_num"].to_numpy(dtype=np.float64)
+    if column in df.columns:
+        return si_series_to_float(df[column]).to_numpy(dtype=np.float64)
+    return np.full(len(df), np.nan)
+
+
+def _plain_numeric_values(df, column):
+    """
+    Float array of `column` as pd.to_numeric(errors='coerce') reads it: only
+    plain numbers count, SI-suffixed values ('25.0k') are NaN. Missing
+    columns are all NaN.
+    """
+    if column not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _map_distinct(values, func, missing=np.nan):
+    """
+    Apply a scalar converter once per distinct non-null value and broadcast
+    the results back; null values get `missing`. Columns like FailBranch or
+    Bias2 have few distinct values, so this avoids per-row Python work.
+    """
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    lookup = np.empty(len(uniques) + 1, dtype=object)
+    lookup[:-1] = [func(value) for value in uniques]
+    lookup[-1] = missing  # code -1 (null) picks the last slot
+    return lookup[codes]
+
+
+def _as_float(value):
+    """float(value), or None when it is not numeric."""
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+# Issue texts of the rules, shared with their fleet forms (tst_fleet)
+ISSUE_MESSAGES = {
+    "bias_over_limit": "{item} has {column}={value} which exceeds the limit of 20A",
+    "or_rows_missing": "No rows with LogicCondition == 'OR' found in sort dataframe.",
+    "or_tests_missing": "Missing test numbers in 'OR' LogicCondition rows: {missing}",
+    "logic_invalid": "Row {row}: LogicCondition '{value}' is invalid; must be 'OR' or one of {allowed}.",
+    "all_pass_missing": "No 'ALL PASS' row found in 'LogicCondition'; exactly one required.",
+    "all_pass_multiple": "Multiple ('{count}') 'ALL PASS' rows found in 'LogicCondition'; exactly one required.",
+    "all_pass_bin": "'ALL PASS' row 'BinNumber' is '{bin_number}', but expected '{expected}'.",
+    "reject_missing": "No 'REJECT' row found in 'LogicCondition'; exactly one required.",
+    "reject_multiple": "Multiple ('{count}') 'REJECT' rows found in 'LogicCondition'; exactly one required.",
+    "osc_missing": "No rows with LogicCondition == 'OSC' found. Exactly one required.",
+    "osc_multiple": "Multiple rows ({count}) with LogicCondition == 'OSC' found. Exactly one required.",
+    "passbranch_not_zero": "Row {row}: PassBranch ({value}) is not zero for item '{item}'",
+    "failbranch_not_common": "Row {row}: FailBranch ({value}) does not match common value ({common}) for item '{item}'",
+    "failbranch_not_numeric": "Row {row}: FailBranch ('{value}') is not numeric for item '{item}'",
+    "failbranch_in_plan": "Row {row}: FailBranch ({value}) <= max Sequence ({max_sequence}) for item '{item}'",
+    "cb2_not_branch": "Row {row}: C/B2 ({value}) is not 'Branch' for item '{item}'",
+    "clamp": "Row {row}: Bias2 ({bias2}) <= Limit-H ({limit_h}) for item '{item}'",
+}
+
+
+def issue_message(kind, **fields):
+    """The ISSUE_MESSAGES text of `kind` filled in with `fields`."""
+    return ISSUE_MESSAGES[kind].format(**fields)
+
+
+def filter_spec_columns(df_tests):
+    """
+    Clean the test DataFrame to keep only the columns relevant 
+    for spec correlation:
+        ItemName, Limit-L, Limit-H, Bias1, Bias2, RV.
+
+    - Keeps only those columns if they exist.
+    - Creates empty columns if missing.
+    - Reorders them consistently.
+
+    Args:
+        df_tests (pd.DataFrame): Original test dataframe.
+
+    Returns:
+        pd.DataFrame: Filtered dataframe ready for spec correlation.
+    """
+
+    
+    # Desired final structure
+    keep_cols = ["Sequence", "ItemName", "Limit-L", "Limit-H", "Bias1", "Bias2", "RV"]
+
+    # --- Keep only existing columns
+    filtered_df = df_tests[[col for col in keep_cols if col in df_tests.columns]].copy()
+
+    # --- Add any missing columns as empty
+    for col in keep_cols:
+        if col not in filtered_df.columns:
+            filtered_df[col] = ""
+
+    # --- Reorder to ensure consistent output (numeric twins from normalize_test_table ride along)
+    filtered_df = filtered_df[keep_cols]
+    num_cols = [f"{col}_num" for col in keep_cols if f"{col}_num" in df_tests.columns]
+    if num_cols:
+        filtered_df = filtered_df.join(df_tests[num_cols])
+    
+    return filtered_df
+
+
+
+# (test column, spec column holding the Sequence it is checked against)
+SPEC_FIELD_PAIRS = [
+    ('ItemName', 'SeqItemName'),
+    ('Limit-L', 'SeqLimit-L'),
+    ('Limit-H', 'SeqLimit-H'),
+    ('Bias1', 'SeqBias1'),
+    ('Bias2', 'SeqBias2'),
+    ('RV', 'SeqRV')
+]
+
+# Limits only fail on the loose side; every other field must match
+SPEC_COMPARATORS = {'Limit-L': 'min', 'Limit-H': 'max'}
+
+
+def _is_blank(values):
+    """True where a value is missing or only whitespace (pd.isna(v) or str(v).strip() == '')."""
+    values = np.asarray(values, dtype=object)
+    return _map_distinct(values, lambda v: str(v).strip() == '', missing=True).astype(bool)
+
+
+def compile_spec_plan(valid_spec):
+    """
+    Compile a paper-spec table into a correlation plan: one row per
+    (spec row, field) that names a Sequence, in spec order.
+
+    Columns: ItemName, Parameter, Comparator ('min', 'max' or 'eq'),
+    SeqValue (as written), Sequence (numeric key, NaN when it cannot match
+    a test), SpecValue (as written) and SpecNum (SI-decoded SpecValue).
+    """
+    item_names = _column_values(valid_spec, 'ItemName', '')
+    columns = {name: [] for name in
+               ('Order', 'ItemName', 'Parameter', 'SeqValue', 'Sequence', 'SpecValue', 'SpecNum')}
+    for field_order, (field, seq_field) in enumerate(SPEC_FIELD_PAIRS):
+        seq_values = _column_values(valid_spec, seq_field, '')
+        unmapped = _map_distinct(seq_values, lambda v: isinstance(v, str) and v == '', missing=True)
+        rows = np.flatnonzero(~unmapped.astype(bool))
+        spec_values = _column_values(valid_spec, field, '')[rows]
+        columns['Order'].append(rows * len(SPEC_FIELD_PAIRS) + field_order)
+        columns['ItemName'].append(item_names[rows])
+        columns['Parameter'].append(np.full(len(rows), field, dtype=object))
+        columns['SeqValue'].append(seq_values[rows])
+        columns['Sequence'].append(_map_distinct(seq_values[rows], _as_sequence_key).astype(np.float64))
+        columns['SpecValue'].append(spec_values)
+        columns['SpecNum'].append(_map_distinct(spec_values, si_to_float).astype(np.float64))
+
+    columns = {name: np.concatenate(parts) for name, parts in columns.items()}
+    order = np.argsort(columns.pop('Order'), kind='stable')
+    plan = pd.DataFrame({name: values[order] for name, values in columns.items()})
+    plan.insert(2, 'Comparator', plan['Parameter'].map(lambda f: SPEC_COMPARATORS.get(f, 'eq')).astype(object))
+    return plan
+
+
+def _as_sequence_key(value):
+    """A spec Seq* cell as a float to join on Sequence (text never matches, like ==)."""
+    if isinstance(value, (str, bool, np.bool_)):
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def apply_spec_plan(plan, df_tests, plan_groups=None, groups=None):
+    """
+    Check a compiled spec plan against a test table in one indexed join.
+
+    With `plan_groups` and `groups` (the program of each plan row and of
+    each test row, for tables holding several), plan rows are joined to the
+    tests of their own program only.
+
+    Returns:
+        List[dict]: Validation issues, in spec row / field order; with groups,
+        a (plan row of each issue, issues) tuple.
+    """
+    n = len(df_tests)
+
+    # First test row per Sequence; slot n means "not found"
+    if groups is None:
+        sequences = pd.Index(df_tests['Sequence'].to_numpy())
+        wanted = plan['Sequence'].to_numpy()
+    else:
+        sequences = pd.MultiIndex.from_arrays([np.asarray(groups), df_tests['Sequence'].to_numpy()])
+        wanted = pd.MultiIndex.from_arrays([np.asarray(plan_groups), plan['Sequence'].to_numpy()])
+    first_pos = pd.Series(np.arange(n), index=sequences)[~sequences.duplicated()]
+    pos = first_pos.reindex(wanted).to_numpy()
+    found = ~np.isnan(pos)
+    pos = np.where(found, pos, 0).astype(np.int64)
+
+    fields = plan['Parameter'].to_numpy(dtype=object)
+    test_val = np.full(len(plan), None, dtype=object)
+    test_num = np.full(len(plan), np.nan)
+    for field, _ in SPEC_FIELD_PAIRS:
+        rows = np.flatnonzero((fields == field) & found)
+        if not len(rows) or not n:
+            continue
+        # Missing test columns read as '' (as filter_spec_columns would add them)
+        test_val[rows] = _column_values(df_tests, field, '')[pos[rows]]
+        if f"{field}_num" in df_tests.columns:
+            test_num[rows] = df_tests[f"{field}_num"].to_numpy(dtype=np.float64)[pos[rows]]
+        else:
+            test_num[rows] = _map_distinct(test_val[rows], si_to_float).astype(np.float64)
+
+    spec_val = plan['SpecValue'].to_numpy(dtype=object)
+    spec_num = plan['SpecNum'].to_numpy(dtype=np.float64)
+    comparator = plan['Comparator'].to_numpy(dtype=object)
+    both_num = ~np.isnan(test_num) & ~np.isnan(spec_num)
+    safe_test, safe_spec = np.where(both_num, test_num, 0), np.where(both_num, spec_num, 0)
+
+    too_low = (comparator == 'min') & both_num & (safe_test < safe_spec)
+    too_high = (comparator == 'max') & both_num & (safe_test > safe_spec)
+
+    # 'eq' fields: both blank is fine, then a numeric match, then a case-insensitive text match
+    is_eq = (comparator == 'eq') & found
+    both_blank = _is_blank(test_val) & _is_blank(spec_val)
+    num_match = both_num & np.isclose(safe_test, safe_spec, atol=1e-12, rtol=1e-6)
+    mismatch = np.zeros(len(plan), dtype=bool)
+    candidates = np.flatnonzero(is_eq & ~both_blank & ~num_match)
+    mismatch[candidates] = [
+        str(t).strip().lower() != str(sv).strip().lower()
+        for t, sv in zip(test_val[candidates], spec_val[candidates])
+    ]
+
+    item_names = plan['ItemName'].to_numpy(dtype=object)
+    seq_values = plan['SeqValue'].to_numpy(dtype=object)
+    errors = []
+    issue_rows = np.flatnonzero(~found | too_low | too_high | mismatch)
+    for i in issue_rows:
+        if not found[i]:
+            test_value, reason = None, f"Sequence {seq_values[i]} not found in Original Test Data"
+        elif too_low[i]:
+            test_value, reason = test_val[i], f"Lower limit too loose ({float(test_num[i])} < {spec_num[i]})"
+        elif too_high[i]:
+            test_value, reason = test_val[i], f"Upper limit too loose ({float(test_num[i])} > {spec_num[i]})"
+        else:
+            test_value, reason = test_val[i], f"Mismatch: expected {spec_val[i]}, got {test_val[i]}"
+        errors.append({
+            "ItemName": item_names[i],
+            "Parameter": fields[i],
+            "SpecValue": spec_val[i],
+            "TestValue": test_value,
+            "Status": "FAIL",
+            "Reason": reason
+        })
+    if groups is not None:
+        return issue_rows, errors
+    return errors
+
+
+def correlate_spec_with_validspec(df_tests, spec_path, df_sorts=None, spec_catalog=None):
+    """
+    Correlate Original Test Data (df_tests) with Spec Draft CSV (spec_path).
+    Checks Seq-prefixed columns, including RV, and validates limits and biases.
+
+    Args:
+        df_tests (pd.DataFrame): Original test data.
+        spec_path (str): Path to the spec CSV.
+        df_sorts (pd.DataFrame, optional): Sort/extra data, if needed.
+        spec_catalog (SpecCatalog, optional): Catalog to take the compiled
+            plan from instead of reading the CSV.
+
+    Returns:
+        List[dict]: Validation issues.
+    """
+    # --- Load spec CSV (or its compiled plan) ---
+    try:
+        if spec_catalog is not None:
+            plan = spec_catalog.plan(spec_path)
+        else:
+            plan = compile_spec_plan(pd.read_csv(spec_path))
+    except Exception as e:
+        return [spec_load_error(e)]
+
+    return apply_spec_plan(plan, df_tests)
+
+
+def spec_load_error(e):
+    """The single issue reported when a paper spec cannot be loaded."""
+    return {
+        "ItemName": "",
+        "Parameter": "",
+        "SpecValue": "",
+        "TestValue": "",
+        "Status": "FAIL",
+        "Reason": f"Failed to load spec: {e}"
+    }
+
+
+# Items whose bias column must stay at or below 20 (LowVolt's I-Bias rule)
+LOWVOLT_BIAS_ITEMS = {
+    'Bias1': ['VFEC', 'VFBE', 'VCESAT', 'VBESAT', 'IDON', 'RDON', 'VFSD', 'VDSON', 'VFGS'],
+    'Bias2': ['HFE', 'BTON'],
+}
+
+
+def validate_bias_lowvolt_for_special_items(df_tests, df_sorts):
+
+    """
+    Validate Bias limits for specific ItemNames:
+      - For ['VFEC', 'VFBE', 'VCESAT', 'VBESAT', 'IDON', 'RDON', 'VFSD', 'VDSON', 'VFGS']: Bias1 <= 20
+      - For ['HFE', 'BTON']: Bias2 <= 20
+    Returns a list of errors if any violations are found.
+    """
+
+    errors = []
+
+    # Define item groups
+    bias1_items = LOWVOLT_BIAS_ITEMS['Bias1']
+    bias2_items = LOWVOLT_BIAS_ITEMS['Bias2']
+
+    # --- Plain numeric Bias values; suffixed ones are skipped (on a copy; callers may share df_tests) ---
+    df_tests = df_tests.assign(
+        Bias1=_plain_numeric_values(df_tests, 'Bias1'),
+        Bias2=_plain_numeric_values(df_tests, 'Bias2'),
+    )
+
+    # --- Check Bias1 rule ---
+    condition_bias1 = df_tests['ItemName'].isin(bias1_items)
+    invalid_bias1 = df_tests[condition_bias1 & (df_tests['Bias1'] > 20)]
+
+    for _, row in invalid_bias1.iterrows():
+        errors.append({
+            'ItemName': row['ItemName'],
+            'Bias1': row['Bias1'],
+            'Error': issue_message("bias_over_limit", item=row['ItemName'], column='Bias1', value=row['Bias1'])
+        })
+
+    # --- Check Bias2 rule ---
+    condition_bias2 = df_tests['ItemName'].isin(bias2_items)
+    invalid_bias2 = df_tests[condition_bias2 & (df_tests['Bias2'] > 20)]
+
+    for _, row in invalid_bias2.iterrows():
+        errors.append({
+            'ItemName': row['ItemName'],
+            'Bias2': row['Bias2'],
+            'Error': issue_message("bias_over_limit", item=row['ItemName'], column='Bias2', value=row['Bias2'])
+        })
+
+    return errors
+
+
+def validate_or_logic_contains_all_tests(df_tests, df_sorts, sort_incidence=None):
+    """
+    Validate that for all rows where LogicCondition == "OR", the combined TestN columns
+    contain all integers from 1 to max(Sequence) in df_tests.
+
+    sort_incidence (SortIncidence, optional) holds the conditions of the
+    df_sorts rows; it is derived from the TestN columns when not given.
+    
+    Returns a list of error messages.
+    """
+    errors = []
+
+    if df_tests is None or df_sorts is None:
+        errors.append("Test or Sort dataframe missing.")
+        return errors
+
+    if "Sequence" not in df_tests.columns:
+        errors.append("'Sequence' column not found in test dataframe.")
+        return errors
+
+    if "LogicCondition" not in df_sorts.columns:
+        errors.append("'LogicCondition' column not found in sort dataframe.")
+        return errors
+
+    max_sequence = df_tests["Sequence"].max()
+
+    # Rows where LogicCondition == "OR" (a mask: filtering the wide frame would copy every column)
+    or_mask = (df_sorts["LogicCondition"] == "OR").to_numpy(dtype=bool)
+
+    if not or_mask.any():
+        errors.append(issue_message("or_rows_missing"))
+        return errors
+
+    if sort_incidence is None:
+        sort_incidence = SortIncidence.from_frame(df_sorts)
+
+    # Tests referenced by any OR row (PASS or FAIL): one OR over their bitsets
+    missing = sort_incidence.missing_tests(range(1, max_sequence + 1), rows=or_mask)
+
+    if missing:
+        errors.append(issue_message("or_tests_missing", missing=missing))
+
+    return errors
+
+
+# LogicConditions allowed besides 'OR'
+SPECIAL_LOGIC_CONDITIONS = {"OSC", "REJECT", "ALL PASS"}
+
+
+def validate_logiccondition_or_except_special(df_tests, df_sorts):
+    """
+    Validate that all LogicCondition values are either 'OR', 'OSC', 'REJECT', or 'ALL PASS'.
+    Except 'OSC', 'REJECT', 'ALL PASS' rows, all other rows must be 'OR'.
+    Returns list of errors.
+    """
+    errors = []
+
+    if df_sorts is None:
+        errors.append("Sort data is missing.")
+        return errors
+
+    if "LogicCondition" not in df_sorts.columns:
+        errors.append("'LogicCondition' column not found in sort dataframe.")
+        return errors
+
+    allowed_special = SPECIAL_LOGIC_CONDITIONS
+
+    for idx, val in df_sorts["LogicCondition"].items():
+        if val not in allowed_special and val != "OR":
+            errors.append(issue_message("logic_invalid", row=idx+1, value=val, allowed=allowed_special))
+
+    return errors
+
+def validate_logiccondition_all_pass_once(df_tests, df_sorts, expected_bin_number):
+    """
+    Validate that 'LogicCondition' column contains exactly one 'ALL PASS' row,
+    and its 'BinNumber' matches the expected_bin_number.
+    
+    Parameters:
+    - df_tests: test dataframe (not used here but kept for interface consistency)
+    - df_sorts: sort dataframe
+    - expected_bin_number: the required value in the 'BinNumber' column for the 'ALL PASS' row
+    
+    Returns a list of errors (empty if valid).
+    """
+    errors = []
+
+    if df_sorts is None:
+        errors.append("Sort data is missing.")
+        return errors
+
+    if "LogicCondition" not in df_sorts.columns:
+        errors.append("'LogicCondition' column not found in sort dataframe.")
+        return errors
+
+    if "BinNumber" not in df_sorts.columns:
+        errors.append("'BinNumber' column not found in sort dataframe.")
+        return errors
+
+    all_pass_rows = df_sorts[df_sorts["LogicCondition"] == "ALL PASS"]
+
+    count_all_pass = len(all_pass_rows)
+
+    if count_all_pass == 0:
+        errors.append(issue_message("all_pass_missing"))
+        return errors
+    elif count_all_pass > 1:
+        errors.append(issue_message("all_pass_multiple", count=count_all_pass))
+        return errors
+
+    # Exactly one ALL PASS row exists; check BinNumber
+    bin_number = all_pass_rows.iloc[0]["BinNumber"]
+
+    if bin_number != expected_bin_number:
+        errors.append(issue_message("all_pass_bin", bin_number=bin_number, expected=expected_bin_number))
+
+    return errors
+
+def validate_logiccondition_all_pass_once1(df_tests, df_sorts):
+    """
+    Validate that 'LogicCondition' column contains exactly one 'ALL PASS' value.
+    Returns a list of errors (empty if valid).
+    """
+    errors = []
+
+    if df_sorts is None:
+        errors.append("Sort data is missing.")
+        return errors
+
+    if "LogicCondition" not in df_sorts.columns:
+        errors.append("'LogicCondition' column not found in sort dataframe.")
+        return errors
+
+    all_pass_count = (df_sorts["LogicCondition"] == "ALL PASS").sum()
+
+    if all_pass_count == 0:
+        errors.append(issue_message("all_pass_missing"))
+    elif all_pass_count > 1:
+        errors.append(issue_message("all_pass_multiple", count=all_pass_count))
+
+    return errors
+
+def validate_logiccondition_reject_once(df_tests, df_sorts):
+    """
+    Validate that 'LogicCondition' column contains exactly one 'REJECT' value.
+    Returns a list of errors (empty if valid).
+    """
+    errors = []
+
+    # Handle if df_sorts is None or no 'LogicCondition' column
+    if df_sorts is None:
+        errors.append("Sort data is missing.")
+        return errors
+
+    if "LogicCondition" not in df_sorts.columns:
+        errors.append("'LogicCondition' column not found in sort dataframe.")
+        return errors
+
+    reject_count = (df_sorts["LogicCondition"] == "REJECT").sum()
+
+    if reject_count == 0:
+        errors.append(issue_message("reject_missing"))
+    elif reject_count > 1:
+        errors.append(issue_message("reject_multiple", count=reject_count))
+
+    return errors
+
+
+
+def validate_logiccondition_osc_once(df_tests, df_sorts):
+    """
+    Validates that the 'LogicCondition' column contains exactly one row with value 'OSC'.
+    Returns a list with an error message if zero or multiple rows found, empty list if valid.
+    """
+    errors = []
+
+    if "LogicCondition" not in df_sorts.columns:
+        errors.append("Column 'LogicCondition' not found in dataframe.")
+        return errors
+
+    osc_count = (df_sorts["LogicCondition"] == "OSC").sum()
+
+    if osc_count == 0:
+        errors.append(issue_message("osc_missing"))
+    elif osc_count > 1:
+        errors.append(issue_message("osc_multiple", count=osc_count))
+
+    return errors
+
+
+def check_passbranch_all_zero(df_tests, df_sorts):
+    """
+    Checks if all rows in 'PassBranch' are zero (int or string "0").
+    Returns a list of errors for rows where 'PassBranch' is not zero.
+    """
+    if "PassBranch" not in df_tests.columns:
+        raise ValueError("Column 'PassBranch' not found in dataframe.")
+
+    pass_branch = df_tests["PassBranch"].to_numpy(dtype=object)
+
+    # Convert each distinct value once; invalid or missing values are never zero
+    is_zero = _map_distinct(
+        pass_branch, lambda val: bool(pd.to_numeric(val, errors='coerce') == 0), missing=False
+    )
+    bad = ~is_zero.astype(bool)
+
+    items = _column_values(df_tests, "ItemName", "")
+    return [
+        issue_message("passbranch_not_zero", row=idx, value=val, item=item)
+        for idx, val, item in zip(df_tests.index[bad], pass_branch[bad], items[bad])
+    ]
+
+def check_failbranch_uniform(df_tests, df_sorts):
+    """
+    Checks if all rows in 'FailBranch' have the same value.
+    Returns a list of errors for rows where 'FailBranch' differs from the common value.
+    If all are same or all missing, returns empty list.
+    """
+    if "FailBranch" not in df_tests.columns:
+        raise ValueError("Column 'FailBranch' not found in dataframe.")
+
+    # Drop missing values for comparison
+    fail_values = df_tests["FailBranch"].dropna()
+
+    if fail_values.empty:
+        # No valid FailBranch values to check
+        return []
+
+    # Get the first FailBranch value to compare others against
+    common_value = fail_values.iloc[0]
+
+    # Missing values are skipped
+    fail_branch = df_tests["FailBranch"].to_numpy(dtype=object)
+    bad = _map_distinct(fail_branch, lambda val: bool(val != common_value), missing=False).astype(bool)
+
+    items = _column_values(df_tests, "ItemName", "")
+    return [
+        issue_message("failbranch_not_common", row=idx, value=val, common=common_value, item=item)
+        for idx, val, item in zip(df_tests.index[bad], fail_branch[bad], items[bad])
+    ]
+
+def check_failbranch_vs_sequence(df_tests, df_sorts):
+    """
+    Checks if each row's FailBranch value is greater than the maximum Sequence value.
+    Returns a list of error messages for rows that do NOT satisfy this condition.
+    """
+    # Ensure required columns exist
+    if "FailBranch" not in df_tests.columns or "Sequence" not in df_tests.columns:
+        raise ValueError("Required columns 'FailBranch' and/or 'Sequence' not found in dataframe.")
+
+    # Compute the maximum Sequence value (ignore NaN)
+    max_sequence = df_tests["Sequence"].max()
+
+    # float() each distinct value once; missing values are skipped
+    fail_branch = df_tests["FailBranch"].to_numpy(dtype=object)
+    not_numeric = _map_distinct(fail_branch, lambda val: _as_float(val) is None, missing=False).astype(bool)
+    fail_branch_value = _map_distinct(fail_branch, _as_float, missing=None)
+
+    # ✅ Valid condition: fail_branch_value > max_sequence
+    # ❌ Error if not greater
+    too_low = _map_distinct(
+        fail_branch, lambda val: _as_float(val) is not None and not (float(val) > max_sequence),
+        missing=False,
+    ).astype(bool)
+
+    items = _column_values(df_tests, "ItemName", "")
+    errors = []
+    for pos in np.flatnonzero(not_numeric | too_low):
+        idx, item = df_tests.index[pos], items[pos]
+        if not_numeric[pos]:
+            errors.append(issue_message("failbranch_not_numeric", row=idx, value=fail_branch[pos], item=item))
+        else:
+            errors.append(issue_message(
+                "failbranch_in_plan", row=idx, value=fail_branch_value[pos], max_sequence=max_sequence, item=item,
+            ))
+
+    return errors
+
+def check_cb2_all_B(df_tests, df_sorts):
+    """
+    Checks if all 'C/B2' column values are 'B'.
+    Returns a list of error messages for rows that fail.
+    """
+    cb2 = _column_values(df_tests, "C/B2", None)
+    bad = np.asarray(cb2 != "B", dtype=bool)
+
+    items = _column_values(df_tests, "ItemName", "")
+    return [
+        issue_message("cb2_not_branch", row=idx, value=cb2_value, item=item)
+        for idx, cb2_value, item in zip(df_tests.index[bad], cb2[bad], items[bad])
+    ]
+
+# Exact item names checked by the clamp rule
+CLAMP_CHECK_ITEMS = frozenset(('BVCBO', 'BVCBR', 'BVCBS', 'BVCEO', 'BVCER', 'BVCES', 'BVDG1O','BVDG2O', 
+                           'BVDGO', 'BVDGS', 'BVDGSS', 'BVDSO', 'BVDSS', 'BVDSX1', 'BVDSX2', 'BVDSX3',
+                           'BVDSXX', 'BVEB', 'BVIN', 'BVOUT', 'BVSG1O', 'BVSG1S', 'BVSG1O', 'BVSG2O',
+                           'BVSGO', 'BVSGS', 'HIDSS', 'HILCBO', 'HILCBR', 'HILCBS', 'HILCEO', 'HILCER',
+                           'HILCES', 'HILEB', 'HVBCBO', 'HVBCBR', 'HVBCBS', 'HVBCEO', 'HVBCER', 'HVBCES',
+                           'HVICBO', 'HVICBR', 'HVICBS', 'HICEO', 'HVICER', 'HVICES', 'HVIR', 'HVVR',
+                           'IBD', 'ICBO', 'ICBR', 'ICBS', 'ICEO', 'ICER', 'ICES', 'IDGO', 'IDRM', 'IDRM2',
+                           'IDRM3', 'IDSO', 'IDSS', 'IDSX1S', 'IDSX2S', 'IDSXX', 'IEB', 'IGG', 'IGSX', 'IR', 
+                           'IRGM', 'IRIN', 'IROUT', 'ISG1S', 'ISG2S', 'ISGO', 'ISGS', 'POLA', 'PVCBO', 
+                           'PVCEO', 'VDRM', 'VDRM2', 'VDRM3', 'VRGM', 'VRGM2', 'VRGM3', 'VZ', 'ZZ', 'HVBDSO',
+                           'HVBDSS', 'IGN', 'IGR', 'HVBDGO', 'HVBDGS', 'HVIDSO', 'HVIDSS', 'HVIDGO', 'HVDRM',
+                           'HVIDRM', 'PVCES', 'ISG25', 'ISG15', 'BVSG13', 'BVSG15', 'BVSG23', 'BVSG25',
+                           'HVIEB', 'HVBEB', 'VBRDS', 'IFIN', 'IDSS8', 'ISG28', 'BVDSS8', 'IDSX28',
+                           'BVDSS9', 'IOMAX', 'ZZBC', 'IDSXX3', 'VSG2OR', 'VSG2SR', 'IOFF', 'IMIN', 'ZAK',
+                           'VKARH1', 'VKARH2'))  # Exact matches only
+
+
+def validate_bv_bias2_gt_limith(df_tests, df_sorts):
+    """
+    Check that for rows where ItemName starts with 'BV',
+    Bias2 must be greater than Limit-H.
+
+    Returns:
+        A list of error messages with row numbers where the rule is violated.
+    """
+    items = _column_values(df_tests, 'ItemName', '')
+    checked = _map_distinct(
+        items, lambda item: str(item).strip() in CLAMP_CHECK_ITEMS,  # Clean whitespace if needed
+        missing=False,
+    ).astype(bool)
+
+    # Compare the decoded numbers; messages keep the display strings
+    bias2_raw = _column_values(df_tests, 'Bias2', None)[checked]
+    limit_h_raw = _column_values(df_tests, 'Limit-H', None)[checked]
+    bias2 = _numeric_values(df_tests, 'Bias2')[checked]
+    limit_h = _numeric_values(df_tests, 'Limit-H')[checked]
+
+    # Unparseable values are NaN and never violate the rule
+    bad = bias2 <= limit_h
+
+    return [
+        issue_message("clamp", row=idx, bias2=b2, limit_h=lh, item=str(item).strip())
+        for idx, b2, lh, item in zip(
+            df_tests.index[checked][bad], bias2_raw[bad], limit_h_raw[bad], items[checked][bad]
+        )
+    ]
+
+
+# Columns a SAME row takes over from the test it refers to (limits stay its own)
+SAME_MIRROR_COLUMNS = ["ItemName", "Bias1", "Bias2", "Bias1_num", "Bias2_num", "RV", "AR", "CP"]
+
+
+def resolve_same_references(df_tests, groups=None):
+    """
+    Row position each SAME row finally refers to.
+
+    A SAME row names another test by Sequence in Bias1; when that test is
+    itself SAME the reference is followed on (SAME -> SAME -> test). All
+    chains are resolved together by pointer doubling over the row positions.
+    With `groups` (the program of each row, for a table holding several),
+    Sequences are looked up within the row's own program.
+
+    Returns:
+        tuple: (same_pos, target_pos, ref_seq, status) arrays over the SAME
+        rows, where status is "ok", "missing" (no such Sequence along the
+        chain) or "cycle" (the chain never reaches a non-SAME test).
+    """
+    n = len(df_tests)
+    is_same = _column_values(df_tests, "ItemName", "") == "SAME"
+    same_pos = np.flatnonzero(is_same)
+
+    # Referenced sequence numbers, truncated like int(float(Bias1))
+    ref = _numeric_values(df_tests, "Bias1")[same_pos]
+    ref_seq = np.where(np.isfinite(ref), np.trunc(ref), np.nan)
+
+    # First row per Sequence; slot n stands for "no such Sequence"
+    if groups is None:
+        sequences = pd.Index(df_tests["Sequence"].to_numpy())
+        wanted = ref_seq
+    else:
+        groups = np.asarray(groups)
+        sequences = pd.MultiIndex.from_arrays([groups, df_tests["Sequence"].to_numpy()])
+        wanted = pd.MultiIndex.from_arrays([groups[same_pos], ref_seq])
+    first_pos = pd.Series(np.arange(n), index=sequences)
+    first_pos = first_pos[~sequences.duplicated()]
+    target = first_pos.reindex(wanted).to_numpy()
+    target = np.where(np.isnan(target), n, target).astype(np.int64)
+
+    next_pos = np.arange(n + 1)
+    next_pos[same_pos] = target
+    for _ in range(max(n, 1).bit_length() + 1):
+        next_pos = next_pos[next_pos]
+
+    target_pos = next_pos[same_pos]
+    is_same_ext = np.append(is_same, False)
+    status = np.where(target_pos == n, "missing", np.where(is_same_ext[target_pos], "cycle", "ok"))
+    return same_pos, target_pos, ref_seq, status
+
+
+def apply_same_mirroring(df, warn=print, groups=None):
+    """
+    Copy of the test table where every SAME row carries the ItemName,
+    biases and RV/AR/CP flags of the test it (transitively) refers to.
+    Rows whose reference is missing or cyclic are left as they are and
+    reported through `warn`. `groups` is passed on to resolve_same_references.
+    """
+    df = df.copy()
+    same_pos, target_pos, ref_seq, status = resolve_same_references(df, groups)
+
+    for pos, seq, state in zip(same_pos, ref_seq, status):
+        if state == "missing":
+            warn(f"⚠️ Warning: SAME at index {df.index[pos]} refers to missing Sequence "
+                 f"{seq if np.isnan(seq) else int(seq)}")
+        elif state == "cycle":
+            warn(f"⚠️ Warning: SAME at index {df.index[pos]} is part of a SAME reference cycle "
+                 f"(Sequence {int(seq)})")
+
+    ok = status == "ok"
+    rows, sources = same_pos[ok], target_pos[ok]
+    if len(rows):
+        for col in SAME_MIRROR_COLUMNS:
+            if col in df.columns:
+                values = df[col].to_numpy(copy=True)
+                values[rows] = values[sources]
+                df[col] = values
+
+    return df
+
+
+VALIDATION_RULES = {
+    "Clamp condition are correct": validate_bv_bias2_gt_limith,
+    "All FailSort are Branch condition": check_cb2_all_B,
+    "Each FailSort over Test Plan End": check_failbranch_vs_sequence,
+    "Each FailSort same value": check_failbranch_uniform,
+    "No use PassSort": check_passbranch_all_zero,
+    "Once OSC include SortPlan": validate_logiccondition_osc_once,
+    "Once REJECT include SortPlan": validate_logiccondition_reject_once,
+    "Once ALL PASS with expected BinNumber": validate_logiccondition_all_pass_once,
+    "All FailSort use OR logical": validate_logiccondition_or_except_special,
+    "OR logical contain all Test number": validate_or_logic_contains_all_tests,
+    "Spec & Bias1-2 Correlation": correlate_spec_with_validspec,    
+    "LowVolt's I-Bias not over 20A": validate_bias_lowvolt_for_special_items,
+
+    # Add more validation functions here later
+}
+
+
+# Rules run on the test table as parsed; all others see it after SAME mirroring
+RAW_TABLE_RULES = {"LowVolt's I-Bias not over 20A", "Spec & Bias1-2 Correlation"}
+
+
+# What each rule reads, for incremental revalidation (tst_incremental):
+#   table    - "mirrored" (after SAME mirroring), "raw" or None
+#   columns  - test columns read (index labels are always included)
+#   items    - ItemNames the rule is limited to (None: every row)
+#   sorts    - sort block fields read: "logic", "bin", "conditions"
+#   args     - run_validations arguments that change the result
+# Rules missing here, like the paper-spec correlation (it also reads the
+# spec CSV), are rerun on every validation.
+RULE_INPUTS = {
+    "Clamp condition are correct": {
+        "table": "mirrored", "columns": ["ItemName", "Bias2", "Limit-H", "Bias2_num", "Limit-H_num"],
+        "items": CLAMP_CHECK_ITEMS,
+    },
+    "All FailSort are Branch condition": {"table": "mirrored", "columns": ["ItemName", "C/B2"]},
+    "Each FailSort over Test Plan End": {"table": "mirrored", "columns": ["ItemName", "FailBranch", "Sequence"]},
+    "Each FailSort same value": {"table": "mirrored", "columns": ["ItemName", "FailBranch"]},
+    "No use PassSort": {"table": "mirrored", "columns": ["ItemName", "PassBranch"]},
+    "Once OSC include SortPlan": {"sorts": ["logic"]},
+    "Once REJECT include SortPlan": {"sorts": ["logic"]},
+    "Once ALL PASS with expected BinNumber": {"sorts": ["logic", "bin"], "args": ["expected_bin_number"]},
+    "All FailSort use OR logical": {"sorts": ["logic"]},
+    "OR logical contain all Test number": {
+        "table": "mirrored", "columns": ["Sequence"], "sorts": ["logic", "conditions"],
+    },
+    "LowVolt's I-Bias not over 20A": {
+        "table": "raw", "columns": ["ItemName", "Bias1", "Bias2", "Bias1_num", "Bias2_num"],
+        "items": frozenset(LOWVOLT_BIAS_ITEMS['Bias1'] + LOWVOLT_BIAS_ITEMS['Bias2']),
+    },
+}
+
+
+def spec_path_for(file_name, spec_dir="paper-spec"):
+    """Paper-spec CSV matching a .tst file name (KF5N50F.tst -> paper-spec/KF5N50F.csv)."""
+    spec_filename = os.path.basename(file_name).replace(".tst", ".csv")
+    return f"{spec_dir}/{spec_filename}"
+
+
+def run_validations(file_name, df_tests, df_sorts, selected_validations,
+                    expected_bin_number=None, spec_dir="paper-spec", catch_errors=False,
+                    df_tests_mirrored=None, spec_catalog=None, sort_incidence=None, timings=None):
+    """
+    Run the selected (label, func) rules on one program, with the same
+    per-rule calling conventions as the UI.
+
+    Args:
+        file_name (str): Name of the .tst file (used to find its paper spec).
+        df_tests (pd.DataFrame): Normalized test table.
+        df_sorts (pd.DataFrame): Sort table.
+        selected_validations (list): (label, func) pairs from VALIDATION_RULES.
+        expected_bin_number (int, optional): BinNumber required for 'ALL PASS'.
+        spec_dir (str): Directory holding the paper-spec CSVs.
+        catch_errors (bool): Report a rule that raises as a single issue
+            instead of propagating the exception.
+        df_tests_mirrored (pd.DataFrame, optional): apply_same_mirroring(df_tests)
+            if already computed; otherwise it is computed once here (when a
+            selected rule is not in RAW_TABLE_RULES).
+        spec_catalog (SpecCatalog, optional): Source of compiled paper specs
+            for the spec correlation rule.
+        sort_incidence (SortIncidence, optional): Conditions of the df_sorts
+            rows for the OR coverage rule (df_sorts may then be the narrow
+            SortIncidence.bins table).
+        timings (dict, optional): Receives the seconds spent per rule label
+            (and "apply_same_mirroring" when it is computed here).
+
+    Returns:
+        dict: {label: list of issues}
+    """
+    df_tests_processed = df_tests_mirrored
+    if df_tests_processed is None and df_tests is not None and any(
+        label not in RAW_TABLE_RULES for label, _ in selected_validations
+    ):
+        started = time.perf_counter()
+        df_tests_processed = apply_same_mirroring(df_tests)
+        if timings is not None:
+            timings["apply_same_mirroring"] = time.perf_counter() - started
+
+    all_errors = {}
+    for label, func in selected_validations:
+        started = time.perf_counter()
+        try:
+            if label == "Once ALL PASS with expected BinNumber":
+                errors = func(df_tests_processed, df_sorts, expected_bin_number)
+            elif label == "LowVolt's I-Bias not over 20A":
+                errors = func(df_tests, df_sorts)
+            elif label == "OR logical contain all Test number":
+                errors = func(df_tests_processed, df_sorts, sort_incidence=sort_incidence)
+            elif label == "Spec & Bias1-2 Correlation":
+                errors = func(df_tests, spec_path_for(file_name, spec_dir), df_sorts,
+                              spec_catalog=spec_catalog)
+            else:
+                errors = func(df_tests_processed, df_sorts)
+        except Exception as e:
+            if not catch_errors:
+                raise
+            errors = [f"Validation could not run: {type(e).__name__}: {e}"]
+
+        if timings is not None:
+            timings[label] = time.perf_counter() - started
+        all_errors[label] = errors
+    return all_errors
+
+
+def summarize_errors(file_name, all_errors):
+    """Overall Summary rows (File, Validation, Status, Issues) for one program."""
+    summary_data = []
+    for label, errors in all_errors.items():
+        issue_count = len(errors)
+        status = "✅ PASS" if issue_count == 0 else "❌ FAIL"
+        summary_data.append({
+            "File": file_name,
+            "Validation": label,
+            "Status": status,
+            "Issues": issue_count
+        })
+    return summary_data
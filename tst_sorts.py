@@ -0,0 +1,264 @@
+# tst_sorts.py
+# Compact bin x test incidence for sort plans, decoded straight from .tst bytes.
+#
+# A sort block is a 20-byte header (0xFF 0xFF, sort sequence, logic code,
+# bin number, 10-byte user name) followed by data[11] (test number, result)
+# byte pairs. Instead of one TestN/TestN_Result column pair per position,
+# the conditions are kept as CSR arrays plus per-bin 256-bit bitsets over
+# test numbers, one for each polarity.
+import numpy as np
+import pandas as pd
+
+SORT_HEADER_SIZE = 20
+TEST_NUMBER_BITS = 256  # test numbers are one byte
+
+LOGIC_CONDITIONS = {
+    0x00: "AND",
+    0x01: "ALL",
+    0x02: "OR",
+    0x04: "OSC",
+    0x08: "REJECT",
+    0x80: "ALL PASS"
+}
+
+RESULT_PASS = 0x00
+RESULT_FAIL = 0x80
+RESULT_LABELS = {
+    RESULT_PASS: "PASS",
+    RESULT_FAIL: "FAIL"
+}
+
+
+def logic_label(code):
+    return LOGIC_CONDITIONS.get(code, f"Unknown(0x{code:02X})")
+
+
+def result_label(flag):
+    return RESULT_LABELS.get(flag, f"Unknown(0x{flag:02X})")
+
+
+def _code_of(label, table):
+    """Inverse of logic_label/result_label ("OR" -> 0x02, "Unknown(0x33)" -> 0x33, other -> None)."""
+    for code, name in table.items():
+        if name == label:
+            return code
+    if isinstance(label, str) and label.startswith("Unknown(0x") and label.endswith(")"):
+        return int(label[10:-1], 16)
+    return None
+
+
+def _test_number_array(test_numbers):
+    """Distinct test numbers as an int array (any iterable or a range)."""
+    return np.unique(np.fromiter(test_numbers, dtype=np.int64))
+
+
+class SortIncidence:
+    """
+    Sort plans of one program as a sparse bin x test incidence.
+
+    Row i is the i-th valid sort block. Its conditions are
+    test_nums[indptr[i]:indptr[i + 1]] with the raw result bytes in
+    result_flags (0x00 PASS, 0x80 FAIL), in block order, padding removed.
+
+    `bins` is the narrow per-row table (SortSequence, LogicCondition,
+    BinNumber, UserName); to_frame() rebuilds the wide TestN/TestN_Result
+    frame for display.
+    """
+
+    def __init__(self, sort_sequence, logic_code, bin_number, user_name,
+                 indptr, test_nums, result_flags):
+        self.sort_sequence = np.asarray(sort_sequence, dtype=np.int64)
+        # -1 marks a condition that was not decoded from a logic byte
+        self.logic_code = np.array([-1 if code is None else code for code in logic_code], dtype=np.int64)
+        self.bin_number = np.asarray(bin_number, dtype=np.int64)
+        self.user_name = np.asarray(user_name, dtype=object)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.test_nums = np.asarray(test_nums, dtype=np.int64)
+        self.result_flags = np.asarray(result_flags, dtype=np.int64)
+        self._bitsets = {}
+
+    def __len__(self):
+        return len(self.sort_sequence)
+
+    @classmethod
+    def from_blocks(cls, data, offset, num_sort_plans, sort_block_size, warn=print):
+        """
+        Decode num_sort_plans blocks of 20 + 2 * sort_block_size bytes
+        starting at `offset`. Blocks without the 0xFF 0xFF marker are
+        skipped; a truncated block ends the section with a warning.
+        """
+        block_size = SORT_HEADER_SIZE + 2 * sort_block_size
+        available = max(len(data) - offset, 0) // block_size
+        num_complete = min(num_sort_plans, available)
+        if num_complete < num_sort_plans:
+            warn(f"Incomplete sort block data at index {num_complete}")
+        if num_complete <= 0:
+            return cls([], [], [], [], [0], [], [])
+
+        blocks = np.frombuffer(data, dtype=np.uint8, count=num_complete * block_size, offset=offset)
+        blocks = blocks.reshape(num_complete, block_size)
+        blocks = blocks[(blocks[:, 0] == 0xFF) & (blocks[:, 1] == 0xFF)]
+
+        pairs = blocks[:, SORT_HEADER_SIZE:].reshape(len(blocks), sort_block_size, 2)
+        used = (pairs[:, :, 0] != 0) | (pairs[:, :, 1] != 0)  # (0, 0) is padding
+        indptr = np.concatenate(([0], np.cumsum(used.sum(axis=1))))
+
+        user_name = [
+            bytes(header[5:15]).decode('ascii', errors='ignore').strip() for header in blocks
+        ]
+        return cls(
+            blocks[:, 2], blocks[:, 3], blocks[:, 4], user_name,
+            indptr, pairs[:, :, 0][used], pairs[:, :, 1][used],
+        )
+
+    @classmethod
+    def from_frame(cls, df_sorts):
+        """Build from a wide sort frame (as parse_tst_frames returns)."""
+        if df_sorts is None:
+            return cls([], [], [], [], [0], [], [])
+        test_cols = [col for col in df_sorts.columns if col.startswith("Test") and col[4:].isdigit()]
+
+        indptr, test_nums, result_flags = [0], [], []
+        tests = [df_sorts[col].to_numpy(dtype=object) for col in test_cols]
+        results = [
+            df_sorts[f"{col}_Result"].to_numpy(dtype=object) if f"{col}_Result" in df_sorts.columns
+            else np.full(len(df_sorts), None, dtype=object)
+            for col in test_cols
+        ]
+        for row in range(len(df_sorts)):
+            for test_col, result_col in zip(tests, results):
+                if pd.isna(test_col[row]):
+                    continue
+                flag = _code_of(result_col[row], RESULT_LABELS)
+                test_nums.append(int(test_col[row]))
+                result_flags.append(RESULT_PASS if flag is None else flag)
+            indptr.append(len(test_nums))
+
+        logic = df_sorts["LogicCondition"] if "LogicCondition" in df_sorts.columns else pd.Series("", index=df_sorts.index)
+        return cls(
+            df_sorts.get("SortSequence", pd.Series(0, index=df_sorts.index)).to_numpy(),
+            [_code_of(label, LOGIC_CONDITIONS) for label in logic],
+            df_sorts.get("BinNumber", pd.Series(0, index=df_sorts.index)).to_numpy(),
+            df_sorts.get("UserName", pd.Series("", index=df_sorts.index)).to_numpy(dtype=object),
+            indptr, test_nums, result_flags,
+        )
+
+    # --- Per-row views ---
+
+    @property
+    def logic_conditions(self):
+        return np.array([logic_label(code) if code >= 0 else "" for code in self.logic_code], dtype=object)
+
+    @property
+    def bins(self):
+        """Narrow sort table: one row per bin, no per-condition columns."""
+        return pd.DataFrame({
+            "SortSequence": self.sort_sequence,
+            "LogicCondition": self.logic_conditions,
+            "BinNumber": self.bin_number,
+            "UserName": self.user_name,
+        })
+
+    def row_of(self, test_pos):
+        """Sort row owning each condition position (CSR row ids)."""
+        return np.repeat(np.arange(len(self)), np.diff(self.indptr))[test_pos]
+
+    def tests_of(self, row, polarity=None):
+        """Test numbers referenced by one sort row, in block order."""
+        start, end = self.indptr[row], self.indptr[row + 1]
+        nums = self.test_nums[start:end]
+        if polarity is None:
+            return nums
+        return nums[self.result_flags[start:end] == polarity]
+
+    @property
+    def nbytes(self):
+        arrays = (self.sort_sequence, self.logic_code, self.bin_number, self.user_name,
+                  self.indptr, self.test_nums, self.result_flags)
+        return int(sum(a.nbytes for a in arrays) + sum(len(name) for name in self.user_name))
+
+    # --- Bitsets ---
+
+    def bitsets(self, polarity=None):
+        """
+        (rows, 32) uint8 array: bit t of row i is set when sort row i
+        references test t (with the given result byte, or any when None).
+        """
+        if polarity not in self._bitsets:
+            keep = np.ones(len(self.test_nums), dtype=bool)
+            if polarity is not None:
+                keep = self.result_flags == polarity
+            dense = np.zeros((len(self), TEST_NUMBER_BITS), dtype=bool)
+            dense[self.row_of(np.flatnonzero(keep)), self.test_nums[keep]] = True
+            self._bitsets[polarity] = np.packbits(dense, axis=1, bitorder='little')
+        return self._bitsets[polarity]
+
+    def union(self, rows=None, polarity=None):
+        """OR of the bitsets of the selected rows (boolean mask or indices; all rows when None)."""
+        bits = self.bitsets(polarity)
+        if rows is not None:
+            bits = bits[rows]
+        return np.bitwise_or.reduce(bits, axis=0) if len(bits) else np.zeros(TEST_NUMBER_BITS // 8, dtype=np.uint8)
+
+    @staticmethod
+    def bitset_of(test_numbers):
+        """256-bit bitset of the given test numbers (numbers outside 0-255 are ignored)."""
+        nums = _test_number_array(test_numbers)
+        dense = np.zeros(TEST_NUMBER_BITS, dtype=bool)
+        dense[nums[(nums >= 0) & (nums < TEST_NUMBER_BITS)]] = True
+        return np.packbits(dense, bitorder='little')
+
+    def missing_tests(self, test_numbers, rows=None, polarity=None):
+        """Test numbers (sorted) that none of the selected rows reference."""
+        nums = _test_number_array(test_numbers)
+        covered = np.unpackbits(self.union(rows, polarity), bitorder='little').astype(bool)
+        in_range = (nums >= 0) & (nums < TEST_NUMBER_BITS)
+        found = np.zeros(len(nums), dtype=bool)
+        found[in_range] = covered[nums[in_range]]
+        return nums[~found].tolist()
+
+    def contains_all(self, test_numbers, rows=None, polarity=None):
+        """True when the selected rows together reference every given test number."""
+        wanted = self.bitset_of(test_numbers)
+        if any(n < 0 or n >= TEST_NUMBER_BITS for n in _test_number_array(test_numbers)):
+            return False
+        return not np.any(wanted & ~self.union(rows, polarity))
+
+    def rows_containing(self, test_num, polarity=None):
+        """Boolean mask of the sort rows that reference test_num."""
+        if not 0 <= test_num < TEST_NUMBER_BITS:
+            return np.zeros(len(self), dtype=bool)
+        byte, bit = divmod(int(test_num), 8)
+        return (self.bitsets(polarity)[:, byte] >> bit & 1).astype(bool)
+
+    # --- Wide frame ---
+
+    def to_frame(self):
+        """
+        The wide sort frame (SortSequence, LogicCondition, BinNumber,
+        UserName, Test1, Test1_Result, ...) exactly as parse_sort_plan_block
+        rows would give it; None when there are no sort rows.
+        """
+        if not len(self):
+            return None
+        counts = np.diff(self.indptr)
+        columns = {
+            "SortSequence": self.sort_sequence,
+            "LogicCondition": self.logic_conditions,
+            "BinNumber": self.bin_number,
+            "UserName": self.user_name,
+        }
+        labels = np.array([result_label(flag) for flag in range(256)], dtype=object)
+        for k in range(int(counts.max()) if len(counts) else 0):
+            has = counts > k
+            pos = self.indptr[:-1][has] + k
+            if has.all():
+                nums = self.test_nums[pos]
+            else:
+                nums = np.full(len(self), np.nan)
+                nums[has] = self.test_nums[pos]
+            results = np.full(len(self), np.nan, dtype=object)
+            results[has] = labels[self.result_flags[pos]]
+            columns[f"Test{k + 1}"] = nums
+            columns[f"Test{k + 1}_Result"] = results
+        return pd.DataFrame(columns)
@@ -0,0 +1,154 @@
+# tst_specs.py
+# Process-wide catalog of compiled paper-spec correlation plans.
+#
+# Each spec CSV is read and compiled (compile_spec_plan) once; the plan is
+# reused until the file's mtime or size changes. Compiled plans are also
+# written to a pickle snapshot next to the CSVs, so a fresh server or
+# worker process starts warm instead of re-parsing every CSV.
+import glob
+import os
+import pickle
+import threading
+
+import pandas as pd
+
+from tst_rules import compile_spec_plan
+
+SNAPSHOT_NAME = ".spec_catalog.pkl"
+SNAPSHOT_VERSION = 1
+
+
+def _file_signature(path):
+    """(mtime_ns, size) of a file; raises OSError when it cannot be read."""
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+class SpecCatalog:
+    """
+    Compiled correlation plans for the paper-spec CSVs of one directory.
+
+    plan(spec_path) returns the plan for any CSV path, recompiling it when
+    the file changed since it was compiled. Errors from reading the CSV
+    propagate unchanged (correlate_spec_with_validspec reports them).
+
+    Plans are shared between callers (and Streamlit sessions); treat them
+    as read-only.
+    """
+
+    def __init__(self, spec_dir="paper-spec", snapshot_path=None):
+        self.spec_dir = os.path.abspath(spec_dir)
+        self.snapshot_path = snapshot_path or os.path.join(self.spec_dir, SNAPSHOT_NAME)
+        self._entries = {}  # abs path -> (signature, plan)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._load_snapshot()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def plan(self, spec_path):
+        """Compiled plan for spec_path (read and compiled only when new or changed)."""
+        path = os.path.abspath(spec_path)
+        signature = _file_signature(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == signature:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        plan = compile_spec_plan(pd.read_csv(path))
+        with self._lock:
+            self._entries[path] = (signature, plan)
+        if os.path.dirname(path) == self.spec_dir:
+            self.save_snapshot()
+        return plan
+
+    def refresh(self, pattern="*.csv"):
+        """
+        Bring the whole directory up to date: compile new or changed CSVs,
+        drop deleted ones, then rewrite the snapshot if anything changed.
+
+        Returns:
+            dict: {"compiled": [...], "removed": [...], "failed": {path: error}}
+        """
+        paths = sorted(glob.glob(os.path.join(self.spec_dir, pattern)))
+        compiled, failed = [], {}
+        for path in paths:
+            try:
+                signature = _file_signature(path)
+                entry = self._entries.get(path)
+                if entry is not None and entry[0] == signature:
+                    continue
+                plan = compile_spec_plan(pd.read_csv(path))
+            except Exception as e:
+                failed[path] = str(e)
+                continue
+            with self._lock:
+                self._entries[path] = (signature, plan)
+            compiled.append(path)
+
+        with self._lock:
+            removed = [
+                path for path in self._entries
+                if os.path.dirname(path) == self.spec_dir and not os.path.exists(path)
+            ]
+            for path in removed:
+                del self._entries[path]
+
+        if compiled or removed:
+            self.save_snapshot()
+        return {"compiled": compiled, "removed": removed, "failed": failed}
+
+    def stats(self):
+        return {
+            "Specs": len(self._entries),
+            "Hits": self.hits,
+            "Misses": self.misses,
+        }
+
+    def save_snapshot(self):
+        """Write the plans of this directory to the snapshot (best effort)."""
+        with self._lock:
+            entries = {
+                os.path.basename(path): entry for path, entry in self._entries.items()
+                if os.path.dirname(path) == self.spec_dir
+            }
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump({"version": SNAPSHOT_VERSION, "entries": entries}, f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError:
+            # Read-only spec directory: the catalog still works, just starts cold
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _load_snapshot(self):
+        """Start from the snapshot when there is a usable one; entries are still re-checked by mtime/size."""
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                snapshot = pickle.load(f)
+        except Exception:
+            return
+        if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION:
+            return
+        for name, entry in snapshot["entries"].items():
+            self._entries[os.path.join(self.spec_dir, name)] = entry
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def spec_catalog_for(spec_dir="paper-spec"):
+    """The process-wide SpecCatalog for spec_dir (created on first use)."""
+    key = os.path.abspath(spec_dir)
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None:
+            catalog = _catalogs[key] = SpecCatalog(key)
+        return catalog
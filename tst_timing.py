@@ -0,0 +1,111 @@
+# tst_timing.py
+# Lightweight per-stage wall-clock timings (and issue counts) of one run.
+import json
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Stage keys filled in by ProgramCache / NormalizedProgram / run_validations / Fleet;
+# any other key is a VALIDATION_RULES label
+STAGE_LABELS = {
+    "cache": "Cache hit",
+    "parse": "Parse",
+    "normalize": "Normalize",
+    "apply_same_mirroring": "SAME mirroring",
+    "fingerprint": "Fingerprints",
+    "fleet": "Fleet build",
+    "render": "Render",
+}
+
+ALL_FILES = "(all files)"
+
+
+def stage_label(key):
+    return STAGE_LABELS.get(key, f"Rule: {key}")
+
+
+class StageTimer:
+    """
+    Seconds and issue counts per (file, stage), in the order recorded.
+
+    Timing a stage costs two perf_counter() calls, so it can stay on in
+    production.
+    """
+
+    def __init__(self):
+        self.records = []  # (file, stage, seconds, issues or None)
+
+    def __len__(self):
+        return len(self.records)
+
+    def add(self, file_name, stage, seconds, issues=None):
+        self.records.append((file_name, stage, float(seconds), issues))
+
+    @contextmanager
+    def stage(self, file_name, stage):
+        """Time the body of a with-block as one stage."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(file_name, stage, time.perf_counter() - started)
+
+    def add_timings(self, file_name, timings, issues=None):
+        """
+        Record a {key: seconds} dict as filled by get_program / validate.
+
+        Args:
+            issues (dict, optional): {key: list of issues}; its lengths
+                become the issue counts of the matching stages.
+        """
+        issues = issues or {}
+        for key, seconds in timings.items():
+            count = len(issues[key]) if key in issues else None
+            self.add(file_name, stage_label(key), seconds, count)
+
+    def files(self):
+        return list(dict.fromkeys(record[0] for record in self.records))
+
+    def per_file(self, file_name=None):
+        """Stage, ms and issues of every record (of one file when given)."""
+        df = pd.DataFrame(self.records, columns=["File", "Stage", "Seconds", "Issues"])
+        if file_name is not None:
+            df = df[df["File"] == file_name]
+        df = df.assign(**{"Time (ms)": (df["Seconds"] * 1000).round(3)})
+        df["Issues"] = df["Issues"].astype("Int64")
+        return df[["File", "Stage", "Time (ms)", "Issues"]].reset_index(drop=True)
+
+    def aggregate(self):
+        """Per stage over all files: files, total / mean / max ms and issues, slowest first."""
+        df = pd.DataFrame(self.records, columns=["File", "Stage", "Seconds", "Issues"])
+        grouped = df.groupby("Stage", sort=False)
+        summary = pd.DataFrame({
+            "Files": grouped["File"].nunique(),
+            "Total (ms)": (grouped["Seconds"].sum() * 1000).round(3),
+            "Mean (ms)": (grouped["Seconds"].mean() * 1000).round(3),
+            "Max (ms)": (grouped["Seconds"].max() * 1000).round(3),
+            "Issues": grouped["Issues"].sum(min_count=1).astype("Int64"),
+        })
+        return summary.sort_values("Total (ms)", ascending=False).reset_index()
+
+    def total_seconds(self):
+        return sum(record[2] for record in self.records)
+
+    def to_dict(self):
+        files = {}
+        for file_name, stage, seconds, issues in self.records:
+            entry = files.setdefault(file_name, {})
+            stats = entry.setdefault(stage, {"ms": 0.0, "issues": None})
+            stats["ms"] = round(stats["ms"] + seconds * 1000, 3)
+            if issues is not None:
+                stats["issues"] = (stats["issues"] or 0) + int(issues)
+        aggregate = self.aggregate() if self.records else pd.DataFrame()
+        return {
+            "total_ms": round(self.total_seconds() * 1000, 3),
+            "files": files,
+            "aggregate": json.loads(aggregate.to_json(orient="records")),
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
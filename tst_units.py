@@ -0,0 +1,115 @@
+# tst_units.py
+# One SI-value codec for limits, biases and test times ('100.0u' <-> 1e-4).
+#
+# Suffixes are case-sensitive where SI is: 'm' is milli, 'M' is mega.
+# 'meg' (any case) is also mega, 'k'/'K' are kilo, 'u'/'µ' are micro.
+import re
+
+import numpy as np
+import pandas as pd
+
+SI_PREFIXES = {
+    'p': 1e-12,
+    'n': 1e-9,
+    'u': 1e-6,
+    'µ': 1e-6,
+    'm': 1e-3,
+    '': 1.0,
+    'k': 1e3,
+    'K': 1e3,
+    'M': 1e6,
+    'meg': 1e6,
+    'G': 1e9,
+}
+
+# Prefixes used when formatting, smallest to largest
+SI_FORMAT_PREFIXES = [
+    ('p', 1e-12),
+    ('n', 1e-9),
+    ('u', 1e-6),
+    ('m', 1e-3),
+    ('', 1.0),
+    ('k', 1e3),
+    ('M', 1e6),
+    ('G', 1e9)
+]
+
+SI_PATTERN = r"([-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?)\s*((?i:meg)|[pnuµmkKMG]?)"
+_SI_RE = re.compile(SI_PATTERN)
+
+
+def si_to_float(value):
+    """
+    Parse one value like '100.0u', '2.6', '1meg' or 80 to a float.
+    Empty, missing or unparseable values give NaN.
+    """
+    if value is None or isinstance(value, bool):
+        return np.nan
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return float(value)
+    match = _SI_RE.fullmatch(str(value).strip())
+    if not match:
+        return np.nan
+    number, prefix = match.groups()
+    return float(number) * SI_PREFIXES[prefix if len(prefix) < 3 else 'meg']
+
+
+def si_series_to_float(values):
+    """
+    Vectorized si_to_float over a whole column (one regex pass, no Python
+    loop per row). Returns a float64 Series aligned with `values`.
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return values.astype(np.float64)
+
+    # Numbers in an object column go through str() too ('2.6', '1e-05' parse back exactly)
+    text = values.astype(object).where(values.notna()).astype(str).str.strip()
+    parts = text.str.extract(f"^{SI_PATTERN}$")
+    prefix = parts[1].where(parts[1].str.len() < 3, 'meg')
+    result = parts[0].astype(np.float64) * prefix.map(SI_PREFIXES).astype(np.float64)
+    return result.rename(values.name)
+
+
+def format_si(value, digits=4):
+    """
+    Format a number with an SI prefix, scaled to keep 1 <= |x| < 1000
+    (p below 1e-12, G above), with `digits` significant digits.
+    """
+    abs_val = abs(value)
+    chosen_prefix, chosen_factor = '', 1.0
+    for prefix, factor in SI_FORMAT_PREFIXES:
+        scaled = abs_val / factor
+        if 1 <= scaled < 1000:  # ✅ max 3 integer digits
+            chosen_prefix, chosen_factor = prefix, factor
+            break
+    else:
+        # If very small, use smallest prefix; if huge, use largest
+        if abs_val < 1e-12:
+            chosen_prefix, chosen_factor = 'p', 1e-12
+        else:
+            chosen_prefix, chosen_factor = 'G', 1e9
+
+    scaled_val = value / chosen_factor
+    return f"{scaled_val:.{digits}g}{chosen_prefix}"
+
+
+def format_si_array(values, digits=4):
+    """
+    Vectorized format_si: same prefix choice and text for every element,
+    as an object array of strings.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    abs_val = np.abs(values)
+    prefixes = np.where(abs_val < 1e-12, 'p', 'G').astype(object)
+    factors = np.where(abs_val < 1e-12, 1e-12, 1e9)
+    chosen = np.zeros(values.shape, dtype=bool)
+    for prefix, factor in SI_FORMAT_PREFIXES:
+        scaled = abs_val / factor
+        hit = ~chosen & (1 <= scaled) & (scaled < 1000)
+        prefixes[hit] = prefix
+        factors[hit] = factor
+        chosen |= hit
+
+    numbers = np.char.mod(f"%.{digits}g", values / factors)
+    return np.char.add(numbers, prefixes.astype(str)).astype(object)
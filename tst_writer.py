@@ -0,0 +1,396 @@
+# tst_writer.py
+# Encoding of test / sort tables back into SPEKTRA .tst bytes.
+#
+# The inverse of parse_tst_sections: a test table (raw, as decoded, or
+# normalized, as the UI shows it) and the sort plans become the 36-byte
+# header, one 18-byte block per test and one 0xFF 0xFF sort block per row.
+#
+# Text values are encoded to the BCD digits + suffix code that decode to
+# them; when several do ("5.0n" is 5 / 1 or 50 / 10), the first in suffix
+# map order wins. Bits no table column holds (header bytes, block bytes
+# 2-3, unused option bits, sort header bytes 15-19) are zero. Pass the
+# original file as `template` to take those bits and ambiguous encodings
+# from it instead, along with the (0, 0) padding slots of sort rows whose
+# conditions are unchanged and the sort blocks the parser skips (no
+# 0xFF 0xFF marker): encoding an unedited program against itself gives
+# the same bytes.
+import math
+import re
+
+import numpy as np
+
+from tst_parser import (
+    LIMIT_SUFFIX_MAP, TEST_FLAG_BITS, VALUE_SUFFIX_MAP, calc_si, code_name_map,
+    decode_limit_with_suffix, decode_value_with_suffix,
+)
+from tst_reader import TEST_BLOCK_SIZE, TST_HEADER_SIZE
+from tst_sorts import SORT_HEADER_SIZE, SortIncidence
+from tst_units import SI_PREFIXES, si_to_float
+
+SORT_BRANCH = 251
+USER_NAME_SIZE = 10
+
+# ItemName -> (block[1], block[13] & 0x0F); wider codes have no block encoding
+ITEM_CODES = {name: key for key, name in code_name_map.items() if key[0] < 256}
+
+# (column, first byte, BCD digits, suffix map) of the SI fields of a test block
+SI_FIELDS = [
+    ("Limit", 4, 4, LIMIT_SUFFIX_MAP),
+    ("Bias1", 7, 3, VALUE_SUFFIX_MAP),
+    ("Bias2", 9, 3, VALUE_SUFFIX_MAP),
+    ("TestTime", 11, 3, VALUE_SUFFIX_MAP),
+]
+
+# Labels the normalized table uses for a set flag (normalize_test_table)
+FLAG_LABELS = {"RV": "RV", "Oi": "Oi", "Ai": "Ai", "AR": "AR", "Di": "Di",
+               "C/B1": "B", "C/B2": "B", "CP": "CP", "AC": "AC"}
+
+# Bits of each block byte that come from a column; the rest are kept from the template
+BYTE_MASKS = {6: 0x0F, 13: 0x8F, 14: 0xF7, 15: 0x60}
+
+RATIO_LIMITS = {
+    "RDON": "Bias1", "HRDON": "Bias1", "RDON-": "Bias1", "HRDON-": "Bias1",
+    "HFE": "Bias2", "HHFE": "Bias2",
+}
+
+
+# --- SI fields ---
+
+def _field_nibbles(block, first, digits):
+    """(BCD digit nibbles, suffix code) of the SI field starting at block[first]."""
+    nibbles = []
+    for b in block[first:first + (3 if digits == 4 else 2)]:
+        nibbles += [b >> 4, b & 0x0F]
+    if digits == 4:
+        return nibbles[:4], nibbles[5]
+    return nibbles[:3], nibbles[3]
+
+
+def _field_text(nibbles, code, suffix_map):
+    raw = sum(n * 10 ** k for k, n in enumerate(reversed(nibbles)))
+    decode = decode_limit_with_suffix if suffix_map is LIMIT_SUFFIX_MAP else decode_value_with_suffix
+    return decode(raw, code)
+
+
+def _put_field(block, first, digits, nibbles, code):
+    if digits == 4:
+        block[first] = nibbles[0] << 4 | nibbles[1]
+        block[first + 1] = nibbles[2] << 4 | nibbles[3]
+        block[first + 2] = (block[first + 2] & 0xF0) | code
+    else:
+        block[first] = nibbles[0] << 4 | nibbles[1]
+        block[first + 1] = nibbles[2] << 4 | code
+
+
+def _prefix_of(text):
+    text = str(text).strip()
+    return text[-1] if text and text[-1] in "pnumk" else ""
+
+
+def si_field_candidates(value, suffix_map, digits, prefer_prefix=""):
+    """
+    Every (BCD digits, suffix code) pair that decodes to `value`, codes with
+    prefer_prefix first, then in suffix map order.
+    """
+    if not np.isfinite(value) or value < 0:
+        return []
+    codes = sorted(suffix_map, key=lambda c: suffix_map[c][1] != prefer_prefix)
+    found = []
+    for code in codes:
+        divisor, prefix = suffix_map[code]
+        scale = SI_PREFIXES[prefix]
+        raw = int(round(value / scale * divisor))
+        if raw >= 10 ** digits:
+            continue
+        if math.isclose(raw / divisor * scale, value, rel_tol=1e-12):
+            found.append(([int(d) for d in f"{raw:0{digits}d}"], code))
+    return found
+
+
+def encode_si_field(text, suffix_map, digits, template=None):
+    """
+    (BCD digits, suffix code) for an SI text such as '925.0k'.
+
+    template is the (digits, code) already in the block; it is kept when it
+    decodes to the same text.
+
+    Raises:
+        ValueError: When no encoding decodes to the value.
+    """
+    text = str(text).strip()
+    if template is not None and _field_text(*template, suffix_map) == text:
+        return template
+    candidates = si_field_candidates(si_to_float(text), suffix_map, digits, _prefix_of(text))
+    if not candidates:
+        raise ValueError(f"'{text}' cannot be encoded in {digits} BCD digits")
+    return candidates[0]
+
+
+def _ratio_limit_field(item_name, text, other_text, template=None):
+    """
+    Limit field of an RDON / HFE row, whose table value is the displayed
+    ratio (Limit / Bias1, Bias2 / Limit) rather than the stored limit.
+    Falls back to the stored limit itself when the decoder kept it
+    (zero denominator). Picks the exact text when possible, else the
+    nearest ratio within the 4-digit display rounding.
+    """
+    rdon = RATIO_LIMITS[item_name] == "Bias1"
+
+    def displayed(field):
+        limit_text = _field_text(*field, LIMIT_SUFFIX_MAP)
+        try:
+            if rdon:
+                return calc_si(limit_text, other_text, "/")
+            return calc_si(other_text, limit_text, "/")
+        except Exception:
+            return limit_text  # the decoder keeps the limit on failure
+
+    if template is not None and displayed(template) == text:
+        return template
+
+    wanted = si_to_float(text)
+    other = si_to_float(other_text)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        target = wanted * other if rdon else np.float64(other) / wanted
+    # The ratio is shown to 4 significant digits, so the stored limit lies
+    # within about 5e-4 relative of the inverted value
+    candidates = []
+    for code, (divisor, prefix) in LIMIT_SUFFIX_MAP.items():
+        center = target / SI_PREFIXES[prefix] * divisor if np.isfinite(target) else 1.0
+        if not -1 < center < 1.001 * 10 ** 4:
+            continue
+        radius = int(abs(center) * 5e-4) + 1
+        for raw in range(max(int(round(center)) - radius, 0), min(int(round(center)) + radius, 10 ** 4 - 1) + 1):
+            candidates.append(([int(d) for d in f"{raw:04d}"], code))
+    candidates += si_field_candidates(wanted, LIMIT_SUFFIX_MAP, 4, _prefix_of(text))
+
+    best, best_error = None, None
+    for field in candidates:
+        shown = displayed(field)
+        if shown == text:
+            return field
+        error = abs(si_to_float(shown) - wanted)
+        if np.isfinite(error) and error <= 5e-4 * abs(wanted) and (best is None or error < best_error):
+            best, best_error = field, error
+    if best is None:
+        raise ValueError(f"{item_name} limit '{text}' cannot be encoded with {'Bias1' if rdon else 'Bias2'} '{other_text}'")
+    return best
+
+
+# --- Test blocks ---
+
+def _raw_test_rows(df_tests):
+    """Rows as dicts in the raw (decoded) form, from a raw or normalized table."""
+    df = df_tests.reset_index(drop=True)
+    if "Limit" not in df.columns and "Limit-L" in df.columns:
+        low = df["Limit-L"].fillna("").astype(str).to_numpy(dtype=object)
+        high = df["Limit-H"].fillna("").astype(str).to_numpy(dtype=object)
+        is_min = low != ""
+        df = df.assign(Limit=np.where(is_min, low, high), LimitType=np.where(is_min, "Min", "Max"))
+    return df.to_dict("records")
+
+
+def _flag_set(value, flag):
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    return value == FLAG_LABELS[flag]
+
+
+def _branch_byte(value):
+    text = str(value).strip()
+    if text == "SORT":
+        return SORT_BRANCH
+    number = int(float(text))
+    if not 0 <= number <= 255:
+        raise ValueError(f"branch {text} out of range 0-255")
+    return number
+
+
+def _item_code(name):
+    if name in ITEM_CODES:
+        return ITEM_CODES[name]
+    match = re.fullmatch(r"Unknown_\((\d+), (\d+)\)", str(name))
+    if match and int(match.group(1)) < 256 and int(match.group(2)) < 16:
+        return int(match.group(1)), int(match.group(2))
+    raise ValueError(f"ItemName '{name}' has no one-byte code")
+
+
+def encode_test_block(row, template=None):
+    """
+    18-byte block for one test row (a dict with the decoded columns).
+
+    Args:
+        row (dict): Sequence, ItemName, Limit, LimitType, Bias1, Bias2,
+            TestTime, PassBranch, FailBranch and the flag columns.
+        template (bytes, optional): The block this row was decoded from.
+    """
+    block = bytearray(template if template is not None else bytes(TEST_BLOCK_SIZE))
+    for byte_idx, mask in BYTE_MASKS.items():
+        block[byte_idx] &= ~mask & 0xFF
+
+    sequence = int(row["Sequence"])
+    if not 0 <= sequence <= 255:
+        raise ValueError(f"Sequence {sequence} out of range 0-255")
+    block[0] = sequence
+    code1, code2 = _item_code(row["ItemName"])
+    block[1] = code1
+    block[13] |= code2 | (0x80 if row["LimitType"] == "Min" else 0x00)
+
+    for column, first, digits, suffix_map in SI_FIELDS:
+        old = _field_nibbles(template, first, digits) if template is not None else None
+        if column == "Limit" and row["ItemName"] in RATIO_LIMITS:
+            continue
+        field = encode_si_field(row[column], suffix_map, digits, template=old)
+        _put_field(block, first, digits, *field)
+
+    if row["ItemName"] in RATIO_LIMITS:
+        old = _field_nibbles(template, 4, 4) if template is not None else None
+        other_text = _field_text(*_field_nibbles(block, *(
+            (7, 3) if RATIO_LIMITS[row["ItemName"]] == "Bias1" else (9, 3))), VALUE_SUFFIX_MAP)
+        field = _ratio_limit_field(row["ItemName"], str(row["Limit"]).strip(), other_text, template=old)
+        _put_field(block, 4, 4, *field)
+
+    for flag, byte_idx, mask in TEST_FLAG_BITS:
+        if _flag_set(row.get(flag, False), flag):
+            block[byte_idx] |= mask
+    block[16] = _branch_byte(row["PassBranch"])
+    block[17] = _branch_byte(row["FailBranch"])
+    return bytes(block)
+
+
+# --- Sort blocks ---
+
+def _template_sort_blocks(template, offset, num_sort_plans, width):
+    """The complete sort blocks of the template, in order, as (is valid (0xFF 0xFF), bytes)."""
+    block_size = SORT_HEADER_SIZE + 2 * width
+    blocks = []
+    for i in range(num_sort_plans):
+        block = template[offset + i * block_size:offset + (i + 1) * block_size]
+        if len(block) == block_size:
+            blocks.append((block[0] == 0xFF and block[1] == 0xFF, bytes(block)))
+    return blocks
+
+
+def encode_sort_block(sort_incidence, row, width, template=None):
+    """20 + 2 * width bytes for one SortIncidence row."""
+    tests = sort_incidence.test_nums[sort_incidence.indptr[row]:sort_incidence.indptr[row + 1]]
+    flags = sort_incidence.result_flags[sort_incidence.indptr[row]:sort_incidence.indptr[row + 1]]
+    if len(tests) > width:
+        raise ValueError(f"sort row {row} has {len(tests)} conditions, wider than {width}")
+    logic_code = int(sort_incidence.logic_code[row])
+    if logic_code < 0:
+        raise ValueError(f"sort row {row} has no logic condition")
+
+    header = bytearray(template[:SORT_HEADER_SIZE] if template is not None else bytes(SORT_HEADER_SIZE))
+    header[0:2] = b"\xFF\xFF"
+    header[2] = int(sort_incidence.sort_sequence[row])
+    header[3] = logic_code
+    header[4] = int(sort_incidence.bin_number[row])
+    user_name = str(sort_incidence.user_name[row])
+    old_name = bytes(header[5:15]).decode("ascii", errors="ignore")
+    if old_name.strip() != user_name:
+        name = user_name.encode("ascii")
+        if len(name) > USER_NAME_SIZE:
+            raise ValueError(f"UserName '{user_name}' is longer than {USER_NAME_SIZE} characters")
+        header[5:15] = name.ljust(USER_NAME_SIZE, b" ")
+
+    # Unchanged conditions keep the template's slots, padding included
+    if template is not None and len(template) == SORT_HEADER_SIZE + 2 * width:
+        old_pairs = np.frombuffer(template, dtype=np.uint8, offset=SORT_HEADER_SIZE).reshape(width, 2)
+        old_pairs = old_pairs[(old_pairs[:, 0] != 0) | (old_pairs[:, 1] != 0)]
+        if np.array_equal(old_pairs[:, 0], tests) and np.array_equal(old_pairs[:, 1], flags):
+            return bytes(header) + template[SORT_HEADER_SIZE:]
+
+    pairs = np.zeros((width, 2), dtype=np.uint8)
+    pairs[:len(tests), 0] = tests
+    pairs[:len(tests), 1] = flags
+    return bytes(header) + pairs.tobytes()
+
+
+# --- Whole program ---
+
+def _sort_incidence_of(df_sorts):
+    if isinstance(df_sorts, SortIncidence):
+        return df_sorts
+    return SortIncidence.from_frame(df_sorts)
+
+
+def encode_tst(df_tests, df_sorts=None, sort_width=None, header=None, template=None):
+    """
+    Encode a program.
+
+    Args:
+        df_tests (pd.DataFrame): Test table, raw (parse_tst_sections) or
+            normalized (normalize_test_table); None for no tests.
+        df_sorts (pd.DataFrame | SortIncidence, optional): Sort plans.
+        sort_width (int, optional): Condition pairs per sort block
+            (default: the template's, else the number of tests).
+        header (bytes, optional): Header bytes (counts are overwritten).
+        template (bytes, optional): Original file; supplies bits the tables
+            do not hold, its skipped (invalid) sort blocks and trailing
+            bytes after the sort section.
+
+    Returns:
+        bytes: The .tst contents.
+
+    Raises:
+        ValueError: When a value has no encoding (out of range, unknown
+            ItemName, too many rows or conditions).
+    """
+    rows = _raw_test_rows(df_tests) if df_tests is not None else []
+    sort_incidence = _sort_incidence_of(df_sorts)
+
+    template = bytes(template) if template is not None else None
+    template_tests, template_sorts, trailer = [], [], b""
+    if template is not None and len(template) >= TST_HEADER_SIZE:
+        num_tests, num_sorts, width = template[9], template[10], template[11]
+        template_tests = [
+            template[TST_HEADER_SIZE + i * TEST_BLOCK_SIZE:TST_HEADER_SIZE + (i + 1) * TEST_BLOCK_SIZE]
+            for i in range(num_tests)
+        ]
+        template_tests = [block for block in template_tests if len(block) == TEST_BLOCK_SIZE]
+        sort_offset = TST_HEADER_SIZE + num_tests * TEST_BLOCK_SIZE
+        template_sorts = _template_sort_blocks(template, sort_offset, num_sorts, width)
+        trailer = template[sort_offset + num_sorts * (SORT_HEADER_SIZE + 2 * width):]
+        if header is None:
+            header = template[:TST_HEADER_SIZE]
+        if sort_width is None:
+            sort_width = width
+
+    counts = np.diff(sort_incidence.indptr)
+    widest = int(counts.max()) if len(counts) else 0
+    if sort_width is None:
+        sort_width = max(len(rows), widest)
+    if not widest <= sort_width <= 255:
+        raise ValueError(f"sort width {sort_width} cannot hold {widest} conditions")
+
+    # Sort rows take the template's valid blocks in order; its invalid
+    # blocks stay in place between them (when the width is unchanged)
+    sort_blocks = []
+    row = 0
+    for valid, block in template_sorts:
+        if not valid:
+            if len(block) == SORT_HEADER_SIZE + 2 * sort_width:
+                sort_blocks.append(block)
+        elif row < len(sort_incidence):
+            sort_blocks.append(encode_sort_block(sort_incidence, row, sort_width, block))
+            row += 1
+    for row in range(row, len(sort_incidence)):
+        sort_blocks.append(encode_sort_block(sort_incidence, row, sort_width))
+    if len(rows) > 255 or len(sort_blocks) > 255:
+        raise ValueError(f"{len(rows)} tests / {len(sort_blocks)} sort plans; at most 255 each")
+
+    head = bytearray(bytes(header or b"")[:TST_HEADER_SIZE].ljust(TST_HEADER_SIZE, b"\x00"))
+    head[9], head[10], head[11] = len(rows), len(sort_blocks), sort_width
+
+    out = [bytes(head)]
+    for i, row in enumerate(rows):
+        out.append(encode_test_block(row, template_tests[i] if i < len(template_tests) else None))
+    out.extend(sort_blocks)
+    out.append(trailer)
+    return b"".join(out)
+
+
+def encode_program(program, template=None, **kwargs):
+    """encode_tst for a NormalizedProgram (its normalized tests and sort plans)."""
+    return encode_tst(program.tests, program.sort_incidence, template=template, **kwargs)